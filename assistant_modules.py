@@ -3,36 +3,114 @@ import webbrowser
 import subprocess
 import datetime
 import json
-import requests
+import inspect
 from abc import ABC, abstractmethod
+from collections import deque
+from module_registry import ModuleRegistry, ModuleSpec
+from note_store import describe_notes, extract_note_query, shared_store
+from safe_calc import CalculationError, evaluate, normalize_expression
+from startup import deferred, is_initialized
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton that finds every keyword occurrence in one pass"""
+    
+    def __init__(self, keywords):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [()]
+        for keyword in keywords:
+            self._add(keyword)
+        self._link()
+    
+    def _add(self, keyword):
+        state = 0
+        for char in keyword:
+            next_state = self.goto[state].get(char)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(())
+                self.goto[state][char] = next_state
+            state = next_state
+        if keyword not in self.output[state]:
+            self.output[state] += (keyword,)
+    
+    def _link(self):
+        # Breadth-first so every failure target is finished before it is used
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.output[next_state] += self.output[self.fail[next_state]]
+    
+    def find_all(self, text):
+        """Return {keyword: [(start, end), ...]} for every (overlapping) occurrence"""
+        matches = {}
+        state = 0
+        goto = self.goto
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = self.fail[state]
+            state = goto[state].get(char, 0)
+            for keyword in self.output[state]:
+                matches.setdefault(keyword, []).append((index + 1 - len(keyword), index + 1))
+        return matches
 
 class AssistantModule(ABC):
     """Base class for assistant modules"""
     
-    @abstractmethod
+    # Routing keywords; ModuleManager compiles these into one shared automaton
+    keywords = ()
+    # Extra phrases execute() looks for, matched in the same pass as the keywords
+    terms = ()
+    
     def can_handle(self, command):
         """Check if this module can handle the given command"""
-        pass
+        command_lower = command.lower()
+        return any(keyword in command_lower for keyword in self.keywords)
+    
+    def scan(self, command):
+        """Locate this module's keywords and terms without going through the router"""
+        command_lower = command.lower()
+        matches = {}
+        for term in set(self.keywords) | set(self.terms):
+            start = command_lower.find(term)
+            while start != -1:
+                matches.setdefault(term, []).append((start, start + len(term)))
+                start = command_lower.find(term, start + 1)
+        return matches
     
     @abstractmethod
-    def execute(self, command, parameters=None):
-        """Execute the command and return a response"""
+    def execute(self, command, parameters=None, matches=None):
+        """Execute the command and return a response
+        
+        matches maps each keyword/term found in the command to its (start, end)
+        spans; it is None when execute is called outside the router.
+        """
         pass
 
 class WebSearchModule(AssistantModule):
     """Handle web search commands"""
     
-    def can_handle(self, command):
-        keywords = ['search', 'find', 'look up', 'google']
-        return any(keyword in command.lower() for keyword in keywords)
+    keywords = ('search', 'find', 'look up', 'google')
+    terms = ('search for',)
     
-    def execute(self, command, parameters=None):
+    def execute(self, command, parameters=None, matches=None):
+        if matches is None:
+            matches = self.scan(command)
+        
         # Extract search query from command
         search_terms = ['search for', 'find', 'look up', 'google']
         query = command.lower()
         
         for term in search_terms:
-            if term in query:
+            if term in matches:
                 query = query.replace(term, '').strip()
                 break
         
@@ -45,6 +123,8 @@ class WebSearchModule(AssistantModule):
 class ApplicationModule(AssistantModule):
     """Handle application opening commands"""
     
+    keywords = ('open', 'launch')
+    
     def __init__(self):
         self.apps = {
             'calculator': 'Calculator',
@@ -64,16 +144,15 @@ class ApplicationModule(AssistantModule):
             'maps': 'Maps',
             'settings': 'System Preferences'
         }
+        self.terms = tuple(self.apps)
     
-    def can_handle(self, command):
-        return 'open' in command.lower() or 'launch' in command.lower()
-    
-    def execute(self, command, parameters=None):
-        command_lower = command.lower()
+    def execute(self, command, parameters=None, matches=None):
+        if matches is None:
+            matches = self.scan(command)
         
         # Find the app name in the command
         for app_key, app_name in self.apps.items():
-            if app_key in command_lower:
+            if app_key in matches:
                 try:
                     subprocess.run(['open', '-a', app_name])
                     return f"I've opened {app_name} for you."
@@ -85,23 +164,21 @@ class ApplicationModule(AssistantModule):
 class TimeDateModule(AssistantModule):
     """Handle time and date queries"""
     
-    def can_handle(self, command):
-        time_keywords = ['time', 'hour', 'clock']
-        date_keywords = ['date', 'day', 'today', 'tomorrow']
-        return any(keyword in command.lower() for keyword in time_keywords + date_keywords)
+    keywords = ('time', 'hour', 'clock', 'date', 'day', 'today', 'tomorrow')
     
-    def execute(self, command, parameters=None):
-        command_lower = command.lower()
+    def execute(self, command, parameters=None, matches=None):
+        if matches is None:
+            matches = self.scan(command)
         
-        if any(keyword in command_lower for keyword in ['time', 'hour', 'clock']):
+        if any(keyword in matches for keyword in ['time', 'hour', 'clock']):
             current_time = datetime.datetime.now().strftime("%I:%M %p")
             return f"The current time is {current_time}."
         
-        elif any(keyword in command_lower for keyword in ['date', 'day', 'today']):
+        elif any(keyword in matches for keyword in ['date', 'day', 'today']):
             current_date = datetime.datetime.now().strftime("%B %d, %Y")
             return f"Today is {current_date}."
         
-        elif 'tomorrow' in command_lower:
+        elif 'tomorrow' in matches:
             tomorrow = datetime.datetime.now() + datetime.timedelta(days=1)
             tomorrow_date = tomorrow.strftime("%B %d, %Y")
             return f"Tomorrow is {tomorrow_date}."
@@ -111,44 +188,52 @@ class TimeDateModule(AssistantModule):
 class NoteModule(AssistantModule):
     """Handle note creation and management"""
     
-    def __init__(self):
-        self.notes_dir = "notes"
-        if not os.path.exists(self.notes_dir):
-            os.makedirs(self.notes_dir)
+    def __init__(self, store):
+        self.store = store
     
-    def can_handle(self, command):
-        note_keywords = ['note', 'write', 'create note', 'save note']
-        return any(keyword in command.lower() for keyword in note_keywords)
+    keywords = ('note', 'write', 'create note', 'save note')
     
-    def execute(self, command, parameters=None):
+    def execute(self, command, parameters=None, matches=None):
         if parameters and 'content' in parameters:
             content = parameters['content']
-            filename = f"note_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
-            filepath = os.path.join(self.notes_dir, filename)
-            
-            with open(filepath, 'w') as f:
-                f.write(content)
-            
+            self.store.add(content)
             return f"I've created a note with your content: {content}"
         
         return "What would you like me to write in the note?"
 
+class NoteSearchModule(AssistantModule):
+    """Find notes by the words they contain"""
+    
+    def __init__(self, store):
+        self.store = store
+    
+    keywords = ('note about', 'notes about', 'notes on', 'notes mentioning', 'search notes', 'search my notes',
+                'find note')
+    
+    def execute(self, command, parameters=None, matches=None):
+        query = (parameters or {}).get('query') or extract_note_query(command)
+        if not query:
+            return "What should I look for in your notes?"
+        return describe_notes(self.store.search(query), query)
+
 class WeatherModule(AssistantModule):
     """Handle weather queries"""
     
-    def can_handle(self, command):
-        weather_keywords = ['weather', 'temperature', 'forecast']
-        return any(keyword in command.lower() for keyword in weather_keywords)
+    keywords = ('weather', 'temperature', 'forecast')
+    terms = ('weather in', 'weather for')
     
-    def execute(self, command, parameters=None):
+    def execute(self, command, parameters=None, matches=None):
+        if matches is None:
+            matches = self.scan(command)
+        
         # Extract city name from command
         command_lower = command.lower()
         
         # Simple city extraction (in a real app, you'd use NLP)
-        if 'weather in' in command_lower:
-            city = command_lower.split('weather in')[-1].strip()
-        elif 'weather for' in command_lower:
-            city = command_lower.split('weather for')[-1].strip()
+        if 'weather in' in matches:
+            city = command_lower[matches['weather in'][-1][1]:].strip()
+        elif 'weather for' in matches:
+            city = command_lower[matches['weather for'][-1][1]:].strip()
         else:
             city = "current location"
         
@@ -162,18 +247,16 @@ class WeatherModule(AssistantModule):
 class CalculatorModule(AssistantModule):
     """Handle mathematical calculations"""
     
-    def can_handle(self, command):
-        calc_keywords = ['calculate', 'compute', 'math', 'plus', 'minus', 'times', 'divided']
-        return any(keyword in command.lower() for keyword in calc_keywords)
+    keywords = ('calculate', 'compute', 'math', 'plus', 'minus', 'times', 'divided')
     
-    def execute(self, command, parameters=None):
-        if parameters and 'expression' in parameters:
-            expression = parameters['expression']
+    def execute(self, command, parameters=None, matches=None):
+        # Use the given expression, or the spoken command itself ("15 plus 27")
+        expression = parameters['expression'] if parameters and 'expression' in parameters else command
+        if any(char.isdigit() for char in normalize_expression(expression)):
             try:
-                # Safe evaluation (in production, use a safer math parser)
-                result = eval(expression)
+                result = evaluate(expression)
                 return f"The result is {result}."
-            except Exception as e:
+            except CalculationError as e:
                 return f"I couldn't calculate that expression. Error: {str(e)}"
         
         return "What would you like me to calculate?"
@@ -181,17 +264,16 @@ class CalculatorModule(AssistantModule):
 class MusicModule(AssistantModule):
     """Handle music and entertainment commands"""
     
-    def can_handle(self, command):
-        music_keywords = ['music', 'play', 'song', 'spotify', 'apple music']
-        return any(keyword in command.lower() for keyword in music_keywords)
+    keywords = ('music', 'play', 'song', 'spotify', 'apple music')
     
-    def execute(self, command, parameters=None):
-        command_lower = command.lower()
+    def execute(self, command, parameters=None, matches=None):
+        if matches is None:
+            matches = self.scan(command)
         
-        if 'spotify' in command_lower:
+        if 'spotify' in matches:
             webbrowser.open('https://open.spotify.com')
             return "I've opened Spotify for you."
-        elif 'apple music' in command_lower:
+        elif 'apple music' in matches:
             subprocess.run(['open', '-a', 'Music'])
             return "I've opened Apple Music for you."
         else:
@@ -201,22 +283,18 @@ class MusicModule(AssistantModule):
 class EmailModule(AssistantModule):
     """Handle email-related commands"""
     
-    def can_handle(self, command):
-        email_keywords = ['email', 'mail', 'send email', 'compose']
-        return any(keyword in command.lower() for keyword in email_keywords)
+    keywords = ('email', 'mail', 'send email', 'compose')
     
-    def execute(self, command, parameters=None):
+    def execute(self, command, parameters=None, matches=None):
         webbrowser.open('mailto:')
         return "I've opened your email client."
 
 class ReminderModule(AssistantModule):
     """Handle reminder and task management"""
     
-    def can_handle(self, command):
-        reminder_keywords = ['reminder', 'remind', 'task', 'todo']
-        return any(keyword in command.lower() for keyword in reminder_keywords)
+    keywords = ('reminder', 'remind', 'task', 'todo')
     
-    def execute(self, command, parameters=None):
+    def execute(self, command, parameters=None, matches=None):
         if parameters and 'text' in parameters:
             reminder_text = parameters['text']
             # In a real implementation, you'd integrate with a calendar/reminder app
@@ -228,48 +306,162 @@ class ReminderModule(AssistantModule):
 class SystemModule(AssistantModule):
     """Handle system-related commands"""
     
-    def can_handle(self, command):
-        system_keywords = ['volume', 'brightness', 'wifi', 'bluetooth', 'restart', 'shutdown']
-        return any(keyword in command.lower() for keyword in system_keywords)
+    keywords = ('volume', 'brightness', 'wifi', 'bluetooth', 'restart', 'shutdown')
     
-    def execute(self, command, parameters=None):
-        command_lower = command.lower()
+    def execute(self, command, parameters=None, matches=None):
+        if matches is None:
+            matches = self.scan(command)
         
-        if 'volume' in command_lower:
+        if 'volume' in matches:
             return "I can't control system volume yet, but you can use the volume controls on your device."
-        elif 'brightness' in command_lower:
+        elif 'brightness' in matches:
             return "I can't control screen brightness yet, but you can use the brightness controls on your device."
-        elif 'wifi' in command_lower:
+        elif 'wifi' in matches:
             subprocess.run(['open', 'x-apple.systempreferences:com.apple.preference.network'])
             return "I've opened network preferences for you."
-        elif 'bluetooth' in command_lower:
+        elif 'bluetooth' in matches:
             subprocess.run(['open', 'x-apple.systempreferences:com.apple.preference.bluetooth'])
             return "I've opened Bluetooth preferences for you."
         
         return "I can help you with some system settings. What would you like to adjust?"
 
-class ModuleManager:
-    """Manages all assistant modules"""
+class IntentRouter:
+    """Routes commands to modules with a single scan of a compiled keyword automaton
     
-    def __init__(self):
-        self.modules = [
-            WebSearchModule(),
-            ApplicationModule(),
-            TimeDateModule(),
-            NoteModule(),
-            WeatherModule(),
-            CalculatorModule(),
-            MusicModule(),
-            EmailModule(),
-            ReminderModule(),
-            SystemModule()
+    Modules that rely on the default keyword-based can_handle are compiled into one
+    automaton; modules that override can_handle are still asked in list order, so
+    the original first-match priority is preserved either way. Their keywords and
+    terms are scanned too, so they receive the same matches as compiled modules.
+    """
+    
+    def __init__(self, modules):
+        self.modules = list(modules)
+        # Module specs route by their keyword metadata; instances unless they override can_handle
+        self.compiled = [
+            isinstance(module, ModuleSpec)
+            or (bool(module.keywords) and type(module).can_handle is AssistantModule.can_handle)
+            for module in self.modules
         ]
+        # id(module) -> whether execute() takes matches, filled in on first execute
+        self.accepts_matches = {}
+        
+        # keyword -> index of the highest-priority module it routes to
+        self.owners = {}
+        vocabulary = []
+        for index, module in enumerate(self.modules):
+            if self.compiled[index]:
+                for keyword in module.keywords:
+                    self.owners.setdefault(keyword, index)
+            vocabulary.extend(module.keywords)
+            vocabulary.extend(module.terms)
+        self.automaton = KeywordAutomaton(vocabulary)
+        self.has_legacy = not all(self.compiled)
+    
+    def match(self, command):
+        """Find every keyword and term in the command in one pass"""
+        return self.automaton.find_all(command.lower())
+    
+    def route(self, command):
+        """Return (module, matches) for the first module that handles the command"""
+        matches = self.match(command)
+        best = min((self.owners[keyword] for keyword in matches if keyword in self.owners),
+                   default=None)
+        
+        if self.has_legacy:
+            limit = len(self.modules) if best is None else best
+            for index in range(limit):
+                if not self.compiled[index] and self.modules[index].can_handle(command):
+                    return self.modules[index], matches
+        
+        if best is None:
+            return None, matches
+        return self.modules[best], matches
+    
+    def execute(self, module, command, matches, parameters=None):
+        """Run a routed module, handing over the spans when it accepts them"""
+        accepts = self.accepts_matches.get(id(module))
+        if accepts is None:
+            accepts = self.accepts_matches[id(module)] = 'matches' in inspect.signature(module.execute).parameters
+        if accepts:
+            return module.execute(command, parameters, matches=matches)
+        return module.execute(command, parameters)
+
+class ModuleManager:
+    """Routes commands to the registered modules, creating each one on first use"""
+    
+    # Classifier intents that can stand in for a keyword match: intent -> (module name, keyword)
+    CLASSIFIER_INTENTS = {
+        'get_time': ('time_date', 'time'),
+        'get_date': ('time_date', 'date'),
+        'music': ('music', 'music'),
+        'send_email': ('email', 'email')
+    }
+    
+    def __init__(self, registry=None, note_store=None):
+        # Commands no keyword matches go to the local intent classifier (above 1 disables it)
+        self.classifier_threshold = float(os.getenv('CLASSIFIER_THRESHOLD', '0.6'))
+        self.registry = registry or ModuleRegistry.discover()
+        self.registry.services.setdefault('store', lambda: self.note_store)
+        if note_store is not None:
+            self.note_store = note_store  # the caller's store (e.g. VoiceAssistant.note_store)
+        self._routing = (None, None)  # (specs list, IntentRouter built from it)
+    
+    @property
+    def router(self):
+        """IntentRouter over the registry's specs, rebuilt after ModuleRegistry.add()"""
+        specs, router = self._routing
+        if specs is not self.registry.specs:
+            specs = self.registry.specs
+            router = IntentRouter(specs)
+            self._routing = (specs, router)
+        return router
+    
+    @property
+    def modules(self):
+        """Module specs in routing order (keywords and terms without importing anything)"""
+        return self.registry.specs
+    
+    @deferred
+    def note_store(self):
+        """Note store shared by the note modules: the process's store for NOTES_DIR"""
+        return shared_store()
+    
+    def resolve(self, entry):
+        """The module instance for a routing entry; specs are instantiated on first use"""
+        return self.registry.get(entry.name) if isinstance(entry, ModuleSpec) else entry
+    
+    def route(self, command):
+        """(module, matches) for the first module whose keywords match, or (None, matches)"""
+        entry, matches = self.router.route(command)
+        return (None if entry is None else self.resolve(entry)), matches
     
     def process_command(self, command):
         """Process a command through all available modules"""
-        for module in self.modules:
-            if module.can_handle(command):
-                return module.execute(command)
+        module, matches = self.route(command)
+        if module is None:
+            module, matches = self.classify(command)
+        if module is not None:
+            return self.router.execute(module, command, matches)
         
         return "I'm not sure how to help with that. Could you try rephrasing your request?"
-
+    
+    def classify(self, command):
+        """(module, matches) for a command no keyword matched ("how late is it"), or (None, None)
+        
+        Only near-exact matches of parameterless intents count, as in
+        VoiceAssistant.classify_with_model ("what is it" is not a time question).
+        """
+        if self.classifier_threshold > 1:
+            return None, None
+        from intent_classifier import answers_alone, load_default
+        action, score = load_default().classify(command)
+        if not answers_alone(action, score, self.classifier_threshold) or action not in self.CLASSIFIER_INTENTS:
+            return None, None
+        name, keyword = self.CLASSIFIER_INTENTS[action]
+        if self.registry.spec(name) is None:
+            return None, None
+        return self.registry.get(name), {keyword: []}
+    
+    def close(self):
+        if is_initialized(self, 'note_store'):
+            self.note_store.close()
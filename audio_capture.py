@@ -0,0 +1,212 @@
+"""
+Persistent microphone capture.
+Keeps one input stream open for the whole session, writes every frame into a
+preallocated ring buffer, and uses a simple energy-based voice-activity
+detector to slice utterances (with a little pre-roll) out of it. If the
+stream fails (device unplugged, input overflow), it is reopened; when that
+fails too, listen() raises CaptureError.
+"""
+
+import queue
+import threading
+import time
+import numpy as np
+import speech_recognition as sr
+from noise_estimator import SAMPLE_TYPES, frame_rms
+
+class CaptureError(OSError):
+    """The microphone stream failed and could not be reopened"""
+
+class ContinuousCapture:
+    """Single long-lived microphone stream feeding a VAD over a ring buffer"""
+
+    def __init__(self, microphone, noise_estimator, buffer_seconds=30, pre_roll=0.3,
+                 pause_threshold=0.8, min_speech=0.1, phrase_time_limit=10, max_pending=4,
+                 reopen_attempts=3, retry_delay=1.0, log=print):
+        self.microphone = microphone
+        self.noise_estimator = noise_estimator
+        self.recognizer = noise_estimator.recognizer
+        self.buffer_seconds = buffer_seconds
+        self.pre_roll = pre_roll
+        self.pause_threshold = pause_threshold
+        self.min_speech = min_speech
+        self.phrase_time_limit = phrase_time_limit
+        self.reopen_attempts = reopen_attempts
+        self.retry_delay = retry_delay
+        self.log = log
+
+        # Finished utterances waiting for listen(); oldest is dropped when full
+        self.utterances = queue.Queue(maxsize=max_pending)
+        self.dropped = 0
+        # Optional callback fired when the VAD detects the start of speech
+        self.on_speech_start = None
+
+        self.running = False
+        self.thread = None
+        self.error = None  # CaptureError from the capture thread, raised by the next listen()
+        self.failed_at = None
+        self.reopens = 0
+        self.ring = None
+        self.written = 0  # total samples ever written; ring index is written % len(ring)
+
+    def start(self):
+        """Open the microphone once and start filling the ring buffer"""
+        if self.running:
+            return
+        # Don't hammer a device that just failed
+        if self.failed_at is not None:
+            time.sleep(max(0.0, self.failed_at + self.retry_delay - time.monotonic()))
+        try:
+            source = self.microphone.__enter__()
+        except OSError as e:
+            self.failed_at = time.monotonic()
+            raise CaptureError(f"can't open the microphone: {e}") from e
+        self.failed_at = None
+        self.stream = source.stream
+        self.chunk = source.CHUNK
+        self.sample_rate = source.SAMPLE_RATE
+        self.sample_width = source.SAMPLE_WIDTH
+        self.ring = np.zeros(int(self.buffer_seconds * self.sample_rate),
+                             dtype=SAMPLE_TYPES[self.sample_width])
+        self.written = 0
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop capturing and release the microphone"""
+        if not self.running:
+            return
+        self.running = False
+        self.thread.join(timeout=2)
+        self._release()
+
+    def listen(self, timeout=None):
+        """Return the next utterance as sr.AudioData, like Recognizer.listen
+
+        Raises CaptureError if the stream failed; the next call reopens it.
+        """
+        self.start()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                return self.utterances.get(timeout=0.1)
+            except queue.Empty:
+                pass
+            if self.error is not None:
+                error, self.error = self.error, None
+                raise error
+            if deadline is not None and time.monotonic() >= deadline:
+                raise sr.WaitTimeoutError("listening timed out while waiting for phrase to start")
+
+    def clear(self):
+        """Discard utterances captured while nobody was listening"""
+        while True:
+            try:
+                self.utterances.get_nowait()
+            except queue.Empty:
+                return
+
+    def _run(self):
+        frame_seconds = float(self.chunk) / self.sample_rate
+        start_frames = max(1, int(round(self.min_speech / frame_seconds)))
+        pause_frames = max(1, int(round(self.pause_threshold / frame_seconds)))
+        max_samples = int(self.phrase_time_limit * self.sample_rate)
+        pre_roll_samples = int(self.pre_roll * self.sample_rate)
+
+        speech_run = 0       # consecutive loud frames before speech is confirmed
+        silence_run = 0      # consecutive quiet frames inside an utterance
+        utterance_start = None
+        failures = 0         # stream failures since the last good read
+
+        while self.running:
+            try:
+                data = self.stream.read(self.chunk)
+                if not data:
+                    raise OSError("the input stream ended")
+            except (IOError, OSError) as e:
+                if not self.running:
+                    break
+                self.log(f"Microphone stream failed: {e}")
+                failures += 1
+                if failures > self.reopen_attempts or not self._reopen(failures):
+                    self.error = CaptureError(f"microphone stream failed: {e}")
+                    self.failed_at = time.monotonic()
+                    self.running = False
+                    self._release()
+                    break
+                # Whatever was being said was cut off
+                speech_run = silence_run = 0
+                utterance_start = None
+                continue
+            failures = 0
+            self._write(data)
+            self.noise_estimator.update(data, self.sample_width)
+            loud = frame_rms(data, self.sample_width) > self.recognizer.energy_threshold
+
+            if utterance_start is None:
+                speech_run = speech_run + 1 if loud else 0
+                if speech_run >= start_frames:
+                    # Back up over the frames that confirmed speech, plus the pre-roll
+                    start = self.written - speech_run * self.chunk - pre_roll_samples
+                    utterance_start = max(start, self.written - len(self.ring), 0)
+                    silence_run = 0
+                    if self.on_speech_start:
+                        self.on_speech_start()
+                continue
+
+            silence_run = 0 if loud else silence_run + 1
+            too_long = self.written - utterance_start >= max_samples
+            if silence_run >= pause_frames or too_long:
+                self._emit(utterance_start, self.written)
+                utterance_start = None
+                speech_run = 0
+
+    def _reopen(self, attempt):
+        """Close and reopen the microphone, backing off a little more on each attempt"""
+        self._release()
+        time.sleep(self.retry_delay * (attempt - 1))
+        try:
+            self.stream = self.microphone.__enter__().stream
+        except OSError as e:
+            self.log(f"Reopening the microphone failed: {e}")
+            return False
+        self.reopens += 1
+        return True
+
+    def _release(self):
+        try:
+            self.microphone.__exit__(None, None, None)
+        except Exception:
+            pass
+
+    def _write(self, data):
+        samples = np.frombuffer(data, dtype=self.ring.dtype)
+        size = len(self.ring)
+        offset = self.written % size
+        first = min(len(samples), size - offset)
+        self.ring[offset:offset + first] = samples[:first]
+        if first < len(samples):
+            self.ring[:len(samples) - first] = samples[first:]
+        self.written += len(samples)
+
+    def _emit(self, start, end):
+        size = len(self.ring)
+        start = max(start, end - size)
+        first, last = start % size, end % size
+        if first < last:
+            samples = self.ring[first:last]
+        else:
+            samples = np.concatenate((self.ring[first:], self.ring[:last]))
+        audio = sr.AudioData(samples.tobytes(), self.sample_rate, self.sample_width)
+
+        try:
+            self.utterances.put_nowait(audio)
+        except queue.Full:
+            # Keep the newest speech; the oldest pending utterance is stale anyway
+            try:
+                self.utterances.get_nowait()
+            except queue.Empty:
+                pass
+            self.dropped += 1
+            self.utterances.put_nowait(audio)
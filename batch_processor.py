@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Headless Batch Command Processor
+Reads commands from a file or stdin, routes them through ModuleManager or the
+local intent parser on a thread or process pool, and streams one JSON result
+per line. Use --dry-run to replay command logs without opening anything.
+"""
+
+import argparse
+import json
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import side_effects
+from local_intents import parse_command_locally
+
+_module_manager = None
+
+def get_module_manager():
+    """One ModuleManager per process, built on first use"""
+    global _module_manager
+    if _module_manager is None:
+        from assistant_modules import ModuleManager
+        _module_manager = ModuleManager()
+    return _module_manager
+
+def init_worker(dry_run, router):
+    """Pool initializer: set up dry-run and the router before any command is timed"""
+    if dry_run:
+        side_effects.enable_dry_run()
+    if router == 'modules':
+        get_module_manager()
+
+def read_commands(stream):
+    """Yield commands from plain text lines or JSONL records with a 'command' field"""
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith('{'):
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                yield line
+                continue
+            command = record.get('command') or record.get('text')
+            if command:
+                yield command
+        else:
+            yield line
+
+def process_one(job):
+    """Route a single command and return its result record"""
+    index, command, router = job
+    side_effects.take_recorded()
+    started = time.perf_counter()
+    result = {'index': index, 'command': command, 'router': router}
+    try:
+        if router == 'local':
+            parsed = parse_command_locally(command)
+            result.update(action=parsed.get('action'), parameters=parsed.get('parameters', {}),
+                          response=parsed.get('response'))
+        else:
+            manager = get_module_manager()
+            module, matches = manager.route(command)
+            if module is None:
+                result.update(action=None, parameters={}, response=manager.process_command(command))
+            else:
+                response = manager.router.execute(module, command, matches)
+                result.update(action=type(module).__name__, parameters={'matches': sorted(matches)},
+                              response=response)
+    except Exception as e:
+        result['error'] = str(e)
+    result['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 3)
+    effects = side_effects.take_recorded()
+    if effects:
+        result['side_effects'] = effects
+    return result
+
+def run_batch(commands, output, router='modules', workers=4, executor='thread', dry_run=False):
+    """Process commands in parallel, writing results to output in input order"""
+    init_worker(dry_run, router)
+
+    pool_class = ProcessPoolExecutor if executor == 'process' else ThreadPoolExecutor
+    window = deque()
+    count = 0
+    started = time.perf_counter()
+    with pool_class(max_workers=workers, initializer=init_worker, initargs=(dry_run, router)) as pool:
+        # Keep a bounded number of commands in flight so huge logs stream instead of piling up
+        for index, command in enumerate(commands):
+            window.append(pool.submit(process_one, (index, command, router)))
+            if len(window) >= workers * 4:
+                output.write(json.dumps(window.popleft().result()) + '\n')
+                count += 1
+        while window:
+            output.write(json.dumps(window.popleft().result()) + '\n')
+            count += 1
+    output.flush()
+    return count, time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description="Process assistant commands without the GUI")
+    parser.add_argument('input', nargs='?', help="file with one command per line (or JSONL); default stdin")
+    parser.add_argument('-o', '--output', help="write JSONL results here instead of stdout")
+    parser.add_argument('--router', choices=['modules', 'local'], default='modules',
+                        help="ModuleManager or the local intent parser (default: modules)")
+    parser.add_argument('--workers', type=int, default=4, help="pool size (default: 4)")
+    parser.add_argument('--executor', choices=['thread', 'process'], default='thread',
+                        help="thread or process pool (default: thread)")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="record browser/app launches instead of performing them")
+    args = parser.parse_args()
+
+    source = open(args.input) if args.input else sys.stdin
+    output = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        count, elapsed = run_batch(read_commands(source), output, args.router,
+                                   args.workers, args.executor, args.dry_run)
+    finally:
+        if args.input:
+            source.close()
+        if args.output:
+            output.close()
+
+    rate = count / elapsed if elapsed else 0.0
+    print(f"Processed {count} commands in {elapsed:.2f}s ({rate:.0f} commands/sec)", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Intent Routing Benchmarks
+Generates a synthetic command corpus and measures throughput and tail latency
+of each routing path (ModuleManager.process_command, the compiled router, the
+plain can_handle chain and parse_command_locally) with side effects stubbed.
+Results are written as JSON so runs can be compared to catch regressions.
+"""
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+
+import side_effects
+from assistant_modules import AssistantModule, ModuleManager
+from local_intents import parse_command_locally
+from module_registry import ModuleRegistry, ModuleSpec
+
+FILLER = ['please', 'can you', 'the', 'my', 'now', 'quickly', 'for me', 'about', 'new york',
+          'london', 'cats', 'python', 'tomorrow morning', 'report', 'mom', 'something']
+TEMPLATES = ['{kw}', '{kw} {fill}', '{fill} {kw}', '{fill} {kw} {fill}', '{kw} {fill} {fill}']
+
+class SyntheticModule(AssistantModule):
+    """Stand-in module used to grow the keyword tables"""
+
+    def __init__(self, keywords):
+        self.keywords = tuple(keywords)
+
+    def execute(self, command, parameters=None, matches=None):
+        return "Synthetic response."
+
+def build_manager(extra_modules=0, keywords_per_module=8, seed=0):
+    """ModuleManager with optional synthetic modules appended after the built-in ones"""
+    registry = ModuleRegistry.discover(entry_points=False)
+    rng = random.Random(seed)
+    for index in range(extra_modules):
+        words = [f"kw{index}x{rng.randrange(10 ** 6)}" for _ in range(keywords_per_module)]
+        registry.add(ModuleSpec(f"synthetic{index}", "benchmark_routing:SyntheticModule", words,
+                                options={'keywords': words}))
+    return ModuleManager(registry)
+
+def generate_corpus(manager, size, collision_rate=0.2, miss_rate=0.1, seed=0):
+    """Synthetic commands; collision_rate of them contain keywords of two or more modules"""
+    rng = random.Random(seed)
+    tables = [module.keywords for module in manager.modules if module.keywords]
+    corpus = []
+    for _ in range(size):
+        roll = rng.random()
+        if roll < miss_rate:
+            words = rng.sample(FILLER, 3)
+        else:
+            picks = rng.sample(tables, rng.randint(2, 3)) if roll < miss_rate + collision_rate else [rng.choice(tables)]
+            words = [rng.choice(TEMPLATES).format(kw=rng.choice(table), fill=rng.choice(FILLER))
+                     for table in picks]
+        corpus.append(' '.join(words))
+    return corpus
+
+def can_handle_chain(manager, command):
+    """The original routing: ask every module in turn"""
+    for module in manager.modules:
+        if module.can_handle(command):
+            return module
+    return None
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def measure(function, corpus, repeat=1):
+    """Time function(command) for every command; returns throughput and latency percentiles"""
+    for command in corpus[:min(len(corpus), 200)]:
+        function(command)  # warm-up
+
+    latencies = []
+    clock = time.perf_counter_ns
+    total_started = clock()
+    for _ in range(repeat):
+        for command in corpus:
+            started = clock()
+            function(command)
+            latencies.append(clock() - started)
+            side_effects.take_recorded()
+    total = (clock() - total_started) / 1e9
+
+    latencies.sort()
+    return {
+        'commands': len(latencies),
+        'commands_per_sec': round(len(latencies) / total, 1) if total else 0.0,
+        'p50_us': round(percentile(latencies, 0.50) / 1000, 3),
+        'p95_us': round(percentile(latencies, 0.95) / 1000, 3),
+        'p99_us': round(percentile(latencies, 0.99) / 1000, 3),
+        'max_us': round(latencies[-1] / 1000, 3) if latencies else 0.0
+    }
+
+def run_benchmarks(size=10000, collision_rate=0.2, extra_modules=0, keywords_per_module=8,
+                   repeat=1, seed=0):
+    """Run every routing path over the same corpus and return the JSON-ready report"""
+    side_effects.enable_dry_run()
+    manager = build_manager(extra_modules, keywords_per_module, seed)
+    corpus = generate_corpus(manager, size, collision_rate, seed=seed)
+
+    paths = {
+        'module_manager.process_command': manager.process_command,
+        'intent_router.route': manager.router.route,
+        'can_handle_chain': lambda command: can_handle_chain(manager, command),
+        'parse_command_locally': parse_command_locally
+    }
+    return {
+        'config': {
+            'corpus_size': size,
+            'collision_rate': collision_rate,
+            'modules': len(manager.modules),
+            'keywords': sum(len(module.keywords) for module in manager.modules),
+            'repeat': repeat,
+            'seed': seed,
+            'python': platform.python_version()
+        },
+        'results': {name: measure(function, corpus, repeat) for name, function in paths.items()}
+    }
+
+def compare(report, baseline, tolerance):
+    """Return the paths whose throughput dropped more than tolerance below the baseline"""
+    regressions = []
+    for name, result in report['results'].items():
+        before = baseline.get('results', {}).get(name)
+        if not before or not before['commands_per_sec']:
+            continue
+        change = result['commands_per_sec'] / before['commands_per_sec'] - 1
+        if change < -tolerance:
+            regressions.append(f"{name}: {before['commands_per_sec']} -> {result['commands_per_sec']} commands/sec ({change:+.0%})")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark intent routing paths")
+    parser.add_argument('--size', type=int, default=10000, help="commands in the corpus (default: 10000)")
+    parser.add_argument('--collision-rate', type=float, default=0.2,
+                        help="fraction of commands with keywords from several modules (default: 0.2)")
+    parser.add_argument('--extra-modules', type=int, default=0,
+                        help="synthetic modules added to grow the keyword tables")
+    parser.add_argument('--keywords-per-module', type=int, default=8)
+    parser.add_argument('--repeat', type=int, default=1, help="passes over the corpus")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', help="write the JSON report here instead of stdout")
+    parser.add_argument('--baseline', help="earlier JSON report to compare throughput against")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="allowed throughput drop vs. the baseline (default: 0.2)")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.size, args.collision_rate, args.extra_modules,
+                            args.keywords_per_module, args.repeat, args.seed)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Conversation memory for LLM requests.
+The most recent turns are kept word for word; older turns are folded into a
+rolling summary of one short line each ("weather in london -> It's 14°C and
+cloudy in London."). Before each LLM request the context is packed against
+a hard token budget, newest turns first, so follow-ups like "and in Paris?"
+work while the prompt stays the same size however long the session runs.
+Tokens are counted locally, with tiktoken when it is installed and an
+approximation otherwise.
+
+    python conversation_memory.py "weather in london" "and in paris?"
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import deque
+
+MESSAGE_OVERHEAD = 4  # tokens the chat format adds around each message
+SUMMARY_WORDS = 12  # words of a reply kept on its summary line
+
+# Signs that a command leans on what was said before ("and in paris?", "open that one")
+FOLLOW_UP_STARTS = ('and ', 'but ', 'also ', 'then ', 'what about ', 'how about ', 'same ')
+FOLLOW_UP_WORDS = {
+    'that', 'this', 'these', 'those', 'them', 'they', 'there', 'he', 'she', 'him', 'her', 'his',
+    'its', 'one', 'again', 'instead', 'else', 'another', 'too', 'also', 'more'
+}
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+def _tokenizer():
+    """tiktoken's encode function, or False when tiktoken or its encoding is unavailable"""
+    global _encoding
+    with _encoding_lock:
+        if _encoding is None:
+            try:
+                import tiktoken
+                _encoding = tiktoken.get_encoding(os.getenv('TOKEN_ENCODING', 'o200k_base')).encode
+            except Exception:  # not installed, or the encoding can't be downloaded
+                _encoding = False
+        return _encoding
+
+def count_tokens(text):
+    """Token count of text: exact with tiktoken, else about one token per 4 characters of each word"""
+    encode = _tokenizer()
+    if encode:
+        return len(encode(text))
+    return sum(math.ceil(len(piece) / 4) for piece in re.findall(r"\w+|[^\w\s]", text))
+
+def message_tokens(message):
+    return count_tokens(message['content']) + MESSAGE_OVERHEAD
+
+def _shorten(text, words):
+    parts = text.split()
+    return ' '.join(parts[:words]) + (' ...' if len(parts) > words else '')
+
+class ConversationMemory:
+    """Recent turns verbatim plus a rolling summary, packed to a token budget
+
+    budget caps the tokens of context sent with a request (0 disables
+    memory); the summary gets at most summary_budget of them.
+    """
+
+    def __init__(self, budget=300, recent_turns=4, summary_budget=100):
+        self.budget = budget
+        self.summary_budget = summary_budget
+        self.recent = deque(maxlen=max(1, recent_turns))  # (command, reply, tokens)
+        self.summary = deque()  # (line, tokens), oldest first
+        self.summary_tokens = 0
+        self.lock = threading.Lock()
+        self.turns = 0
+        self.summarized = 0
+        self.packed = deque(maxlen=200)  # (tokens, seconds) of recent context() calls
+
+    @classmethod
+    def from_env(cls):
+        return cls(int(os.getenv('CONTEXT_TOKEN_BUDGET', '300')),
+                   int(os.getenv('CONTEXT_RECENT_TURNS', '4')),
+                   int(os.getenv('CONTEXT_SUMMARY_TOKENS', '100')))
+
+    def add(self, command, reply):
+        """Remember a finished turn; the oldest recent turn moves into the summary"""
+        if self.budget <= 0 or not command:
+            return
+        reply = reply or ''
+        tokens = count_tokens(command) + count_tokens(reply) + 2 * MESSAGE_OVERHEAD
+        with self.lock:
+            self.turns += 1
+            if len(self.recent) == self.recent.maxlen:
+                self._summarize(*self.recent[0][:2])
+            self.recent.append((command, reply, tokens))
+
+    def _summarize(self, command, reply):
+        line = f"{command} -> {_shorten(reply, SUMMARY_WORDS)}" if reply else command
+        tokens = count_tokens(line) + 1
+        self.summary.append((line, tokens))
+        self.summary_tokens += tokens
+        self.summarized += 1
+        # Rolling: the oldest lines go once the summary is over its budget
+        while self.summary and self.summary_tokens > self.summary_budget:
+            self.summary_tokens -= self.summary.popleft()[1]
+
+    def context(self):
+        """(messages, tokens): the remembered conversation as chat messages within the budget
+
+        Recent turns are taken newest first until the next one would not fit;
+        the summary fills what is left, again newest line first.
+        """
+        started = time.perf_counter()
+        with self.lock:
+            remaining = self.budget
+            turns = []
+            for command, reply, tokens in reversed(self.recent):
+                if tokens > remaining:
+                    break
+                turns.append((command, reply))
+                remaining -= tokens
+            lines = []
+            if len(turns) == len(self.recent):
+                remaining -= MESSAGE_OVERHEAD + count_tokens("Earlier in this conversation:")
+                for line, tokens in reversed(self.summary):
+                    if tokens > remaining:
+                        break
+                    lines.append(line)
+                    remaining -= tokens
+        messages = []
+        if lines:
+            messages.append({"role": "system",
+                             "content": "Earlier in this conversation:\n" + "\n".join(reversed(lines))})
+        for command, reply in reversed(turns):
+            messages.append({"role": "user", "content": command})
+            messages.append({"role": "assistant", "content": reply})
+        tokens = sum(message_tokens(message) for message in messages)
+        self.packed.append((tokens, time.perf_counter() - started))
+        return messages, tokens
+
+    def clear(self):
+        with self.lock:
+            self.recent.clear()
+            self.summary.clear()
+            self.summary_tokens = 0
+
+    def stats(self):
+        """Turns remembered and summarized, and the size and packing time of recent contexts"""
+        packed = list(self.packed)
+        return {
+            'turns': self.turns,
+            'summarized': self.summarized,
+            'recent': len(self.recent),
+            'summary_lines': len(self.summary),
+            'mean_context_tokens': round(sum(t for t, _ in packed) / len(packed), 1) if packed else 0.0,
+            'max_context_tokens': max((t for t, _ in packed), default=0),
+            'mean_pack_ms': round(sum(s for _, s in packed) / len(packed) * 1000, 3) if packed else 0.0
+        }
+
+def is_follow_up(command):
+    """True when a command may mean something else after a different conversation
+
+    Elliptical commands of one or two words, commands starting like "and
+    ..." or "what about ...", and commands referring back ("that", "there")
+    count; self-contained ones like "tell me a joke" don't.
+    """
+    text = command.lower().strip()
+    words = re.findall(r"[\w']+", text)
+    if len(words) <= 2 or text.startswith(FOLLOW_UP_STARTS):
+        return True
+    return any(word in FOLLOW_UP_WORDS for word in words)
+
+def context_digest(messages):
+    """Short digest of context messages for cache keys ('' without context)"""
+    if not messages:
+        return ''
+    return hashlib.sha256(json.dumps(messages, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the context packed for a sequence of commands")
+    parser.add_argument('commands', nargs='+')
+    parser.add_argument('--budget', type=int, default=int(os.getenv('CONTEXT_TOKEN_BUDGET', '300')))
+    parser.add_argument('--recent', type=int, default=int(os.getenv('CONTEXT_RECENT_TURNS', '4')))
+    args = parser.parse_args()
+
+    memory = ConversationMemory(args.budget, args.recent)
+    print(f"Token counter: {'tiktoken' if _tokenizer() else 'approximate'}")
+    for command in args.commands:
+        messages, tokens = memory.context()
+        follow_up = "follow-up, " if is_follow_up(command) else ""
+        print(f"\n> {command}  ({follow_up}{tokens} context tokens)")
+        for message in messages:
+            print(f"  {message['role']}: {message['content']}")
+        memory.add(command, f"(reply to '{command}')")
+    print(json.dumps(memory.stats(), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Thread-safe, batched log output for the Tk conversation window.
+Worker threads append lines without touching Tk; the Tk thread drains them
+periodically with one insert and one scroll per batch, and old lines are
+trimmed so the widget stays a fixed size during long sessions.
+"""
+
+import sys
+from collections import deque
+
+class LogChannel:
+    """Buffers text from any thread and flushes it into a Tk text widget on the Tk thread"""
+
+    def __init__(self, root, widget, max_lines=2000, interval_ms=50):
+        self.root = root
+        self.widget = widget
+        self.max_lines = max_lines
+        self.interval_ms = interval_ms
+        # deque.append/popleft are atomic, so producers never need a lock
+        self.pending = deque()
+        self.callbacks = deque()
+        self.root.after(self.interval_ms, self._drain)
+
+    def write(self, text):
+        """Queue text for the conversation window (safe from any thread)"""
+        self.pending.append(text)
+
+    def post(self, callback):
+        """Run callback on the Tk thread with the next batch (e.g. to update a label)"""
+        self.callbacks.append(callback)
+
+    def _drain(self):
+        try:
+            chunks = []
+            while True:
+                try:
+                    chunks.append(self.pending.popleft())
+                except IndexError:
+                    break
+            if chunks:
+                self.widget.insert('end', ''.join(chunks))
+                self._trim()
+                self.widget.see('end')
+
+            while True:
+                try:
+                    callback = self.callbacks.popleft()
+                except IndexError:
+                    break
+                callback()
+        finally:
+            self.root.after(self.interval_ms, self._drain)
+
+    def _trim(self):
+        # 'end-1c' is the last real character; its line number is the line count
+        lines = int(self.widget.index('end-1c').split('.')[0])
+        if lines > self.max_lines:
+            self.widget.delete('1.0', f'{lines - self.max_lines + 1}.0')
+
+class ConsoleLog:
+    """LogChannel stand-in for text-only mode: writes straight to stdout"""
+
+    def write(self, text):
+        sys.stdout.write(text)
+        sys.stdout.flush()
+
+    def post(self, callback):
+        callback()
@@ -0,0 +1,179 @@
+"""
+Persistent cache for LLM intent classification results.
+Repeated commands ("what time is it") are answered from memory or SQLite
+instead of making another round trip to the OpenAI API.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+def normalize_command(command):
+    """Normalize a command so trivially different phrasings share a cache entry"""
+    return ' '.join(command.lower().split()).strip(' .,!?')
+
+class IntentCache:
+    """LRU cache of parsed {action, parameters, response} results with a TTL and SQLite backing
+
+    Hits don't write to SQLite: their last-used times are collected and
+    written in one transaction every touch_batch hits, before the next put
+    and on flush() / close().
+    """
+
+    def __init__(self, path="intent_cache.db", max_entries=1000, ttl=7 * 24 * 3600, touch_batch=64):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.touch_batch = touch_batch
+        self.lock = threading.Lock()
+        # key -> (created, parsed_json, latency, tokens)
+        self.memory = OrderedDict()
+        self.touched = {}  # key -> last-used time not yet written to SQLite
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.saved_seconds = 0.0
+        self.saved_tokens = 0
+
+        self.db = None
+        if path:
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS intents ("
+                "key TEXT PRIMARY KEY, parsed TEXT NOT NULL, created REAL NOT NULL, "
+                "last_used REAL NOT NULL, latency REAL NOT NULL, tokens INTEGER NOT NULL)"
+            )
+            self.db.commit()
+            self.rows = self.db.execute("SELECT COUNT(*) FROM intents").fetchone()[0]
+
+    def make_key(self, command, model, system_prompt):
+        """Build the cache key from the normalized command, model and system prompt"""
+        digest = hashlib.sha256()
+        for part in (normalize_command(command), model, system_prompt):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Return the cached parsed result for key, or None on a miss"""
+        now = time.time()
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is None and self.db is not None:
+                row = self.db.execute(
+                    "SELECT created, parsed, latency, tokens FROM intents WHERE key = ?", (key,)
+                ).fetchone()
+                if row:
+                    entry = tuple(row)
+                    self._remember(key, entry)
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            created, parsed, latency, tokens = entry
+            if self.ttl and now - created > self.ttl:
+                self._forget(key)
+                self.misses += 1
+                return None
+
+            self.memory.move_to_end(key)
+            self.hits += 1
+            self.saved_seconds += latency
+            self.saved_tokens += tokens
+            if self.db is not None:
+                self.touched[key] = now
+                if len(self.touched) >= self.touch_batch:
+                    self._write_touched()
+
+        # Decode outside the lock; every hit gets its own copy
+        return json.loads(parsed)
+
+    def put(self, key, parsed, latency=0.0, tokens=0):
+        """Store a parsed result along with what it cost to produce"""
+        now = time.time()
+        entry = (now, json.dumps(parsed), latency, tokens)
+        with self.lock:
+            self._remember(key, entry)
+            if self.db is not None:
+                self.touched.pop(key, None)
+                self._write_touched(commit=False)
+                new = self.db.execute("SELECT 1 FROM intents WHERE key = ?", (key,)).fetchone() is None
+                self.db.execute(
+                    "INSERT OR REPLACE INTO intents (key, parsed, created, last_used, latency, tokens) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, entry[1], now, now, latency, tokens)
+                )
+                self.rows += new
+                # Keep the on-disk table bounded to the most recently used entries
+                if self.rows > self.max_entries:
+                    self.db.execute(
+                        "DELETE FROM intents WHERE key IN "
+                        "(SELECT key FROM intents ORDER BY last_used LIMIT ?)",
+                        (self.rows - self.max_entries,)
+                    )
+                    self.rows = self.max_entries
+                self.db.commit()
+
+    def clear(self):
+        """Drop every cached entry"""
+        with self.lock:
+            self.memory.clear()
+            self.touched.clear()
+            if self.db is not None:
+                self.db.execute("DELETE FROM intents")
+                self.db.commit()
+                self.rows = 0
+
+    def flush(self):
+        """Write the last-used times of recent hits to SQLite"""
+        with self.lock:
+            if self.db is not None:
+                self._write_touched()
+
+    def close(self):
+        with self.lock:
+            if self.db is not None:
+                self._write_touched()
+                self.db.close()
+                self.db = None
+
+    def stats(self):
+        """Return hit/miss counters and the latency and tokens saved by hits"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self.memory),
+                'evictions': self.evictions,
+                'saved_seconds': round(self.saved_seconds, 3),
+                'saved_tokens': self.saved_tokens
+            }
+
+    def _remember(self, key, entry):
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+            self.evictions += 1
+
+    def _forget(self, key):
+        self.memory.pop(key, None)
+        self.touched.pop(key, None)
+        if self.db is not None:
+            self.rows -= self.db.execute("DELETE FROM intents WHERE key = ?", (key,)).rowcount
+            self.db.commit()
+
+    def _write_touched(self, commit=True):
+        if self.touched:
+            self.db.executemany("UPDATE intents SET last_used = ? WHERE key = ?",
+                                [(used, key) for key, used in self.touched.items()])
+            self.touched.clear()
+            if commit:
+                self.db.commit()
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Local intent classifier.
+Example utterances of every intent are turned into hashed character n-gram
+TF-IDF vectors and kept as one dense, row-normalized NumPy matrix. Scoring a
+command is a single matrix-vector product against all examples ("how late
+is it" lands next to "what time is it" without sharing a keyword); a batch
+is a single matrix-matrix product. The model is retrained from logged
+commands and saved as .npy files that load memory-mapped.
+
+    python intent_classifier.py train intent_log.jsonl
+    python intent_classifier.py predict "how late is it" "put on some tunes"
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import zlib
+
+from intent_cache import normalize_command
+
+DIMENSIONS = 4096
+NGRAMS = (2, 3, 4)
+MAX_EXAMPLES_PER_INTENT = 300
+
+# Built-in examples, so the classifier works before anything has been logged
+SEED_EXAMPLES = {
+    'get_time': (
+        "what time is it", "what's the time", "how late is it", "tell me the time",
+        "do you have the time", "what hour is it", "current time", "is it late already",
+        "what's the time right now", "got the time", "time check", "how early is it"
+    ),
+    'get_date': (
+        "what's the date", "what day is it", "what is today's date", "which day is today",
+        "tell me the date", "what's the date today", "what month is it", "what year is it",
+        "what day of the week is it", "today's date please"
+    ),
+    'web_search': (
+        "search for pizza places", "look up the capital of france", "google how to tie a tie",
+        "find information about black holes", "search the web for cheap flights",
+        "look online for bike shops", "browse for running shoes"
+    ),
+    'open_application': (
+        "open chrome", "launch spotify", "start the calculator app", "bring up safari",
+        "fire up the terminal", "open my mail app", "launch notes", "start the browser"
+    ),
+    'create_note': (
+        "take a note buy milk", "write this down call the bank", "create a note about the meeting",
+        "make a note that rent is due friday", "jot down pick up the dry cleaning",
+        "remember that my locker code is 42", "save a note"
+    ),
+    'find_note': (
+        "what did i write about the meeting", "find my note about groceries",
+        "search my notes for passwords", "show my notes about the trip", "do i have notes on taxes",
+        "read my notes", "what's in my notes about work"
+    ),
+    'send_email': (
+        "send an email", "compose an email", "write an email to my boss", "open my inbox",
+        "check my email", "i need to email someone", "draft an email", "new mail message"
+    ),
+    'weather': (
+        "what's the weather like", "is it going to rain today", "do i need an umbrella",
+        "how hot is it outside", "weather in london", "what's the forecast for tomorrow",
+        "is it cold outside", "will it snow this weekend", "how warm is it today"
+    ),
+    'calculator': (
+        "what is 5 plus 3", "calculate 12 times 8", "how much is 15 percent of 80",
+        "what's 100 divided by 4", "square root of 144", "add 7 and 9",
+        "compute 3 to the power of 4", "what's 20 minus 6"
+    ),
+    'music': (
+        "play some music", "put on a song", "play my playlist", "i want to listen to jazz",
+        "start playing music", "play something relaxing", "put on some tunes", "music please"
+    ),
+    'reminder': (
+        "remind me to call mom at 5", "set a reminder for the dentist",
+        "don't let me forget to water the plants", "add a reminder to pay rent",
+        "remind me tomorrow morning", "make sure i remember the meeting"
+    ),
+    'general_chat': (
+        "tell me a joke", "how are you", "who are you", "what can you do", "thank you",
+        "good morning", "what is the meaning of life", "who wrote hamlet", "explain quantum physics",
+        "hello there", "i'm bored", "what's your name", "that's funny", "never mind"
+    )
+}
+
+# Intents that need nothing extracted from the command, so a classification alone can answer them
+PARAMETERLESS_INTENTS = ('get_time', 'get_date', 'send_email', 'music')
+# Similarity of a command that is essentially one of the examples. Below it the
+# command carries words the examples don't ("what time is it in tokyo"), which
+# may be parameters a parameterless intent would drop.
+EXACT_MATCH = 0.85
+
+def answers_alone(action, score, threshold=0.6):
+    """True when a classification can be acted on without keywords or the LLM
+
+    Only parameterless intents qualify, and only for commands close to one
+    of their examples (EXACT_MATCH, or threshold when that is higher).
+    """
+    return action in PARAMETERLESS_INTENTS and score >= max(threshold, EXACT_MATCH)
+
+def _ngram_ids(text, dimensions):
+    """Bucket ids of the character n-grams of each word (padded with spaces, like " late ")"""
+    ids = []
+    for word in normalize_command(text).split():
+        padded = f" {word} "
+        for n in NGRAMS:
+            for start in range(max(1, len(padded) - n + 1)):
+                ids.append(zlib.crc32(padded[start:start + n].encode('utf-8')) % dimensions)
+    return ids
+
+def _count_ngrams(np, texts, dimensions):
+    """(texts x dimensions) n-gram count matrix, filled with one bincount"""
+    cells = [row * dimensions + bucket for row, text in enumerate(texts) for bucket in _ngram_ids(text, dimensions)]
+    counts = np.bincount(np.asarray(cells, dtype=np.int64), minlength=len(texts) * dimensions)
+    return counts.reshape(len(texts), dimensions).astype(np.float32)
+
+class IntentClassifier:
+    """Nearest-example intent classifier over hashed character n-gram TF-IDF vectors
+
+    vectors holds one L2-normalized row per example, grouped by intent;
+    starts[i] is the first row of labels[i]. An intent's score is the cosine
+    similarity of its closest example.
+    """
+
+    def __init__(self, vectors, idf, labels, starts, examples=None):
+        import numpy as np
+        self.np = np
+        self.vectors = vectors
+        self.idf = idf
+        self.labels = list(labels)
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.examples = examples or []
+        self.dimensions = vectors.shape[1]
+
+    @classmethod
+    def train(cls, examples, dimensions=DIMENSIONS):
+        """Fit on {intent: [utterances]}"""
+        import numpy as np
+        labels = sorted(intent for intent, texts in examples.items() if texts)
+        texts = [text for intent in labels for text in examples[intent]]
+        starts = np.cumsum([0] + [len(examples[intent]) for intent in labels[:-1]])
+
+        counts = _count_ngrams(np, texts, dimensions)
+        document_frequency = np.count_nonzero(counts, axis=0)
+        idf = (np.log((1 + len(texts)) / (1 + document_frequency)) + 1).astype(np.float32)
+        vectors = cls._weigh(np, counts, idf)
+        return cls(vectors, idf, labels, starts, texts)
+
+    @classmethod
+    def load(cls, directory):
+        """Load a saved model; the example matrix is memory-mapped, not read"""
+        import numpy as np
+        with open(os.path.join(directory, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        vectors = np.load(os.path.join(directory, 'vectors.npy'), mmap_mode='r')
+        idf = np.load(os.path.join(directory, 'idf.npy'))
+        return cls(vectors, idf, meta['labels'], meta['starts'], meta.get('examples'))
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.np.save(os.path.join(directory, 'vectors.npy'), self.np.ascontiguousarray(self.vectors))
+        self.np.save(os.path.join(directory, 'idf.npy'), self.idf)
+        meta = {'labels': self.labels, 'starts': self.starts.tolist(), 'dimensions': self.dimensions,
+                'ngrams': list(NGRAMS), 'examples': self.examples}
+        with open(os.path.join(directory, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+
+    @staticmethod
+    def _weigh(np, counts, idf):
+        """Sublinear TF times IDF, L2-normalized per row"""
+        weights = np.zeros_like(counts)
+        present = counts > 0
+        weights[present] = 1 + np.log(counts[present])
+        weights *= idf
+        norms = np.linalg.norm(weights, axis=1, keepdims=True)
+        return weights / np.maximum(norms, 1e-12)
+
+    def vectorize(self, commands):
+        """Query matrix with one TF-IDF row per command"""
+        return self._weigh(self.np, _count_ngrams(self.np, commands, self.dimensions), self.idf)
+
+    def scores(self, commands):
+        """(intents x commands) matrix of best-example similarities: one matrix-matrix product"""
+        similarities = self.vectors @ self.vectorize(commands).T
+        return self.np.maximum.reduceat(similarities, self.starts, axis=0)
+
+    def classify(self, command):
+        """(intent, score) for one command: one matrix-vector product"""
+        similarities = self.vectors @ self.vectorize([command])[0]
+        best = self.np.maximum.reduceat(similarities, self.starts)
+        index = int(best.argmax())
+        return self.labels[index], float(best[index])
+
+    def classify_many(self, commands):
+        """[(intent, score)] for a batch of commands"""
+        if not commands:
+            return []
+        scores = self.scores(commands)
+        best = scores.argmax(axis=0)
+        return [(self.labels[index], float(scores[index, column])) for column, index in enumerate(best)]
+
+def read_labeled(paths):
+    """{intent: [commands]} from JSONL logs with 'command' and 'action' fields
+
+    The latest label wins when a command was logged more than once, and only
+    the most recent MAX_EXAMPLES_PER_INTENT commands of each intent are kept.
+    """
+    latest = {}
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                command, action = record.get('command'), record.get('action')
+                if command and action:
+                    key = normalize_command(command)
+                    latest.pop(key, None)
+                    latest[key] = action
+    examples = {}
+    for command, action in latest.items():
+        examples.setdefault(action, []).append(command)
+    return {action: commands[-MAX_EXAMPLES_PER_INTENT:] for action, commands in examples.items()}
+
+def training_examples(paths=(), intents=None):
+    """Seed examples plus logged ones, limited to intents if given"""
+    examples = {intent: list(texts) for intent, texts in SEED_EXAMPLES.items()}
+    for intent, commands in read_labeled(paths).items():
+        known = set(examples.get(intent, ()))
+        examples.setdefault(intent, []).extend(command for command in commands if command not in known)
+    if intents is not None:
+        examples = {intent: texts for intent, texts in examples.items() if intent in intents}
+    return examples
+
+_default = None
+_default_lock = threading.Lock()
+
+def load_default(directory=None):
+    """Shared classifier: the saved model in INTENT_MODEL_DIR, else one trained on the seed examples"""
+    global _default
+    with _default_lock:
+        if _default is None:
+            directory = directory or os.getenv('INTENT_MODEL_DIR', 'models/intent_classifier')
+            if os.path.exists(os.path.join(directory, 'meta.json')):
+                _default = IntentClassifier.load(directory)
+            else:
+                _default = IntentClassifier.train(SEED_EXAMPLES)
+        return _default
+
+def main():
+    parser = argparse.ArgumentParser(description="Train or query the local intent classifier")
+    commands = parser.add_subparsers(dest='command', required=True)
+    train = commands.add_parser('train', help="train from seed examples plus JSONL command logs")
+    train.add_argument('logs', nargs='*', help="JSONL files with 'command' and 'action' fields")
+    train.add_argument('-o', '--output', default=os.getenv('INTENT_MODEL_DIR', 'models/intent_classifier'))
+    train.add_argument('--dimensions', type=int, default=DIMENSIONS)
+    predict = commands.add_parser('predict', help="classify commands (arguments, or one per line on stdin)")
+    predict.add_argument('commands', nargs='*')
+    predict.add_argument('--model', default=os.getenv('INTENT_MODEL_DIR', 'models/intent_classifier'))
+    args = parser.parse_args()
+
+    if args.command == 'train':
+        examples = training_examples(args.logs)
+        started = time.perf_counter()
+        model = IntentClassifier.train(examples, args.dimensions)
+        model.save(args.output)
+        print(f"Trained on {len(model.examples)} examples of {len(model.labels)} intents "
+              f"in {(time.perf_counter() - started) * 1000:.0f} ms -> {args.output}")
+        return
+
+    texts = args.commands or [line.strip() for line in sys.stdin if line.strip()]
+    started = time.perf_counter()
+    model = load_default(args.model)
+    loaded = time.perf_counter()
+    results = model.classify_many(texts)
+    finished = time.perf_counter()
+    for text, (intent, score) in zip(texts, results):
+        print(f"{score:5.2f}  {intent:<18}{text}")
+    print(f"load {(loaded - started) * 1000:.1f} ms, classify {len(texts)} in "
+          f"{(finished - loaded) * 1000:.1f} ms", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+Asynchronous LLM client.
+All requests run on one background asyncio loop through a single AsyncOpenAI
+client, so HTTP connections are pooled and kept alive between commands.
+Every request has a deadline. Rate limits, timeouts, dropped connections and
+5xx responses are retried with jittered exponential backoff, and requests can
+be cancelled from any thread (e.g. when listening stops). Point base_url at
+llm_stub_server.py to exercise all of this without the real API.
+"""
+
+import asyncio
+import concurrent.futures
+import queue
+import random
+import threading
+import time
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+class LLMUnavailableError(Exception):
+    """The LLM could not answer, even after retrying; callers should fall back"""
+
+class LLMTimeoutError(LLMUnavailableError):
+    """No answer before the request's deadline"""
+
+class QuotaExceededError(LLMUnavailableError):
+    """The account is out of credit, so retrying won't help"""
+
+class LLMCancelledError(Exception):
+    """The request was cancelled before it finished"""
+
+_END = object()
+
+def _classify(error):
+    """'quota', 'retry' or None (not retryable) for an exception raised by the SDK"""
+    import openai
+    if isinstance(error, openai.RateLimitError):
+        if getattr(error, 'code', None) == 'insufficient_quota' or 'insufficient_quota' in str(error):
+            return 'quota'
+        return 'retry'
+    if isinstance(error, openai.APIConnectionError):  # includes APITimeoutError
+        return 'retry'
+    if isinstance(error, openai.APIStatusError) and error.status_code in RETRYABLE_STATUS:
+        return 'retry'
+    return None
+
+def _retry_after(error):
+    """Seconds from a Retry-After header, if the server sent one"""
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+class LLMClient:
+    """Chat completions with connection reuse, deadlines, retry backoff and cancellation
+
+    complete() and stream() block the calling thread only; submit() returns a
+    concurrent.futures.Future for callers that want to wait elsewhere.
+    """
+
+    def __init__(self, api_key, base_url=None, timeout=20.0, connect_timeout=5.0, max_retries=3,
+                 backoff=0.5, max_backoff=8.0, max_connections=10, keepalive=120.0):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.stats = {'requests': 0, 'retries': 0, 'timeouts': 0, 'failures': 0, 'cancelled': 0}
+        self.pending = set()
+        self.lock = threading.Lock()
+
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="llm-client", daemon=True)
+        self.thread.start()
+
+        async def make_client():
+            import openai
+            # The SDK's own Limits type, whichever HTTP library it is built on.
+            # Its default keep-alive expiry (5s) is shorter than the gap between spoken commands.
+            limits = type(openai.DEFAULT_CONNECTION_LIMITS)(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=keepalive
+            )
+            http_client = openai.DefaultAsyncHttpxClient(
+                timeout=openai.Timeout(timeout, connect=connect_timeout),
+                limits=limits
+            )
+            # Retries are done here, with deadlines, instead of inside the SDK
+            return openai.AsyncOpenAI(api_key=api_key, base_url=base_url, max_retries=0,
+                                      http_client=http_client)
+
+        self.client = asyncio.run_coroutine_threadsafe(make_client(), self.loop).result()
+
+    # Blocking API
+
+    def submit(self, timeout=None, **request):
+        """Start a chat completion; returns a Future with the response"""
+        call = lambda: self.client.chat.completions.create(**request)
+        return self._submit(self._with_retries(call, timeout or self.timeout))
+
+    def complete(self, timeout=None, **request):
+        """Run a chat completion and return the response"""
+        return self._result(self.submit(timeout, **request))
+
+    def stream(self, timeout=None, idle_timeout=None, **request):
+        """Yield the chunks of a streamed chat completion
+
+        Failures are retried until the first chunk arrives; after that, a gap
+        longer than idle_timeout between chunks ends the stream with an error.
+        """
+        timeout = timeout or self.timeout
+        idle_timeout = idle_timeout or timeout
+        chunks = queue.Queue()
+
+        async def first_chunk():
+            stream = await self.client.chat.completions.create(stream=True, **request)
+            iterator = stream.__aiter__()
+            try:
+                return stream, iterator, await iterator.__anext__()
+            except StopAsyncIteration:
+                return stream, iterator, None
+            except BaseException:
+                await stream.close()
+                raise
+
+        async def pump():
+            stream, iterator, chunk = await self._with_retries(first_chunk, timeout)
+            try:
+                while chunk is not None:
+                    chunks.put(chunk)
+                    try:
+                        chunk = await asyncio.wait_for(iterator.__anext__(), idle_timeout)
+                    except StopAsyncIteration:
+                        chunk = None
+                    except asyncio.TimeoutError:
+                        self.stats['timeouts'] += 1
+                        raise LLMTimeoutError(f"the reply stalled for {idle_timeout:g}s") from None
+            finally:
+                await stream.close()
+
+        future = self._submit(pump())
+        future.add_done_callback(lambda _: chunks.put(_END))
+        try:
+            while True:
+                chunk = chunks.get()
+                if chunk is _END:
+                    break
+                yield chunk
+            self._result(future)
+        finally:
+            future.cancel()  # the consumer stopped early
+
+    def cancel_all(self):
+        """Cancel every request still in flight"""
+        with self.lock:
+            futures = list(self.pending)
+        for future in futures:
+            future.cancel()
+        return len(futures)
+
+    def close(self):
+        """Cancel outstanding requests, close pooled connections and stop the loop"""
+        self.cancel_all()
+        try:
+            asyncio.run_coroutine_threadsafe(self.client.close(), self.loop).result(5)
+        except Exception:
+            pass
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(5)
+
+    # Internals
+
+    def _submit(self, coroutine):
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+        with self.lock:
+            self.pending.add(future)
+        future.add_done_callback(self._forget)
+        return future
+
+    def _forget(self, future):
+        with self.lock:
+            self.pending.discard(future)
+
+    def _result(self, future):
+        try:
+            return future.result()
+        except concurrent.futures.CancelledError:
+            raise LLMCancelledError("the request was cancelled") from None
+
+    def _delay(self, attempt, retry_after):
+        # "Full jitter": a random wait up to the exponential step spreads retries out
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_backoff))
+        return delay
+
+    async def _with_retries(self, call, timeout):
+        self.stats['requests'] += 1
+        give_up_at = time.monotonic() + timeout
+        attempt = 0
+        while True:
+            try:
+                return await asyncio.wait_for(call(), max(0.0, give_up_at - time.monotonic()))
+            except asyncio.CancelledError:
+                self.stats['cancelled'] += 1
+                raise
+            except asyncio.TimeoutError:
+                self.stats['timeouts'] += 1
+                raise LLMTimeoutError(f"no reply within {timeout:g}s") from None
+            except Exception as error:
+                kind = _classify(error)
+                if kind is None:
+                    self.stats['failures'] += 1
+                    raise
+                if kind == 'quota':
+                    self.stats['failures'] += 1
+                    raise QuotaExceededError("the OpenAI account is out of quota") from error
+                delay = self._delay(attempt, _retry_after(error))
+                if attempt >= self.max_retries or time.monotonic() + delay >= give_up_at:
+                    self.stats['failures'] += 1
+                    raise LLMUnavailableError(f"gave up after {attempt + 1} attempts: {error}") from error
+                attempt += 1
+                self.stats['retries'] += 1
+                await asyncio.sleep(delay)
@@ -0,0 +1,182 @@
+"""
+Streaming helpers for LLM responses.
+Pulls the 'response' field out of a JSON reply while it is still arriving and
+cuts it into sentences, so speech can start before the completion finishes.
+"""
+
+import re
+import time
+
+RESPONSE_KEY = re.compile(r'"response"\s*:\s*"')
+SENTENCE_END = re.compile(r'[.!?]+["\')\]]*\s+')
+ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+class ResponseFieldParser:
+    """Incrementally decodes the string value of the "response" key in streamed JSON"""
+
+    def __init__(self):
+        self.buffer = ""
+        self.position = None  # index of the next undecoded character of the value
+        self.done = False
+
+    def feed(self, chunk):
+        """Add raw JSON text and return any newly decoded characters of the response value"""
+        self.buffer += chunk
+        if self.done:
+            return ""
+
+        if self.position is None:
+            match = RESPONSE_KEY.search(self.buffer)
+            if not match:
+                return ""
+            self.position = match.end()
+
+        decoded = []
+        buffer = self.buffer
+        index = self.position
+        while index < len(buffer):
+            char = buffer[index]
+            if char == '"':
+                self.done = True
+                index += 1
+                break
+            if char != '\\':
+                decoded.append(char)
+                index += 1
+                continue
+
+            # Escape sequence; wait for more data if it is cut off mid-way
+            if index + 1 >= len(buffer):
+                break
+            code = buffer[index + 1]
+            if code == 'u':
+                if index + 6 > len(buffer):
+                    break
+                try:
+                    decoded.append(chr(int(buffer[index + 2:index + 6], 16)))
+                except ValueError:
+                    pass
+                index += 6
+            else:
+                decoded.append(ESCAPES.get(code, code))
+                index += 2
+
+        self.position = index
+        return ''.join(decoded)
+
+class SentenceSplitter:
+    """Buffers streamed text and hands back complete sentences"""
+
+    def __init__(self):
+        self.pending = ""
+
+    def feed(self, text):
+        """Add text and return the sentences it completed"""
+        self.pending += text
+        sentences = []
+        start = 0
+        for match in SENTENCE_END.finditer(self.pending):
+            sentence = self.pending[start:match.end()].strip()
+            if sentence:
+                sentences.append(sentence)
+            start = match.end()
+        self.pending = self.pending[start:]
+        return sentences
+
+    def flush(self):
+        """Return whatever text is left once the stream has ended"""
+        rest = self.pending.strip()
+        self.pending = ""
+        return [rest] if rest else []
+
+def usage_of(usage):
+    """Token counts from an SDK usage object (zeros when the server sent none)"""
+    if usage is None:
+        return {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0}
+    return {'prompt_tokens': usage.prompt_tokens, 'completion_tokens': usage.completion_tokens,
+            'total_tokens': usage.total_tokens}
+
+def stream_intent(client, model, messages, on_sentence, max_tokens=150):
+    """Stream a chat completion, calling on_sentence for each finished sentence of its 'response'
+
+    client is an llm_client.LLMClient. Returns (full_text, latency, usage)
+    once the stream is complete.
+    """
+    started = time.perf_counter()
+    stream = client.stream(
+        model=model,
+        messages=messages,
+        max_tokens=max_tokens,
+        stream_options={"include_usage": True}
+    )
+
+    parser = ResponseFieldParser()
+    splitter = SentenceSplitter()
+    parts = []
+    usage = usage_of(None)
+    for chunk in stream:
+        if getattr(chunk, 'usage', None):
+            usage = usage_of(chunk.usage)
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if not delta:
+            continue
+        parts.append(delta)
+
+        was_done = parser.done
+        for sentence in splitter.feed(parser.feed(delta)):
+            on_sentence(sentence)
+        if parser.done and not was_done:
+            for sentence in splitter.flush():
+                on_sentence(sentence)
+
+    # A reply cut off mid-string still gets its last words spoken
+    for sentence in splitter.flush():
+        on_sentence(sentence)
+
+    return ''.join(parts), time.perf_counter() - started, usage
+
+def stream_tool_call(client, model, messages, tools, on_sentence, max_tokens=150):
+    """Stream a tool-calling chat completion
+
+    Plain-text replies are spoken sentence by sentence as they arrive; tool
+    call names and arguments are assembled from their deltas. Returns
+    (content, [(name, arguments_json)], latency, usage).
+    """
+    started = time.perf_counter()
+    stream = client.stream(
+        model=model,
+        messages=messages,
+        tools=tools,
+        tool_choice="auto",
+        max_tokens=max_tokens,
+        stream_options={"include_usage": True}
+    )
+
+    splitter = SentenceSplitter()
+    parts = []
+    calls = {}  # index -> [name, argument fragments]
+    usage = usage_of(None)
+    for chunk in stream:
+        if getattr(chunk, 'usage', None):
+            usage = usage_of(chunk.usage)
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta
+        for call in delta.tool_calls or ():
+            entry = calls.setdefault(call.index, ["", []])
+            if call.function and call.function.name:
+                entry[0] += call.function.name
+            if call.function and call.function.arguments:
+                entry[1].append(call.function.arguments)
+        if delta.content:
+            parts.append(delta.content)
+            for sentence in splitter.feed(delta.content):
+                on_sentence(sentence)
+
+    for sentence in splitter.flush():
+        on_sentence(sentence)
+
+    tool_calls = [(name, ''.join(arguments)) for _, (name, arguments) in sorted(calls.items())]
+    return ''.join(parts), tool_calls, time.perf_counter() - started, usage
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Local OpenAI-compatible stub server.
+Answers POST /v1/chat/completions (plain and streamed) with intents from the
+local keyword parser, so the assistant and llm_client can be exercised
+offline. Latency, failures and quota errors can be injected to check
+deadlines, retries and fallbacks.
+
+    python llm_stub_server.py --port 8765 --latency 0.2 --fail 429,503
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=stub python main.py --text
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from local_intents import parse_command_locally
+
+class StubState:
+    """Behaviour and counters shared by all request handlers"""
+
+    def __init__(self, latency=0.0, chunk_delay=0.0, fail=(), quota=False):
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.failures = list(fail)  # status codes returned by the next requests, in order
+        self.quota = quota
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.connections = set()
+
+    def next_failure(self):
+        with self.lock:
+            self.requests += 1
+            return self.failures.pop(0) if self.failures else None
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse can be observed
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        state = self.server.state
+        state.connections.add(self.client_address)
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        if not self.path.endswith('/chat/completions'):
+            return self.send_json(404, {'error': {'message': 'not found', 'type': 'invalid_request_error'}})
+
+        time.sleep(state.latency)
+        if state.quota:
+            return self.send_json(429, {'error': {
+                'message': 'You exceeded your current quota', 'type': 'insufficient_quota',
+                'code': 'insufficient_quota'}})
+        failure = state.next_failure()
+        if failure:
+            return self.send_json(failure, {'error': {'message': f'injected {failure}', 'type': 'server_error'}},
+                                  headers={'Retry-After': '0'} if failure == 429 else None)
+
+        messages = body.get('messages') or [{}]
+        command = messages[-1].get('content', '')
+        intent = parse_command_locally(command)
+        tool_names = {tool['function']['name'] for tool in body.get('tools') or ()}
+        tool_call = None
+        if not tool_names:
+            content = json.dumps(intent)
+        elif intent['action'] in tool_names:
+            # Tool-calling request: answer with a structured call, as the real API does
+            content = None
+            tool_call = {'id': 'call_stub', 'type': 'function', 'function': {
+                'name': intent['action'], 'arguments': json.dumps(intent['parameters'])}}
+        else:
+            content = intent['response']
+
+        prompt_text = json.dumps(messages) + json.dumps(body.get('tools') or [])
+        usage = {'prompt_tokens': len(prompt_text) // 4,
+                 'completion_tokens': len(json.dumps(tool_call) if tool_call else content) // 4}
+        usage['total_tokens'] = usage['prompt_tokens'] + usage['completion_tokens']
+        if body.get('stream'):
+            self.send_stream(body.get('model', 'stub'), content, tool_call, usage,
+                             (body.get('stream_options') or {}).get('include_usage'))
+        else:
+            message = {'role': 'assistant', 'content': content}
+            if tool_call:
+                message['tool_calls'] = [tool_call]
+            self.send_json(200, {
+                'id': 'chatcmpl-stub', 'object': 'chat.completion', 'created': int(time.time()),
+                'model': body.get('model', 'stub'),
+                'choices': [{'index': 0, 'finish_reason': 'tool_calls' if tool_call else 'stop',
+                             'message': message}],
+                'usage': usage
+            })
+
+    def send_json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_stream(self, model, content, tool_call, usage, include_usage):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        def event(payload):
+            data = f"data: {payload}\n\n".encode()
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        def delta(payload):
+            event(json.dumps(dict(base, choices=[{'index': 0, 'delta': payload, 'finish_reason': None}])))
+            time.sleep(self.server.state.chunk_delay)
+
+        base = {'id': 'chatcmpl-stub', 'object': 'chat.completion.chunk', 'created': int(time.time()), 'model': model}
+        if tool_call:
+            function = tool_call['function']
+            delta({'tool_calls': [{'index': 0, 'id': tool_call['id'], 'type': 'function',
+                                   'function': {'name': function['name'], 'arguments': ''}}]})
+            for start in range(0, len(function['arguments']), 8):
+                delta({'tool_calls': [{'index': 0, 'function': {'arguments': function['arguments'][start:start + 8]}}]})
+        else:
+            for start in range(0, len(content), 8):
+                delta({'content': content[start:start + 8]})
+        event(json.dumps(dict(base, choices=[
+            {'index': 0, 'delta': {}, 'finish_reason': 'tool_calls' if tool_call else 'stop'}])))
+        if include_usage:
+            event(json.dumps(dict(base, choices=[], usage=usage)))
+        event("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+
+class StubServer:
+    """Runs the stub on a background thread; url is the base_url to give the client"""
+
+    def __init__(self, host='127.0.0.1', port=0, **behaviour):
+        self.httpd = ThreadingHTTPServer((host, port), StubHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.state = self.state = StubState(**behaviour)
+        self.url = f"http://{host}:{self.httpd.server_address[1]}/v1"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub server for offline testing")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds before each reply")
+    parser.add_argument('--chunk-delay', type=float, default=0.0, help="seconds between streamed chunks")
+    parser.add_argument('--fail', default='', help="comma-separated status codes for the first requests, e.g. 429,503")
+    parser.add_argument('--quota', action='store_true', help="answer every request with insufficient_quota")
+    args = parser.parse_args()
+
+    fail = [int(code) for code in args.fail.split(',') if code]
+    server = StubServer(args.host, args.port, latency=args.latency, chunk_delay=args.chunk_delay,
+                        fail=fail, quota=args.quota)
+    print(f"Stub OpenAI API on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+if __name__ == "__main__":
+    main()
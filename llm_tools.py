@@ -0,0 +1,69 @@
+"""
+Tool-calling dispatch for the LLM.
+OpenAI tool schemas are generated from the assistant's task handlers: the
+action name becomes the tool name, the docstring its description, and
+parameters declared with @tool_parameters its arguments. The model answers
+with a structured tool call (or plain text for chat), so there is no JSON
+reply to parse and nothing to lose when a reply is cut short.
+"""
+
+import hashlib
+import json
+
+TOOLS_PROMPT = ("You are a voice assistant. Call the matching tool for requests it can handle; "
+                "otherwise reply in one or two short spoken sentences.")
+
+def tool_parameters(**parameters):
+    """Declare a handler's string parameters for its tool schema: name="description"
+
+    A description starting with "optional:" makes the parameter optional.
+    """
+    def decorate(handler):
+        handler.tool_parameters = parameters
+        return handler
+    return decorate
+
+def build_tools(handlers):
+    """OpenAI tool definitions for {action: handler}"""
+    tools = []
+    for action, handler in handlers.items():
+        declared = getattr(handler, 'tool_parameters', {})
+        properties = {}
+        required = []
+        for name, description in declared.items():
+            optional = description.startswith("optional:")
+            properties[name] = {"type": "string",
+                                "description": description[len("optional:"):].strip() if optional else description}
+            if not optional:
+                required.append(name)
+        description = (handler.__doc__ or action).strip().splitlines()[0]
+        tools.append({
+            "type": "function",
+            "function": {
+                "name": action,
+                "description": description,
+                "parameters": {"type": "object", "properties": properties, "required": required}
+            }
+        })
+    return tools
+
+def tools_digest(tools):
+    """Short fingerprint of the tool definitions (part of the intent cache key)"""
+    return hashlib.sha1(json.dumps(tools, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+
+def intent_from_message(content, tool_calls):
+    """Turn a reply (text and/or (name, arguments_json) tool calls) into the assistant's intent dict"""
+    if tool_calls:
+        name, arguments = tool_calls[0]
+        try:
+            parameters = json.loads(arguments) if arguments else {}
+        except json.JSONDecodeError:
+            parameters = {}
+        if not isinstance(parameters, dict):
+            parameters = {}
+        return {"action": name, "parameters": parameters, "response": (content or "").strip()}
+    return {"action": "general_chat", "parameters": {}, "response": (content or "").strip()}
+
+def tool_calls_of(message):
+    """[(name, arguments_json)] from a non-streamed chat completion message"""
+    return [(call.function.name, call.function.arguments) for call in (message.tool_calls or [])]
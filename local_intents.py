@@ -0,0 +1,104 @@
+"""
+Local keyword-based intent parsing.
+Used when the OpenAI API is unavailable, and by headless tools that need the
+same intents without building the voice assistant. classify_locally() also
+scores how sure the rules are, so confident commands can skip the LLM.
+"""
+
+import re
+
+from note_store import extract_note_query
+from safe_calc import CalculationError, compile_expression
+
+# Phrases parse_command_locally reacts to (also used to build speech recognition grammars)
+VOCABULARY = (
+    'my note', 'notes about', 'search notes', 'search for', 'search', 'open', 'time', 'date',
+    'today', 'create a note', 'note', 'weather in', 'calculate', 'play music', 'play',
+    'remind me', 'set reminder', 'send email', 'email'
+)
+
+# Confidence levels: HIGH means the whole command matched a known form
+HIGH = 0.95
+MEDIUM = 0.6
+LOW = 0.3
+
+# Applications VoiceAssistant.open_application knows how to open
+APPLICATIONS = ('calculator', 'notes', 'safari', 'chrome', 'spotify', 'mail')
+
+POLITE_PREFIX = re.compile(r"^((hey|ok|okay) )?(alexa,? )?((please|can you|could you|would you) )*")
+POLITE_SUFFIX = re.compile(r"( (please|for me|now))+$")
+TIME_QUESTION = re.compile(r"(what('s| is) the )?(current )?time( is it)?|what time is it|tell me the time")
+DATE_QUESTION = re.compile(r"(what('s| is) )?(the |today's )?date( today)?|what day is (it|today)|what('s| is) today")
+
+def _core(text):
+    """The command without politeness and punctuation ("can you open chrome please?" -> "open chrome")"""
+    text = re.sub(r"[?!.]+$", "", text.strip())
+    text = POLITE_PREFIX.sub("", text)
+    return POLITE_SUFFIX.sub("", text).strip()
+
+def _intent(action, parameters, response):
+    return {"action": action, "parameters": parameters, "response": response}
+
+def classify_locally(command):
+    """Keyword-based intent plus a confidence score between 0 and 1
+
+    HIGH means the command matched a known form exactly ("open chrome", "what
+    time is it"); lower scores mean a keyword appeared but the command may
+    mean something else ("set a timer" contains "time").
+    """
+    text = command.lower()
+    core = _core(text)
+    # note search (before web search: "search my notes for ...")
+    if "my note" in text or "notes about" in text or "search notes" in text:
+        query = extract_note_query(text)
+        return _intent("find_note", {"query": query}, f"Looking through your notes for {query}."), (HIGH if query else LOW)
+    # web search
+    if text.startswith("search for ") or text.startswith("search "):
+        query = text.replace("search for ", "").replace("search ", "").strip()
+        return _intent("web_search", {"query": query}, f"Searching the web for {query}."), (HIGH if query else LOW)
+    # open application
+    if text.startswith("open "):
+        app = text.replace("open ", "").strip()
+        if _core(app) in APPLICATIONS:
+            app, confidence = _core(app), HIGH  # "open chrome please" -> "chrome"
+        else:
+            confidence = MEDIUM if len(app.split()) == 1 else LOW
+        return _intent("open_application", {"application": app}, f"Opening {app}."), confidence
+    # time/date
+    if "time" in text:
+        return _intent("get_time", {}, "Here is the current time."), (HIGH if TIME_QUESTION.fullmatch(core) else LOW)
+    if "date" in text or "today" in text:
+        return _intent("get_date", {}, "Here is today’s date."), (HIGH if DATE_QUESTION.fullmatch(core) else LOW)
+    # notes
+    if text.startswith("create a note") or text.startswith("note "):
+        content = text.split("note", 1)[-1].strip()
+        return _intent("create_note", {"content": content}, "Creating a note."), (0.85 if content else LOW)
+    # weather
+    if text.startswith("weather in "):
+        city = text.replace("weather in ", "").strip()
+        confidence = HIGH if city and len(_core(city).split()) <= 3 else MEDIUM
+        return _intent("weather", {"city": city}, f"Checking weather for {city}."), confidence
+    # calculator
+    if text.startswith("calculate "):
+        expr = text.replace("calculate ", "").strip()
+        try:
+            compile_expression(expr)
+            confidence = HIGH
+        except CalculationError:
+            confidence = LOW
+        return _intent("calculator", {"expression": expr}, "Calculating."), confidence
+    # music
+    if "play music" in text or text.startswith("play "):
+        return _intent("music", {}, "Playing music."), (HIGH if core in ("play music", "play some music") else MEDIUM)
+    # reminder (free-form text; the LLM extracts it better)
+    if text.startswith("remind me") or text.startswith("set reminder"):
+        return _intent("reminder", {"text": command}, "Setting a reminder."), MEDIUM
+    # email
+    if "send email" in text or text.startswith("email"):
+        return _intent("send_email", {}, "Opening your email client."), (HIGH if core in ("send email", "email") else MEDIUM)
+    # default
+    return _intent("general_chat", {}, "I understand your request."), 0.0
+
+def parse_command_locally(command):
+    """Very simple keyword-based intent parsing as a fallback when API is unavailable."""
+    return classify_locally(command)[0]
@@ -1,40 +1,73 @@
-import speech_recognition as sr
-import pyttsx3
-from openai import OpenAI
 import os
+import argparse
 import webbrowser
 import subprocess
 import datetime
 import threading
-import tkinter as tk
-from tkinter import ttk, scrolledtext
 import json
-from dotenv import load_dotenv
+import time
+import startup
+from startup import LazyModule, deferred, is_initialized
+from local_intents import MEDIUM, classify_locally, parse_command_locally
+from llm_stream import stream_intent, stream_tool_call, usage_of
+from llm_tools import TOOLS_PROMPT, build_tools, intent_from_message, tool_calls_of, tool_parameters, tools_digest
+from pipeline import VoicePipeline
+from safe_calc import CalculationError, evaluate
+from tracing import Tracer
 
-# Load environment variables
-load_dotenv()
+# Heavy third-party modules are imported on first use so text-only mode starts fast
+sr = LazyModule('speech_recognition')
+tk = LazyModule('tkinter')
+ttk = LazyModule('tkinter.ttk')
+scrolledtext = LazyModule('tkinter.scrolledtext')
+llm_client = LazyModule('llm_client')  # pulls in asyncio, httpx and openai
+
+LLM_MODEL = "gpt-4o-mini"
+SYSTEM_PROMPT = "You are a helpful AI assistant. Analyze the user's command and respond with a JSON object containing: 'action' (the type of action), 'parameters' (relevant parameters), and 'response' (a natural response to the user). Available actions: web_search, open_application, get_time, get_date, create_note, find_note, send_email, weather, calculator, music, reminder, general_chat."
 
 class VoiceAssistant:
-    def __init__(self):
-        # Initialize speech recognition
-        self.recognizer = sr.Recognizer()
-        self.microphone = sr.Microphone()
+    def __init__(self, text_only=False):
+        # Load environment variables
+        with startup.timed("load .env"):
+            from dotenv import load_dotenv
+            load_dotenv()
         
-        # Initialize text-to-speech engine
-        self.engine = pyttsx3.init()
-        self.engine.setProperty('rate', 150)
-        self.engine.setProperty('volume', 0.9)
+        # Text-only mode never builds the window or touches audio devices.
+        # Recognizer, microphone, speech engine and OpenAI client are all
+        # created on first use (see the deferred attributes below).
+        self.text_only = text_only
         
-        # Set OpenAI API key
-        api_key = os.getenv('OPENAI_API_KEY')
-        self.openai_client = OpenAI(api_key=api_key) if api_key else None
+        # Stream LLM replies and speak each sentence as soon as it arrives
+        self.streaming = os.getenv('OPENAI_STREAMING', '0').lower() in ('1', 'true', 'yes')
         
         # Assistant state
         self.is_listening = False
         self.assistant_name = "Alexa"
         
+        # Local-first routing: commands the keyword rules are at least this sure of skip the LLM
+        self.local_threshold = float(os.getenv('LOCAL_CONFIDENCE_THRESHOLD', '0.8'))
+        # Commands the rules are unsure of go to the local classifier next (see intent_classifier.py)
+        self.classifier_threshold = float(os.getenv('CLASSIFIER_THRESHOLD', '0.6'))
+        self.route_counts = dict.fromkeys(('local', 'classifier', 'cache', 'llm', 'fallback'), 0)
+        # LLM-classified commands are logged here as training data for the classifier ("off" disables)
+        self.intent_log_path = os.getenv('INTENT_LOG', 'intent_log.jsonl')
+        if self.intent_log_path.lower() in ('', 'off', '0', 'none'):
+            self.intent_log_path = None
+        self.route_lock = threading.Lock()
+        # Per-thread state of the turn being handled (the conversation's note store)
+        self.conversation = threading.local()
+        
+        # Per-stage latency spans for every turn (see tracing.py)
+        self.tracer = Tracer.from_env()
+        self.token_usage = dict.fromkeys(('prompt_tokens', 'completion_tokens', 'total_tokens'), 0)
+        
         # Create GUI
-        self.create_gui()
+        if text_only:
+            from gui_log import ConsoleLog
+            self.log = ConsoleLog()
+        else:
+            with startup.timed("build GUI"):
+                self.create_gui()
         
         # Task handlers
         self.task_handlers = {
@@ -43,12 +76,127 @@ class VoiceAssistant:
             'get_time': self.get_time,
             'get_date': self.get_date,
             'create_note': self.create_note,
+            'find_note': self.find_note,
             'send_email': self.send_email,
             'weather': self.get_weather,
             'calculator': self.calculator,
             'music': self.play_music,
             'reminder': self.set_reminder
         }
+        
+        # "tools": the LLM calls tools generated from task_handlers; "json": it writes a JSON intent
+        self.dispatch_mode = os.getenv('LLM_DISPATCH_MODE', 'json').lower()
+        self.tools = build_tools(self.task_handlers)
+        self.tools_digest = tools_digest(self.tools)
+    
+    @deferred
+    def recognizer(self):
+        """Speech recognizer"""
+        return sr.Recognizer()
+    
+    @deferred
+    def microphone(self):
+        """Default input device"""
+        return sr.Microphone()
+    
+    @deferred
+    def asr(self):
+        """Speech-to-text backend chosen by ASR_BACKEND (see recognizers.py)"""
+        from recognizers import create_backend
+        return create_backend(recognizer=self.recognizer,
+                              log=lambda message: self.log.write(message + "\n"))
+    
+    @deferred
+    def noise_estimator(self):
+        """Background ambient-noise tracking for the recognizer"""
+        from noise_estimator import AmbientNoiseEstimator
+        return AmbientNoiseEstimator(self.recognizer)
+    
+    @deferred
+    def capture(self):
+        """Persistent microphone capture, or None to open the microphone per utterance"""
+        if os.getenv('AUDIO_CAPTURE_MODE', 'per_utterance') != 'persistent':
+            return None
+        from audio_capture import ContinuousCapture
+        capture = ContinuousCapture(self.microphone, self.noise_estimator,
+                                    log=lambda message: self.log.write(message + "\n"))
+        # With a headset the assistant can't hear itself, so any speech may barge in
+        if os.getenv('BARGE_IN_ON_SPEECH', '0').lower() in ('1', 'true', 'yes'):
+            capture.on_speech_start = self.speech.interrupt
+        return capture
+    
+    @deferred
+    def corpus(self):
+        """Recorder saving every utterance with its transcript (RECORD_CORPUS, see replay_harness.py)"""
+        from replay_harness import CorpusRecorder
+        return CorpusRecorder.from_env()
+    
+    @deferred
+    def wake_gate(self):
+        """Wake-word gate in front of recognition (see wake_word.py), or None when none is enrolled"""
+        from wake_word import create_gate
+        return create_gate(on_wake=lambda: self.log.write(f"{self.assistant_name}: listening...\n"),
+                           log=lambda message: self.log.write(message + "\n"))
+    
+    @deferred
+    def speech(self):
+        """Text-to-speech worker thread, which owns the engine, playing repeated phrases from TTS_CACHE_DIR"""
+        from tts_cache import TTSCache
+        from tts_worker import SpeechWorker
+        return SpeechWorker(rate=150, volume=0.9, tracer=self.tracer, cache=TTSCache.from_env())
+    
+    @deferred
+    def llm(self):
+        """Pooled, retrying LLM client (llm_client.LLMClient), or None when no API key is configured"""
+        api_key = os.getenv('OPENAI_API_KEY')
+        if not api_key:
+            return None
+        return llm_client.LLMClient(
+            api_key,
+            base_url=os.getenv('OPENAI_BASE_URL') or None,
+            timeout=float(os.getenv('OPENAI_TIMEOUT', '20')),
+            max_retries=int(os.getenv('OPENAI_MAX_RETRIES', '3'))
+        )
+    
+    @deferred
+    def command_executor(self):
+        """Runs typed commands off the Tk thread, one at a time"""
+        from concurrent.futures import ThreadPoolExecutor
+        return ThreadPoolExecutor(max_workers=1, thread_name_prefix="command")
+    
+    @deferred
+    def note_store(self):
+        """Log-structured note store in NOTES_DIR (shared with the note modules)"""
+        from note_store import shared_store
+        return shared_store(os.getenv('NOTES_DIR', 'notes'))
+    
+    @property
+    def notes(self):
+        """Note store of the conversation being handled on this thread (note_store by default)"""
+        notes = getattr(self.conversation, 'notes', None)
+        return self.note_store if notes is None else notes
+    
+    @deferred
+    def intent_model(self):
+        """Local intent classifier (the model in INTENT_MODEL_DIR, else the built-in examples)"""
+        from intent_classifier import load_default
+        return load_default()
+    
+    @deferred
+    def memory(self):
+        """Recent conversation sent with LLM requests so follow-ups make sense (see conversation_memory.py)"""
+        from conversation_memory import ConversationMemory
+        return ConversationMemory.from_env()
+    
+    @deferred
+    def intent_cache(self):
+        """Cache of LLM intent results so repeated commands skip the network"""
+        from intent_cache import IntentCache
+        return IntentCache(
+            os.getenv('INTENT_CACHE_PATH', 'intent_cache.db'),
+            max_entries=int(os.getenv('INTENT_CACHE_SIZE', '1000')),
+            ttl=float(os.getenv('INTENT_CACHE_TTL', str(7 * 24 * 3600)))
+        )
     
     def create_gui(self):
         """Create the graphical user interface"""
@@ -74,6 +222,9 @@ class VoiceAssistant:
                                      font=('Arial', 12))
         self.status_label.pack(side=tk.LEFT)
         
+        self.route_label = ttk.Label(status_frame, text="", font=('Arial', 10))
+        self.route_label.pack(side=tk.RIGHT)
+        
         # Control buttons
         button_frame = ttk.Frame(main_frame)
         button_frame.pack(fill=tk.X, pady=10)
@@ -111,6 +262,11 @@ class VoiceAssistant:
                                                    font=('Arial', 10))
         self.output_text.pack(fill=tk.BOTH, expand=True)
         
+        # All conversation output goes through this channel so worker threads never touch Tk
+        from gui_log import LogChannel
+        self.log = LogChannel(self.root, self.output_text,
+                              max_lines=int(os.getenv('GUI_SCROLLBACK_LINES', '2000')))
+        
         # Help text
         help_text = """
         Available Commands:
@@ -119,6 +275,7 @@ class VoiceAssistant:
         • "What time is it?" - Get current time
         • "What's the date?" - Get current date
         • "Create a note" - Create a text note
+        • "Find my note about [topic]" - Search your notes
         • "Weather in [city]" - Get weather information
         • "Calculate [expression]" - Basic calculator
         • "Play music" - Play music
@@ -131,138 +288,334 @@ class VoiceAssistant:
         help_label.pack(pady=10)
     
     def speak(self, text):
-        """Convert text to speech"""
-        self.output_text.insert(tk.END, f"Assistant: {text}\n")
-        self.output_text.see(tk.END)
-        self.engine.say(text)
-        self.engine.runAndWait()
+        """Convert text to speech (queued on the speech worker; does not block)"""
+        self.log.write(f"Assistant: {text}\n")
+        if not self.text_only:
+            self.speech.say(text)
     
     def listen(self):
         """Listen for voice input"""
+        audio = self.capture_audio()
+        if audio is None:
+            return None
+        return self.recognize_audio(audio)
+    
+    def capture_audio(self):
+        """Capture one utterance from the microphone, or None if nobody spoke"""
+        self.log.write("Listening...\n")
+        
         try:
+            if self.capture is not None:
+                try:
+                    return self.capture.listen(timeout=5)
+                except OSError as e:  # audio_capture.CaptureError; the next listen() reopens the stream
+                    self.log.write(f"Microphone error: {e}\n")
+                    return None
+            
             with self.microphone as source:
-                self.recognizer.adjust_for_ambient_noise(source, duration=0.5)
-                self.output_text.insert(tk.END, "Listening...\n")
-                self.output_text.see(tk.END)
-                
-                audio = self.recognizer.listen(source, timeout=5, phrase_time_limit=10)
-                
-                self.output_text.insert(tk.END, "Processing...\n")
-                self.output_text.see(tk.END)
-                
-                text = self.recognizer.recognize_google(audio)
-                self.output_text.insert(tk.END, f"You: {text}\n")
-                self.output_text.see(tk.END)
-                
-                return text.lower()
+                # Threshold is kept current in the background; no per-utterance calibration
+                with self.tracer.span('calibrate'):
+                    self.noise_estimator.attach(source)
+                return self.recognizer.listen(source, timeout=5, phrase_time_limit=10)
                 
         except sr.WaitTimeoutError:
-            self.output_text.insert(tk.END, "No speech detected. Please try again.\n")
-            self.output_text.see(tk.END)
+            self.log.write("No speech detected. Please try again.\n")
             return None
+    
+    def recognize_audio(self, audio):
+        """Convert captured audio to command text"""
+        try:
+            self.log.write("Processing...\n")
+            
+            with self.tracer.span('recognize', backend=self.asr.name):
+                text = self.asr.recognize(audio)
+            self.log.write(f"You: {text}\n")
+            if self.corpus is not None:
+                self.corpus.record(audio, text, self.asr.name)
+            
+            return text.lower()
+            
         except sr.UnknownValueError:
-            self.output_text.insert(tk.END, "Could not understand audio. Please try again.\n")
-            self.output_text.see(tk.END)
+            self.log.write("Could not understand audio. Please try again.\n")
+            if self.corpus is not None:
+                self.corpus.record(audio, None, self.asr.name)
             return None
         except sr.RequestError as e:
-            self.output_text.insert(tk.END, f"Error with speech recognition: {e}\n")
-            self.output_text.see(tk.END)
+            self.log.write(f"Error with speech recognition: {e}\n")
             return None
     
-    def process_command(self, command):
-        """Process user commands using AI"""
+    def process_command(self, command, say=None, memory=None):
+        """Process user commands using AI
+        
+        Replies go to say (speak() by default), which lets the voice pipeline
+        queue them for its speech stage instead. memory is the conversation
+        the command belongs to (the assistant's own by default).
+        """
         if not command:
             return
+        # Typed commands start their own turn; voice commands already have one
+        with self.tracer.turn('typed'):
+            self.handle_command(command, say or self.speak, memory)
+    
+    def handle_command(self, command, say, memory=None, notes=None, routed=None):
+        """Route a command locally or through the LLM, say the reply and remember the turn
+        
+        memory and notes are the conversation's memory and note store (the
+        assistant's own by default); routed is route_locally(command) when the
+        caller has already run it. Returns the route that answered.
+        """
+        memory = self.memory if memory is None else memory
+        replies = []
         
+        def say_and_remember(message):
+            replies.append(message)
+            say(message)
+        
+        # Barge-in: a new command cuts off whatever is still being said
+        if is_initialized(self, 'speech'):
+            self.speech.interrupt()
+        
+        previous = getattr(self.conversation, 'notes', None)
+        self.conversation.notes = notes
         try:
-            if not self.openai_client:
-                self.speak("OpenAI API key not set. Please add OPENAI_API_KEY to your environment.")
-                return
-            # Use OpenAI to understand and categorize the command
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "You are a helpful AI assistant. Analyze the user's command and respond with a JSON object containing: 'action' (the type of action), 'parameters' (relevant parameters), and 'response' (a natural response to the user). Available actions: web_search, open_application, get_time, get_date, create_note, send_email, weather, calculator, music, reminder, general_chat."},
-                    {"role": "user", "content": command}
-                ],
-                max_tokens=150
-            )
+            # Commands the local rules are sure about never reach the network
+            intent, path = routed or self.route_locally(command)
+            if path is not None:
+                self.count_route(path)
+                self.run_intent(intent, say_and_remember)
+            else:
+                path = self.handle_with_llm(command, intent, say_and_remember, memory)
+        finally:
+            self.conversation.notes = previous
+        memory.add(command, ' '.join(replies))
+        return path
+    
+    def route_locally(self, command):
+        """(intent, path) for a command that needs no LLM, path being 'local' or 'classifier'
+        
+        Otherwise returns (keyword intent, None); the keyword intent is the
+        fallback if the LLM turns out to be unavailable.
+        """
+        local, confidence = classify_locally(command)
+        if confidence >= self.local_threshold and local['action'] != 'general_chat':
+            return local, 'local'
+        guess = self.classify_with_model(command, local, confidence)
+        if guess is not None:
+            return guess, 'classifier'
+        return local, None
+    
+    def handle_with_llm(self, command, local, say, memory=None):
+        """Answer a command through the LLM (or intent cache), falling back to the local intent
+        
+        Returns the route that answered ('cache', 'llm' or 'fallback'), or None.
+        """
+        path = None
+        try:
+            if not self.llm:
+                say("OpenAI API key not set. Please add OPENAI_API_KEY to your environment.")
+                return None
+            # Sentences already spoken while the reply was streaming
+            streamed = []
+            
+            def speak_sentence(sentence):
+                streamed.append(sentence)
+                say(sentence)
             
-            # Parse AI response
-            ai_response = response.choices[0].message.content
             try:
-                parsed = json.loads(ai_response)
-                action = parsed.get('action', 'general_chat')
-                parameters = parsed.get('parameters', {})
-                ai_message = parsed.get('response', 'I understand your request.')
-                
-                # Execute the action
-                if action in self.task_handlers:
-                    result = self.task_handlers[action](parameters)
-                    self.speak(f"{ai_message} {result}")
-                else:
-                    self.speak(ai_message)
-                    
+                # Use OpenAI (or the intent cache) to understand and categorize the command
+                path = 'llm'
+                parsed, path = self.classify_command(command, speak_sentence if self.streaming else None, memory)
+                self.run_intent(parsed, say, streamed=bool(streamed))
             except json.JSONDecodeError:
-                self.speak("I understand your request. Let me help you with that.")
+                if not streamed:
+                    say("I understand your request. Let me help you with that.")
                 
+        except llm_client.LLMCancelledError:
+            return None  # listening was stopped while the request was in flight
+        except llm_client.LLMUnavailableError as e:
+            # Quota exhausted, rate limited, timed out or unreachable:
+            # fall back to local intent parsing so the assistant still works
+            self.count_route('fallback')
+            path = 'fallback'
+            self.run_intent(local, say)
+            self.log.write(f"\n(Note: Using local understanding because {e}.)\n")
         except Exception as e:
-            error_text = str(e)
-            if "insufficient_quota" in error_text or "Error code: 429" in error_text or "You exceeded your current quota" in error_text:
-                # Fallback to local intent parsing so the assistant still works
-                parsed = self.parse_command_locally(command)
-                action = parsed.get('action', 'general_chat')
-                parameters = parsed.get('parameters', {})
-                ai_message = parsed.get('response', 'I understand your request.')
-                if action in self.task_handlers:
-                    result = self.task_handlers[action](parameters)
-                    self.speak(f"{ai_message} {result}")
-                else:
-                    self.speak(ai_message)
-                self.output_text.insert(tk.END, "\n(Note: Using local understanding due to API quota limits.)\n")
-                self.output_text.see(tk.END)
-            else:
-                self.speak(f"Sorry, I encountered an error: {error_text}")
+            say(f"Sorry, I encountered an error: {e}")
+        return path
+    
+    def classify_with_model(self, command, local, confidence):
+        """Intent from the local classifier, or None when the LLM should decide
+        
+        The classifier names an intent but extracts no parameters, so it
+        answers alone only when a parameterless intent matches an example
+        almost exactly ("how late is it", but not "what time is it in
+        tokyo"); otherwise it can only back up a keyword match it agrees with.
+        """
+        if self.classifier_threshold > 1:
+            return None
+        from intent_classifier import answers_alone
+        with self.tracer.span('classify'):
+            action, score = self.intent_model.classify(command)
+        if score < self.classifier_threshold or action == 'general_chat':
+            return None
+        if action == local['action'] and confidence >= MEDIUM:
+            return local
+        if answers_alone(action, score, self.classifier_threshold):
+            return {"action": action, "parameters": {}, "response": ""}
+        return None
+    
+    def run_intent(self, parsed, say, streamed=False):
+        """Run the handler for an intent and say the reply
+        
+        When the reply was streamed, its message has been spoken already and
+        only the handler's result is said.
+        """
+        action = parsed.get('action', 'general_chat')
+        parameters = parsed.get('parameters', {})
+        ai_message = parsed.get('response') or ('' if action in self.task_handlers else 'I understand your request.')
+        if action in self.task_handlers:
+            with self.tracer.span('handler', action=action):
+                result = self.task_handlers[action](parameters)
+            say(result if streamed or not ai_message else f"{ai_message} {result}")
+        elif not streamed:
+            say(ai_message)
+    
+    def count_route(self, path):
+        """Count which path answered a command: local, classifier, cache, llm or fallback"""
+        with self.route_lock:
+            self.route_counts[path] += 1
+        if not self.text_only:
+            self.log.post(self.update_route_label)
+    
+    def classify_command(self, command, on_sentence=None, memory=None):
+        """(intent, 'cache' or 'llm'): the LLM's intent for the command, from the intent cache when possible
+        
+        In "tools" mode (LLM_DISPATCH_MODE) the model picks a tool generated
+        from task_handlers; in "json" mode it writes a JSON intent. With
+        on_sentence the reply is streamed and each finished sentence is passed
+        to on_sentence as soon as it arrives. The recent conversation in
+        memory goes along, packed to CONTEXT_TOKEN_BUDGET.
+        """
+        from conversation_memory import context_digest, is_follow_up
+        memory = self.memory if memory is None else memory
+        started = time.perf_counter()
+        with self.tracer.span('context') as span:
+            context, context_tokens = memory.context()
+            span['tokens'] = context_tokens
+        packing_ms = (time.perf_counter() - started) * 1000
+        
+        use_tools = self.dispatch_mode == 'tools'
+        prompt = f"{TOOLS_PROMPT} tools:{self.tools_digest}" if use_tools else SYSTEM_PROMPT
+        # A follow-up can mean something else after a different conversation, so
+        # its cache entry depends on the context; self-contained commands don't,
+        # or memory.add() after every turn would keep them from ever hitting
+        if is_follow_up(command):
+            prompt += context_digest(context)
+        key = self.intent_cache.make_key(command, LLM_MODEL, prompt)
+        parsed = self.intent_cache.get(key)
+        if parsed is not None:
+            self.count_route('cache')
+            return parsed, 'cache'
+        
+        messages = [
+            {"role": "system", "content": TOOLS_PROMPT if use_tools else SYSTEM_PROMPT},
+            *context,
+            {"role": "user", "content": command}
+        ]
+        if context:
+            turns = sum(message['role'] == 'user' for message in context)
+            summary = " and a summary" if context[0]['role'] == 'system' else ""
+            self.log.write(f"(Context: {context_tokens} tokens from {turns} earlier turns{summary}, "
+                           f"packed in {packing_ms:.1f} ms)\n")
+        if use_tools and on_sentence:
+            content, tool_calls, latency, usage = stream_tool_call(
+                self.llm, LLM_MODEL, messages, self.tools, on_sentence
+            )
+            parsed = intent_from_message(content, tool_calls)
+        elif use_tools:
+            started = time.perf_counter()
+            response = self.llm.complete(
+                model=LLM_MODEL,
+                messages=messages,
+                tools=self.tools,
+                tool_choice="auto",
+                max_tokens=150
+            )
+            latency = time.perf_counter() - started
+            message = response.choices[0].message
+            parsed = intent_from_message(message.content, tool_calls_of(message))
+            usage = usage_of(getattr(response, 'usage', None))
+        elif on_sentence:
+            ai_response, latency, usage = stream_intent(
+                self.llm, LLM_MODEL, messages, on_sentence
+            )
+        else:
+            started = time.perf_counter()
+            response = self.llm.complete(
+                model=LLM_MODEL,
+                messages=messages,
+                max_tokens=150
+            )
+            latency = time.perf_counter() - started
+            ai_response = response.choices[0].message.content
+            usage = usage_of(getattr(response, 'usage', None))
+        self.count_route('llm')
+        self.record_usage(usage, latency)
+        
+        if not use_tools:
+            # Parse AI response; a malformed reply raises JSONDecodeError
+            parsed = json.loads(ai_response)
+        # Only well-formed intents are worth caching
+        if isinstance(parsed, dict):
+            self.intent_cache.put(key, parsed, latency, usage['total_tokens'])
+            self.log_intent(command, parsed)
+        return parsed, 'llm'
+    
+    def log_intent(self, command, parsed):
+        """Append an LLM-labelled command to INTENT_LOG (python intent_classifier.py train INTENT_LOG)"""
+        if not self.intent_log_path:
+            return
+        record = {'ts': round(time.time(), 3), 'command': command, 'action': parsed.get('action')}
+        try:
+            with open(self.intent_log_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + '\n')
+        except OSError:
+            pass
+    
+    def record_usage(self, usage, latency):
+        """Log one LLM call's token usage and latency and add it to the session totals"""
+        self.tracer.record('llm', latency, tokens=usage['total_tokens'])
+        with self.route_lock:
+            for name in self.token_usage:
+                self.token_usage[name] += usage[name]
+        self.log.write(f"(LLM: {usage['prompt_tokens']} prompt + {usage['completion_tokens']} "
+                       f"completion tokens, {latency:.2f}s)\n")
+    
+    def route_summary(self):
+        """One line with how many commands each routing path answered"""
+        with self.route_lock:
+            counts = dict(self.route_counts)
+            tokens = self.token_usage['total_tokens']
+        return ", ".join(f"{path} {count}" for path, count in counts.items()) + f"; {tokens} LLM tokens"
+    
+    def memory_summary(self):
+        """One line with how much conversation context LLM requests carried"""
+        stats = self.memory.stats()
+        return (f"{stats['turns']} turns remembered ({stats['summarized']} summarized), "
+                f"mean {stats['mean_context_tokens']} / max {stats['max_context_tokens']} context tokens, "
+                f"packed in {stats['mean_pack_ms']} ms")
+    
+    def update_route_label(self):
+        """Show routing counters and intent cache savings in the status bar"""
+        text = f"Routes: {self.route_summary()}"
+        if is_initialized(self, 'intent_cache'):
+            stats = self.intent_cache.stats()
+            text += f" | cache saved {stats['saved_seconds']:.1f}s, {stats['saved_tokens']} tokens"
+        self.route_label.config(text=text)
 
     def parse_command_locally(self, command):
         """Very simple keyword-based intent parsing as a fallback when API is unavailable."""
-        text = command.lower()
-        # web search
-        if text.startswith("search for ") or text.startswith("search "):
-            query = text.replace("search for ", "").replace("search ", "").strip()
-            return {"action": "web_search", "parameters": {"query": query}, "response": f"Searching the web for {query}."}
-        # open application
-        if text.startswith("open "):
-            app = text.replace("open ", "").strip()
-            return {"action": "open_application", "parameters": {"application": app}, "response": f"Opening {app}."}
-        # time/date
-        if "time" in text:
-            return {"action": "get_time", "parameters": {}, "response": "Here is the current time."}
-        if "date" in text or "today" in text:
-            return {"action": "get_date", "parameters": {}, "response": "Here is today’s date."}
-        # notes
-        if text.startswith("create a note") or text.startswith("note "):
-            content = text.split("note", 1)[-1].strip()
-            return {"action": "create_note", "parameters": {"content": content}, "response": "Creating a note."}
-        # weather
-        if text.startswith("weather in "):
-            city = text.replace("weather in ", "").strip()
-            return {"action": "weather", "parameters": {"city": city}, "response": f"Checking weather for {city}."}
-        # calculator
-        if text.startswith("calculate "):
-            expr = text.replace("calculate ", "").strip()
-            return {"action": "calculator", "parameters": {"expression": expr}, "response": "Calculating."}
-        # music
-        if "play music" in text or text.startswith("play "):
-            return {"action": "music", "parameters": {}, "response": "Playing music."}
-        # reminder
-        if text.startswith("remind me") or text.startswith("set reminder"):
-            return {"action": "reminder", "parameters": {"text": command}, "response": "Setting a reminder."}
-        # email
-        if "send email" in text or text.startswith("email"):
-            return {"action": "send_email", "parameters": {}, "response": "Opening your email client."}
-        # default
-        return {"action": "general_chat", "parameters": {}, "response": "I understand your request."}
+        return parse_command_locally(command)
     
     def toggle_listening(self):
         """Toggle voice listening on/off"""
@@ -272,6 +625,10 @@ class VoiceAssistant:
             self.stop_button.config(state=tk.NORMAL)
             self.status_label.config(text="Status: Listening...")
             
+            # Drop anything said while the assistant wasn't listening
+            if self.capture is not None:
+                self.capture.clear()
+            
             # Start listening in a separate thread
             self.listen_thread = threading.Thread(target=self.continuous_listen)
             self.listen_thread.daemon = True
@@ -282,27 +639,59 @@ class VoiceAssistant:
     def stop_listening(self):
         """Stop voice listening"""
         self.is_listening = False
+        if is_initialized(self, 'llm') and self.llm is not None:
+            self.llm.cancel_all()
         self.listen_button.config(text="🎤 Start Listening")
         self.stop_button.config(state=tk.DISABLED)
         self.status_label.config(text="Status: Ready")
     
     def continuous_listen(self):
-        """Continuously listen for voice commands"""
-        while self.is_listening:
-            command = self.listen()
-            if command:
-                self.process_command(command)
+        """Continuously listen for voice commands
+        
+        Capture, recognition, command handling and speech run as separate
+        pipeline stages, so the next command is heard while this one is answered.
+        """
+        self.pipeline = VoicePipeline(self.capture_audio, self.recognize_audio,
+                                      self.process_command, self.speak, tracer=self.tracer,
+                                      gate=self.wake_gate)
+        self.pipeline.run(lambda: self.is_listening)
+        
+        stats = self.pipeline.metrics()
+        summary = ", ".join(
+            f"{name} {stage['processed']} (max queue {stage['max_depth']})"
+            for name, stage in stats.items() if name != 'capture'
+        )
+        self.log.write(f"Pipeline: captured {stats['capture']['processed']}, {summary}\n")
+        if self.wake_gate is not None:
+            wake = self.wake_gate.stats()
+            self.log.write(f"Wake word: {wake['passed']} passed, {wake['dropped']} dropped, "
+                           f"{wake['cpu_ms_per_check']} ms CPU per check\n")
+        asr = self.asr.stats()
+        if asr['utterances']:
+            self.log.write(f"Speech recognition ({asr['backend']}): {asr['utterances']} utterances, "
+                           f"p50 {asr['p50_ms']} ms, p95 {asr['p95_ms']} ms\n")
+        if is_initialized(self, 'memory') and self.memory.turns:
+            self.log.write(f"Context: {self.memory_summary()}\n")
+        if is_initialized(self, 'speech') and self.speech.cache is not None:
+            tts = self.speech.cache.stats()
+            self.log.write(f"Speech cache: {tts['hit_rate']:.0%} hit rate ({tts['hits']} of "
+                           f"{tts['hits'] + tts['misses']}), {tts['saved_seconds']:.1f}s of synthesis saved, "
+                           f"{tts['entries']} phrases in {tts['megabytes']} MB\n")
+        latency = self.tracer.summary_line()
+        if latency:
+            self.log.write(f"Latency: {latency}\n")
     
     def process_text_command(self, event=None):
         """Process text-based commands"""
         command = self.text_input.get().strip()
         if command:
             self.text_input.delete(0, tk.END)
-            self.output_text.insert(tk.END, f"You: {command}\n")
-            self.output_text.see(tk.END)
-            self.process_command(command)
+            self.log.write(f"You: {command}\n")
+            # Keep the window responsive while the command is handled
+            self.command_executor.submit(self.process_command, command)
     
     # Task handlers
+    @tool_parameters(query="what to search the web for")
     def web_search(self, parameters):
         """Perform web search"""
         query = parameters.get('query', '')
@@ -312,6 +701,7 @@ class VoiceAssistant:
             return f"I've searched for '{query}' on the web."
         return "What would you like me to search for?"
     
+    @tool_parameters(application="application name, e.g. chrome")
     def open_application(self, parameters):
         """Open applications"""
         app_name = parameters.get('application', '').lower()
@@ -342,21 +732,30 @@ class VoiceAssistant:
         current_date = datetime.datetime.now().strftime("%B %d, %Y")
         return f"Today is {current_date}."
     
+    @tool_parameters(content="text of the note")
     def create_note(self, parameters):
         """Create a text note"""
         content = parameters.get('content', '')
         if content:
-            filename = f"note_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
-            with open(filename, 'w') as f:
-                f.write(content)
+            self.notes.add(content)
             return f"I've created a note with your content: {content}"
         return "What would you like me to write in the note?"
     
+    @tool_parameters(query="words to look for in saved notes")
+    def find_note(self, parameters):
+        """Search notes by the words they contain"""
+        from note_store import describe_notes
+        query = parameters.get('query', '')
+        if not query:
+            return "What should I look for in your notes?"
+        return describe_notes(self.notes.search(query), query)
+    
     def send_email(self, parameters):
         """Open email client"""
         webbrowser.open('mailto:')
         return "I've opened your email client."
     
+    @tool_parameters(city="city name")
     def get_weather(self, parameters):
         """Get weather information"""
         city = parameters.get('city', '')
@@ -366,14 +765,15 @@ class VoiceAssistant:
             return f"I've opened weather information for {city}."
         return "Which city's weather would you like to check?"
     
+    @tool_parameters(expression="arithmetic expression, e.g. 15 + 27")
     def calculator(self, parameters):
         """Basic calculator"""
         expression = parameters.get('expression', '')
         if expression:
             try:
-                result = eval(expression)
+                result = evaluate(expression)
                 return f"The result is {result}."
-            except:
+            except CalculationError:
                 return "I couldn't calculate that expression."
         return "What would you like me to calculate?"
     
@@ -382,6 +782,7 @@ class VoiceAssistant:
         webbrowser.open('https://open.spotify.com')
         return "I've opened Spotify for you."
     
+    @tool_parameters(text="what to be reminded about, and when")
     def set_reminder(self, parameters):
         """Set a reminder"""
         reminder_text = parameters.get('text', '')
@@ -394,8 +795,58 @@ class VoiceAssistant:
         """Start the voice assistant"""
         self.speak(f"Hello! I'm {self.assistant_name}, your AI voice assistant. How can I help you today?")
         self.root.mainloop()
+        self.shutdown()
+    
+    def shutdown(self):
+        """Release devices, worker threads and files that were set up during the session"""
+        if is_initialized(self, 'speech'):
+            self.speech.shutdown()
+        if is_initialized(self, 'capture') and self.capture is not None:
+            self.capture.stop()
+        if is_initialized(self, 'note_store'):
+            self.note_store.close()
+        if is_initialized(self, 'intent_cache'):
+            self.intent_cache.close()
+        if is_initialized(self, 'llm') and self.llm is not None:
+            self.llm.close()
+        self.tracer.close()
+    
+    def run_text(self):
+        """Text-only mode: read commands from stdin and print the replies"""
+        print(f"{self.assistant_name} text mode. Type 'quit' to exit.")
+        while True:
+            try:
+                command = input("You: ").strip()
+            except (EOFError, KeyboardInterrupt):
+                print()
+                break
+            if command.lower() in ('quit', 'exit', 'q'):
+                break
+            if command:
+                self.process_command(command)
+        print(f"Routes: {self.route_summary()}")
+        if is_initialized(self, 'memory') and self.memory.turns:
+            print(f"Context: {self.memory_summary()}")
+        self.shutdown()
+        latency = self.tracer.summary_line()
+        if latency:
+            print(f"Latency: {latency}")
 
 if __name__ == "__main__":
-    assistant = VoiceAssistant()
-    assistant.run()
+    parser = argparse.ArgumentParser(description="AI Voice Assistant")
+    parser.add_argument('--text', action='store_true',
+                        help="text-only mode: no window, microphone or speech output")
+    parser.add_argument('--startup-report', action='store_true',
+                        help="print how long each deferred import and initialization took")
+    args = parser.parse_args()
+    
+    assistant = VoiceAssistant(text_only=args.text)
+    if args.text:
+        if args.startup_report:
+            startup.report()
+        assistant.run_text()
+    else:
+        if args.startup_report:
+            assistant.root.after(0, startup.report)
+        assistant.run()
 
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Registry of assistant modules.
+Each module is described by metadata: a name, an import target and the
+keywords that route to it. Routing tables are built from the metadata alone,
+and a module is imported and constructed the first time a command routes to
+it. Besides the built-in modules, modules are discovered from the
+"voice_assistant.modules" entry point group and from modules.json.
+
+    python module_registry.py            # list modules and whether they are loaded
+    python module_registry.py --check    # import everything and compare keywords
+"""
+
+import argparse
+import importlib
+import json
+import os
+import threading
+
+import startup
+
+ENTRY_POINT_GROUP = 'voice_assistant.modules'
+PLUGIN_PRIORITY = 1000  # after the built-in modules unless a plugin says otherwise
+
+class ModuleSpec:
+    """Metadata for one module: where it lives and which keywords route to it
+
+    target is "package.module:Class" (or a factory function). services names
+    shared objects passed to the constructor as keyword arguments; options
+    are passed as-is.
+    """
+
+    def __init__(self, name, target, keywords=(), terms=(), priority=PLUGIN_PRIORITY, services=(),
+                 options=None, description=""):
+        self.name = name
+        self.target = target
+        self.keywords = tuple(keywords)
+        self.terms = tuple(terms)
+        self.priority = priority
+        self.services = tuple(services)
+        self.options = dict(options or {})
+        self.description = description
+
+    @classmethod
+    def from_dict(cls, data, name=None):
+        fields = ('target', 'keywords', 'terms', 'priority', 'services', 'options', 'description')
+        return cls(data.get('name', name), **{field: data[field] for field in fields if field in data})
+
+    def can_handle(self, command):
+        """Keyword check without importing the module"""
+        command_lower = command.lower()
+        return any(keyword in command_lower for keyword in self.keywords)
+
+    def load(self):
+        """Import the module's class or factory"""
+        module_name, _, attribute = self.target.partition(':')
+        return getattr(importlib.import_module(module_name), attribute)
+
+    def __repr__(self):
+        return f"<ModuleSpec {self.name} -> {self.target}>"
+
+def _builtin(name, target, keywords, terms=(), services=()):
+    return ModuleSpec(name, f"assistant_modules:{target}", keywords, terms, services=services)
+
+# The built-in modules in routing priority order. Keywords and terms repeat the
+# class attributes so routing needs no import; --check verifies they agree, and
+# the test suite runs the same check.
+BUILTIN_MODULES = [
+    _builtin('note_search', 'NoteSearchModule',
+             ('note about', 'notes about', 'notes on', 'notes mentioning', 'search notes', 'search my notes',
+              'find note'),
+             services=('store',)),
+    _builtin('web_search', 'WebSearchModule', ('search', 'find', 'look up', 'google'), ('search for',)),
+    _builtin('applications', 'ApplicationModule', ('open', 'launch'),
+             ('calculator', 'notes', 'safari', 'chrome', 'spotify', 'mail', 'terminal', 'finder', 'photos',
+              'music', 'facetime', 'messages', 'calendar', 'reminders', 'maps', 'settings')),
+    _builtin('time_date', 'TimeDateModule', ('time', 'hour', 'clock', 'date', 'day', 'today', 'tomorrow')),
+    _builtin('notes', 'NoteModule', ('note', 'write', 'create note', 'save note'), services=('store',)),
+    _builtin('weather', 'WeatherModule', ('weather', 'temperature', 'forecast'), ('weather in', 'weather for')),
+    _builtin('calculator', 'CalculatorModule',
+             ('calculate', 'compute', 'math', 'plus', 'minus', 'times', 'divided')),
+    _builtin('music', 'MusicModule', ('music', 'play', 'song', 'spotify', 'apple music')),
+    _builtin('email', 'EmailModule', ('email', 'mail', 'send email', 'compose')),
+    _builtin('reminders', 'ReminderModule', ('reminder', 'remind', 'task', 'todo')),
+    _builtin('system', 'SystemModule', ('volume', 'brightness', 'wifi', 'bluetooth', 'restart', 'shutdown'))
+]
+for _priority, _spec in enumerate(BUILTIN_MODULES):
+    _spec.priority = _priority * 10
+
+def entry_point_specs(log=print):
+    """Specs from installed packages' "voice_assistant.modules" entry points
+
+    An entry point should name a metadata dict (or ModuleSpec) in a small
+    module, so discovery doesn't import the implementation. Pointing it at
+    the module class works too, at the cost of importing it at startup.
+    """
+    from importlib import metadata
+    try:
+        found = metadata.entry_points(group=ENTRY_POINT_GROUP)
+    except TypeError:  # Python < 3.10
+        found = metadata.entry_points().get(ENTRY_POINT_GROUP, [])
+    specs = []
+    for entry_point in found:
+        try:
+            loaded = entry_point.load()
+        except Exception as e:
+            log(f"Skipping module plugin '{entry_point.name}': {e}")
+            continue
+        if isinstance(loaded, ModuleSpec):
+            specs.append(loaded)
+        elif isinstance(loaded, dict):
+            specs.append(ModuleSpec.from_dict(loaded, entry_point.name))
+        else:
+            specs.append(ModuleSpec(entry_point.name, entry_point.value, getattr(loaded, 'keywords', ()),
+                                    getattr(loaded, 'terms', ())))
+    return specs
+
+def config_entries(path):
+    """Module entries from a JSON config file ({"modules": [...]} or a plain list)"""
+    if not path or not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    return data.get('modules', []) if isinstance(data, dict) else data
+
+class ModuleRegistry:
+    """Module specs in priority order, with instances created on first use
+
+    services maps a service name to a zero-argument callable; it is only
+    called when a module that needs the service is created.
+    """
+
+    def __init__(self, specs=(), services=None):
+        self.specs = sorted(specs, key=lambda spec: spec.priority)
+        self.services = dict(services or {})
+        self.instances = {}
+        self.lock = threading.RLock()
+
+    @classmethod
+    def discover(cls, config_path=None, entry_points=True, services=None, log=print):
+        """Built-in modules, entry point plugins, then MODULES_CONFIG (default modules.json)
+
+        A config entry with the name of a known module updates it
+        ("enabled": false removes it); other entries add modules.
+        """
+        specs = {spec.name: spec for spec in BUILTIN_MODULES}
+        if entry_points:
+            for spec in entry_point_specs(log):
+                specs[spec.name] = spec
+        config_path = config_path or os.getenv('MODULES_CONFIG', 'modules.json')
+        for entry in config_entries(config_path):
+            name = entry.get('name')
+            if not entry.get('enabled', True):
+                specs.pop(name, None)
+            elif name in specs:
+                current = specs[name]
+                fields = {'name': name, 'target': current.target, 'keywords': current.keywords,
+                          'terms': current.terms, 'priority': current.priority, 'services': current.services,
+                          'options': current.options, 'description': current.description}
+                fields.update(entry)
+                specs[name] = ModuleSpec.from_dict(fields)
+            elif name and entry.get('target'):
+                specs[name] = ModuleSpec.from_dict(entry)
+            else:
+                log(f"Ignoring module entry without a name and target in {config_path}: {entry}")
+        return cls(specs.values(), services)
+
+    def add(self, spec):
+        """Register another module (keeps priority order)"""
+        with self.lock:
+            self.specs = sorted(self.specs + [spec], key=lambda item: item.priority)
+
+    def spec(self, name):
+        return next((spec for spec in self.specs if spec.name == name), None)
+
+    def get(self, name):
+        """The module instance, imported and constructed on first use"""
+        instance = self.instances.get(name)
+        if instance is not None:
+            return instance
+        with self.lock:
+            if name not in self.instances:
+                spec = self.spec(name)
+                if spec is None:
+                    raise KeyError(f"no module named '{name}'")
+                with startup.timed(f"load module {name}"):
+                    kwargs = {service: self.services[service]() for service in spec.services}
+                    kwargs.update(spec.options)
+                    self.instances[name] = spec.load()(**kwargs)
+            return self.instances[name]
+
+    def loaded(self):
+        """Names of the modules created so far"""
+        return list(self.instances)
+
+    def check(self):
+        """Import every module and report keyword/term metadata that disagrees with the class"""
+        problems = []
+        for spec in self.specs:
+            try:
+                module = self.get(spec.name)
+            except Exception as e:
+                problems.append(f"{spec.name}: can't load {spec.target}: {e}")
+                continue
+            for field in ('keywords', 'terms'):
+                declared = set(getattr(spec, field))
+                actual = set(getattr(module, field, ()))
+                if declared != actual:
+                    problems.append(f"{spec.name}: {field} metadata {sorted(declared)} != module {sorted(actual)}")
+        return problems
+
+def main():
+    parser = argparse.ArgumentParser(description="List the assistant's modules")
+    parser.add_argument('--config', help="module config file (default: MODULES_CONFIG or modules.json)")
+    parser.add_argument('--check', action='store_true', help="import every module and verify its metadata")
+    args = parser.parse_args()
+
+    from assistant_modules import ModuleManager
+    manager = ModuleManager(ModuleRegistry.discover(args.config))
+    registry = manager.registry
+    if args.check:
+        problems = registry.check()
+        print("\n".join(problems) or f"{len(registry.specs)} modules OK")
+        raise SystemExit(1 if problems else 0)
+    for spec in registry.specs:
+        state = "loaded" if spec.name in registry.instances else "not loaded"
+        print(f"{spec.priority:>5}  {spec.name:<14}{spec.target:<40}{len(spec.keywords):>3} keywords  {state}")
+
+if __name__ == "__main__":
+    main()
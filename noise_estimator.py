@@ -0,0 +1,87 @@
+"""
+Background ambient-noise estimation for speech recognition.
+Tracks the noise floor from the audio frames the recognizer is already
+reading, so listen() no longer has to stop and calibrate before every command.
+"""
+
+import numpy as np
+
+SAMPLE_TYPES = {1: np.int8, 2: np.int16, 4: np.int32}
+
+def frame_rms(data, sample_width):
+    """Root-mean-square energy of a raw PCM frame"""
+    samples = np.frombuffer(data, dtype=SAMPLE_TYPES[sample_width])
+    if not samples.size:
+        return 0.0
+    samples = samples.astype(np.float64)
+    return float(np.sqrt(np.dot(samples, samples) / samples.size))
+
+class AmbientNoiseEstimator:
+    """Rolling noise-floor estimate that keeps recognizer.energy_threshold up to date
+
+    The RMS of every frame read from the stream goes into a fixed-size window.
+    A low percentile of that window follows the quiet gaps between and inside
+    phrases, so speech itself barely moves the estimate while a louder room
+    (a fan, the TV) raises the threshold within a few seconds.
+    """
+
+    def __init__(self, recognizer, window=100, percentile=20, ratio=1.5,
+                 min_threshold=50.0, max_threshold=4000.0, update_every=4):
+        self.recognizer = recognizer
+        self.levels = np.zeros(window)
+        self.count = 0
+        self.index = 0
+        self.frames = 0
+        self.percentile = percentile
+        self.ratio = ratio
+        self.min_threshold = min_threshold
+        self.max_threshold = max_threshold
+        self.update_every = update_every
+        self.noise_floor = None
+
+        # The estimator owns the threshold from now on
+        self.recognizer.dynamic_energy_threshold = False
+
+    def update(self, data, sample_width):
+        """Feed one raw audio frame into the estimate"""
+        self.levels[self.index] = frame_rms(data, sample_width)
+        self.index = (self.index + 1) % len(self.levels)
+        self.count = min(self.count + 1, len(self.levels))
+        self.frames += 1
+
+        if self.frames % self.update_every == 0:
+            self.noise_floor = float(np.percentile(self.levels[:self.count], self.percentile))
+            threshold = self.noise_floor * self.ratio
+            self.recognizer.energy_threshold = min(max(threshold, self.min_threshold),
+                                                   self.max_threshold)
+
+    def attach(self, source, prime_duration=0.5):
+        """Route an open audio source's frames through the estimator
+
+        The first time this is called there is no estimate yet, so a short
+        stretch of audio is read to seed it; later calls return immediately.
+        """
+        if not isinstance(source.stream, NoiseTrackingStream):
+            source.stream = NoiseTrackingStream(source.stream, self, source.SAMPLE_WIDTH)
+
+        if self.noise_floor is None:
+            frames = max(self.update_every, int(prime_duration * source.SAMPLE_RATE / source.CHUNK))
+            for _ in range(frames):
+                source.stream.read(source.CHUNK)
+
+class NoiseTrackingStream:
+    """Audio stream wrapper that feeds every frame it reads to an AmbientNoiseEstimator"""
+
+    def __init__(self, stream, estimator, sample_width):
+        self.stream = stream
+        self.estimator = estimator
+        self.sample_width = sample_width
+
+    def read(self, size):
+        data = self.stream.read(size)
+        if data:
+            self.estimator.update(data, self.sample_width)
+        return data
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Log-structured note storage.
+Notes are appended as JSON lines to a few large segment files instead of one
+file per note. An offset index finds a note's record directly, an inverted
+word index answers "find my note about X", and compaction rewrites the live
+notes once enough of the log has been deleted.
+
+    python note_store.py import .        # notes older versions saved as note_*.txt
+    python note_store.py search groceries
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import threading
+import time
+
+WORD = re.compile(r"[a-z0-9']+")
+STOPWORDS = {
+    'a', 'an', 'the', 'and', 'or', 'to', 'of', 'in', 'on', 'for', 'at', 'by', 'with',
+    'is', 'it', 'my', 'me', 'i', 'about', 'that', 'this', 'be', 'was', 'are'
+}
+
+def tokenize(text):
+    """Lowercase words worth indexing"""
+    return {word for word in WORD.findall(text.lower()) if word not in STOPWORDS}
+
+class NoteStore:
+    """Append-only, segment-based note store with an offset index and an inverted word index
+
+    Opening is deferred until the first operation. The in-memory indexes are
+    checkpointed to disk; on open, only log records written after the last
+    checkpoint are replayed.
+    """
+
+    def __init__(self, directory="notes", segment_size=4 * 1024 * 1024, checkpoint_every=1000,
+                 fsync=False):
+        self.directory = directory
+        self.segment_dir = os.path.join(directory, "segments")
+        self.checkpoint_path = os.path.join(directory, "index.json")
+        self.segment_size = segment_size
+        self.checkpoint_every = checkpoint_every
+        self.fsync = fsync
+        self.lock = threading.RLock()
+        self.opened = False
+
+    # Public API
+
+    def add(self, text, timestamp=None):
+        """Append a note and return its id"""
+        with self.lock:
+            self._open()
+            note_id = self.next_id
+            self.next_id += 1
+            record = {'id': note_id, 'ts': timestamp or time.time(), 'text': text}
+            self._append(record)
+            return note_id
+
+    def get(self, note_id):
+        """Return {'id', 'ts', 'text'} for a note, or None"""
+        with self.lock:
+            self._open()
+            location = self.offsets.get(note_id)
+            if location is None:
+                return None
+            return self._read(location)
+
+    def delete(self, note_id):
+        """Delete a note (written as a tombstone; space is reclaimed by compact())"""
+        with self.lock:
+            self._open()
+            if note_id not in self.offsets:
+                return False
+            self._append({'id': note_id, 'deleted': True})
+            return True
+
+    def recent(self, limit=5):
+        """The most recently added notes, newest first"""
+        with self.lock:
+            self._open()
+            ids = sorted(self.offsets, reverse=True)[:limit]
+            return [self._read(self.offsets[note_id]) for note_id in ids]
+
+    def search(self, query, limit=5):
+        """Notes matching the words of query, best matches (then newest) first"""
+        words = tokenize(query)
+        if not words:
+            return []
+        with self.lock:
+            self._open()
+            scores = {}
+            for word in words:
+                for note_id in self.postings.get(word, ()):
+                    scores[note_id] = scores.get(note_id, 0) + 1
+            ranked = sorted(scores, key=lambda note_id: (scores[note_id], note_id), reverse=True)
+            return [self._read(self.offsets[note_id]) for note_id in ranked[:limit]]
+
+    def __len__(self):
+        with self.lock:
+            self._open()
+            return len(self.offsets)
+
+    def import_legacy(self, directory):
+        """Add the note_*.txt files older versions saved in directory; returns how many were new
+
+        Files whose text and modification time match a stored note are
+        skipped, so importing a directory twice adds nothing.
+        """
+        paths = glob.glob(os.path.join(directory, "note_*.txt"))
+        imported = 0
+        with self.lock:
+            self._open()
+            for path in sorted(paths, key=lambda path: (os.path.getmtime(path), path)):
+                with open(path, encoding='utf-8', errors='replace') as f:
+                    text = f.read()
+                timestamp = os.path.getmtime(path)
+                if not self._contains(text, timestamp):
+                    self._append({'id': self.next_id, 'ts': timestamp, 'text': text}, checkpoint=False)
+                    imported += 1
+            if imported:
+                self.checkpoint()
+        return imported
+
+    def compact(self):
+        """Rewrite live notes into fresh segments and drop the old ones"""
+        with self.lock:
+            self._open()
+            old_segments = self._segment_numbers()
+            live = [self._read(self.offsets[note_id]) for note_id in sorted(self.offsets)]
+
+            self._close_active()
+            self.active_number = (old_segments[-1] + 1) if old_segments else 1
+            self.sizes = {}
+            self.offsets = {}
+            self.postings = {}
+            self.dead_bytes = 0
+            for note in live:
+                self._append(note, checkpoint=False)
+            self._close_active()
+
+            for number in old_segments:
+                os.remove(self._segment_path(number))
+            self.checkpoint()
+
+    def checkpoint(self):
+        """Persist the indexes so the next open only replays newer records"""
+        with self.lock:
+            if not self.opened:
+                return
+            if self.active is not None:
+                self.active.flush()
+            # JSON keys are strings and it has no sets: ids go in as strings, word sets as lists
+            state = {
+                'sizes': self.sizes, 'next_id': self.next_id, 'offsets': self.offsets,
+                'postings': {word: sorted(ids) for word, ids in self.postings.items()},
+                'dead_bytes': self.dead_bytes
+            }
+            temporary = self.checkpoint_path + ".tmp"
+            with open(temporary, 'w', encoding='utf-8') as f:
+                json.dump(state, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(temporary, self.checkpoint_path)
+            self.unsaved = 0
+
+    def close(self):
+        """Checkpoint and close the active segment"""
+        with self.lock:
+            if self.opened:
+                self.checkpoint()
+                self._close_active()
+                self.opened = False
+
+    def stats(self):
+        with self.lock:
+            self._open()
+            total = sum(self.sizes.values())
+            return {
+                'notes': len(self.offsets),
+                'segments': len(self.sizes),
+                'bytes': total,
+                'dead_bytes': self.dead_bytes,
+                'words': len(self.postings)
+            }
+
+    # Internals
+
+    def _open(self):
+        if self.opened:
+            return
+        os.makedirs(self.segment_dir, exist_ok=True)
+        self.active = None
+        self.unsaved = 0
+        self.sizes = {}        # segment number -> bytes covered by the index
+        self.offsets = {}      # note id -> (segment number, offset, length)
+        self.postings = {}     # word -> set of note ids
+        self.next_id = 1
+        self.dead_bytes = 0
+
+        try:
+            with open(self.checkpoint_path, encoding='utf-8') as f:
+                state = json.load(f)
+            self.sizes = {int(number): size for number, size in state['sizes'].items()}
+            self.next_id = state['next_id']
+            self.offsets = {int(note_id): tuple(location) for note_id, location in state['offsets'].items()}
+            self.postings = {word: set(ids) for word, ids in state['postings'].items()}
+            self.dead_bytes = state['dead_bytes']
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            # No checkpoint (or an unreadable one): every segment is replayed from the start
+            self.sizes, self.offsets, self.postings, self.next_id, self.dead_bytes = {}, {}, {}, 1, 0
+
+        segments = self._segment_numbers()
+        # Forget segments that no longer exist (e.g. a crash mid-compaction)
+        if any(number not in segments for number in self.sizes):
+            self.sizes, self.offsets, self.postings, self.next_id, self.dead_bytes = {}, {}, {}, 1, 0
+        for number in segments:
+            self._replay(number, self.sizes.get(number, 0))
+
+        self.active_number = segments[-1] if segments else 1
+        self.opened = True
+        if not segments:
+            self._import_legacy_notes()
+
+    def _replay(self, number, start):
+        path = self._segment_path(number)
+        with open(path, 'rb') as f:
+            f.seek(start)
+            offset = start
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break  # torn final write; it will be overwritten by the next append
+                self._apply(json.loads(line), number, offset, len(line))
+                offset += len(line)
+        self.sizes[number] = offset
+
+    def _apply(self, record, number, offset, length):
+        note_id = record['id']
+        if record.get('deleted'):
+            self.dead_bytes += length
+            location = self.offsets.pop(note_id, None)
+            if location is not None:
+                self.dead_bytes += location[2]
+                for word in tokenize(self._read(location)['text']):
+                    ids = self.postings.get(word)
+                    if ids is not None:
+                        ids.discard(note_id)
+                        if not ids:
+                            del self.postings[word]
+            return
+        self.offsets[note_id] = (number, offset, length)
+        self.next_id = max(self.next_id, note_id + 1)
+        for word in tokenize(record['text']):
+            self.postings.setdefault(word, set()).add(note_id)
+
+    def _append(self, record, checkpoint=True):
+        data = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+        if self.active is not None and self.sizes.get(self.active_number, 0) + len(data) > self.segment_size:
+            self._close_active()
+            self.active_number += 1
+        if self.active is None:
+            path = self._segment_path(self.active_number)
+            self.active = open(path, 'ab')
+            # Drop a torn record left by a crash before appending after it
+            self.active.truncate(self.sizes.get(self.active_number, 0))
+            self.active.seek(0, os.SEEK_END)
+
+        offset = self.sizes.get(self.active_number, 0)
+        self.active.write(data)
+        self.active.flush()
+        if self.fsync:
+            os.fsync(self.active.fileno())
+        self.sizes[self.active_number] = offset + len(data)
+        self._apply(record, self.active_number, offset, len(data))
+
+        self.unsaved += 1
+        if checkpoint and self.unsaved >= self.checkpoint_every:
+            self.checkpoint()
+
+    def _read(self, location):
+        number, offset, length = location
+        if self.active is not None and number == self.active_number:
+            self.active.flush()
+        with open(self._segment_path(number), 'rb') as f:
+            f.seek(offset)
+            record = json.loads(f.read(length))
+        return {'id': record['id'], 'ts': record['ts'], 'text': record['text']}
+
+    def _close_active(self):
+        if self.active is not None:
+            self.active.close()
+            self.active = None
+
+    def _segment_path(self, number):
+        return os.path.join(self.segment_dir, f"{number:06d}.log")
+
+    def _segment_numbers(self):
+        paths = glob.glob(os.path.join(self.segment_dir, "*.log"))
+        return sorted(int(os.path.basename(path)[:-4]) for path in paths)
+
+    def _import_legacy_notes(self):
+        # One-time migration of the old one-file-per-note layout in this store's own directory
+        self.import_legacy(self.directory)
+
+    def _contains(self, text, timestamp):
+        words = tokenize(text)
+        candidates = set.intersection(*(self.postings.get(word, set()) for word in words)) if words else self.offsets
+        return any(note['ts'] == timestamp and note['text'] == text
+                   for note in (self._read(self.offsets[note_id]) for note_id in candidates))
+
+NOTE_QUERY_WORDS = re.compile(
+    r"\b(find|search|show|look up|look for|read|open|get|what|which|did|do|i|write|wrote|"
+    r"notes?|mentioning|mentions?|regarding|containing|called|titled)\b")
+
+def extract_note_query(command):
+    """The topic of a spoken note search ("find my note about groceries" -> "groceries")"""
+    query = NOTE_QUERY_WORDS.sub(' ', command.lower())
+    return ' '.join(word for word in WORD.findall(query) if word not in STOPWORDS)
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def shared_store(directory=None):
+    """The process's NoteStore for directory (default NOTES_DIR, else notes)
+
+    Two live stores on one directory would each keep their own next id and
+    offsets and miss each other's appends, so the assistant and its modules
+    all open the directory through here.
+    """
+    directory = directory or os.getenv('NOTES_DIR', 'notes')
+    with _stores_lock:
+        key = os.path.realpath(directory)
+        if key not in _stores:
+            _stores[key] = NoteStore(directory)
+        return _stores[key]
+
+def describe_notes(notes, query, limit=3):
+    """Short spoken summary of search results"""
+    if not notes:
+        return f"I couldn't find any notes about {query}."
+    shown = notes[:limit]
+    parts = [f"{time.strftime('%B %d', time.localtime(note['ts']))}: {note['text']}" for note in shown]
+    heading = "I found one note" if len(notes) == 1 else f"I found {len(notes)} notes"
+    return f"{heading} about {query}. " + " ".join(parts)
+
+def main():
+    parser = argparse.ArgumentParser(description="Import and search notes")
+    parser.add_argument('--directory', default=os.getenv('NOTES_DIR', 'notes'))
+    commands = parser.add_subparsers(dest='command', required=True)
+    migrate = commands.add_parser('import', help="import note_*.txt files saved by older versions")
+    migrate.add_argument('directories', nargs='+')
+    search = commands.add_parser('search', help="notes containing the words")
+    search.add_argument('words', nargs='+')
+    commands.add_parser('stats')
+    args = parser.parse_args()
+
+    store = NoteStore(args.directory)
+    if args.command == 'import':
+        for directory in args.directories:
+            print(f"Imported {store.import_legacy(directory)} notes from {directory}")
+    elif args.command == 'search':
+        query = ' '.join(args.words)
+        print(describe_notes(store.search(query), query))
+    else:
+        print(json.dumps(store.stats(), indent=2))
+    store.close()
+
+if __name__ == "__main__":
+    main()
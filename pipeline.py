@@ -0,0 +1,213 @@
+"""
+Staged voice pipeline for continuous listening.
+Capture, recognition, intent dispatch and speech output each run on their own
+worker with a bounded queue in between, so the microphone is already picking
+up the next command while the previous one is being recognized and answered.
+"""
+
+import queue
+import re
+import threading
+import time
+from collections import Counter, deque
+from contextlib import nullcontext
+
+STOP = object()
+
+# A command is taken for an echo of recent speech only when it is most of a spoken
+# reply, so short genuine commands ("time") that a reply happened to contain get through
+ECHO_SIMILARITY = 0.8
+ECHO_MIN_WORDS = 3
+
+def _words(text):
+    return re.findall(r"[\w']+", text.lower())
+
+def echo_similarity(heard, spoken):
+    """Share of words the two texts have in common, relative to the longer one"""
+    heard_words, spoken_words = Counter(_words(heard)), Counter(_words(spoken))
+    longest = max(sum(heard_words.values()), sum(spoken_words.values()))
+    return sum((heard_words & spoken_words).values()) / longest if longest else 0.0
+
+class Stage:
+    """A worker thread that consumes items from a bounded inbox"""
+
+    def __init__(self, name, handler, maxsize):
+        self.name = name
+        self.handler = handler
+        self.inbox = queue.Queue(maxsize=maxsize)
+        self.thread = threading.Thread(target=self._run, name=f"pipeline-{name}", daemon=True)
+
+        # Metrics
+        self.processed = 0
+        self.errors = 0
+        self.max_depth = 0
+        self.busy_seconds = 0.0
+        self.blocked_seconds = 0.0  # time producers spent waiting on a full inbox
+
+    def put(self, item, is_active):
+        """Block while the inbox is full (backpressure); give up if the pipeline stops"""
+        started = time.perf_counter()
+        while True:
+            try:
+                self.inbox.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                if not is_active():
+                    return False
+        self.blocked_seconds += time.perf_counter() - started
+        self.max_depth = max(self.max_depth, self.inbox.qsize())
+        return True
+
+    def _run(self):
+        while True:
+            item = self.inbox.get()
+            if item is STOP:
+                return
+            started = time.perf_counter()
+            try:
+                self.handler(item)
+                self.processed += 1
+            except Exception:
+                self.errors += 1
+            self.busy_seconds += time.perf_counter() - started
+
+    def metrics(self):
+        return {
+            'depth': self.inbox.qsize(),
+            'max_depth': self.max_depth,
+            'processed': self.processed,
+            'errors': self.errors,
+            'avg_seconds': round(self.busy_seconds / self.processed, 3) if self.processed else 0.0,
+            'blocked_seconds': round(self.blocked_seconds, 3)
+        }
+
+class VoicePipeline:
+    """capture -> recognize -> dispatch -> speak, each stage on its own worker
+
+    capture() returns one utterance (or None when nothing was heard),
+    recognize(audio) returns the command text (or None), dispatch(command, say)
+    handles a command and passes everything it wants spoken to say(), and
+    speak(text) produces the audio output.
+
+    An optional gate(audio) runs on the capture thread before recognition and
+    returns the audio to recognize or None to drop it (see wake_word.py).
+
+    With a tracing.Tracer, every captured utterance starts a turn that is made
+    current on each stage's thread while it handles that utterance, so spans
+    recorded by the callbacks are attributed to the right turn.
+    """
+
+    def __init__(self, capture, recognize, dispatch, speak, queue_size=2, echo_window=10.0,
+                 tracer=None, gate=None):
+        self.capture = capture
+        self.tracer = tracer
+        self.gate = gate
+        self.recognize_fn = recognize
+        self.dispatch_fn = dispatch
+        self.speak_fn = speak
+        self.active = False
+
+        self.recognize_stage = Stage('recognize', self._recognize, queue_size)
+        self.dispatch_stage = Stage('dispatch', self._dispatch, queue_size)
+        self.speak_stage = Stage('speak', self._speak, queue_size * 4)
+        self.stages = [self.recognize_stage, self.dispatch_stage, self.speak_stage]
+        self.captured = 0
+        self.gated = 0
+
+        # Recently spoken text, so the microphone hearing the assistant isn't taken as a command
+        self.echo_window = echo_window
+        self.recent_speech = deque(maxlen=16)
+        self.echoes = 0
+
+    def is_active(self):
+        return self.active
+
+    def run(self, keep_running):
+        """Run the capture stage on the calling thread until keep_running() is false"""
+        self.active = True
+        for stage in self.stages:
+            stage.thread.start()
+        try:
+            while keep_running():
+                started = time.perf_counter()
+                audio = self.capture()
+                if audio is None:
+                    continue
+                self.captured += 1
+                captured_at = time.perf_counter()
+                if self.gate is not None:
+                    audio = self.gate(audio)
+                    if audio is None:
+                        self.gated += 1
+                        continue
+                turn = None
+                if self.tracer:
+                    turn = self.tracer.new_turn('voice')
+                    self.tracer.record('capture', captured_at - started, turn)
+                    if self.gate is not None:
+                        self.tracer.record('wake', time.perf_counter() - captured_at, turn)
+                if not self.recognize_stage.put((turn, audio), keep_running):
+                    break
+        finally:
+            self.stop()
+
+    def stop(self):
+        """Let queued work finish and shut the workers down in pipeline order"""
+        if not self.active:
+            return
+        # Stages stay active while draining, so a full inbox still applies backpressure
+        # to the stage feeding it instead of dropping queued work
+        for stage in self.stages:
+            stage.inbox.put(STOP)
+            stage.thread.join()
+        self.active = False
+
+    def metrics(self):
+        """Queue depth and throughput of every stage"""
+        stats = {'capture': {'processed': self.captured, 'gated': self.gated, 'echoes_ignored': self.echoes}}
+        for stage in self.stages:
+            stats[stage.name] = stage.metrics()
+        return stats
+
+    def _activate(self, turn):
+        return self.tracer.activate(turn) if self.tracer else nullcontext()
+
+    def _recognize(self, item):
+        turn, audio = item
+        with self._activate(turn):
+            command = self.recognize_fn(audio)
+        if not command:
+            return
+        if self._is_echo(command):
+            self.echoes += 1
+            return
+        self.dispatch_stage.put((turn, command), self.is_active)
+
+    def _dispatch(self, item):
+        turn, command = item
+        # A new command supersedes replies to older ones that haven't been spoken yet
+        while True:
+            try:
+                item = self.speak_stage.inbox.get_nowait()
+            except queue.Empty:
+                break
+            if item is STOP:
+                self.speak_stage.inbox.put(STOP)
+                break
+        with self._activate(turn):
+            self.dispatch_fn(command, lambda text: self.speak_stage.put((turn, text), self.is_active))
+        if turn is not None:
+            self.tracer.end_turn(turn)
+
+    def _speak(self, item):
+        turn, text = item
+        self.recent_speech.append((time.monotonic(), text))
+        with self._activate(turn):
+            self.speak_fn(text)
+
+    def _is_echo(self, command):
+        if len(_words(command)) < ECHO_MIN_WORDS:
+            return False
+        cutoff = time.monotonic() - self.echo_window
+        return any(spoken_at >= cutoff and echo_similarity(command, spoken) >= ECHO_SIMILARITY
+                   for spoken_at, spoken in self.recent_speech)
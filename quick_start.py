@@ -4,10 +4,16 @@ Quick Start Script for AI Voice Assistant
 This script checks dependencies and launches the appropriate assistant version.
 """
 
+import os
 import sys
+import json
+import hashlib
 import subprocess
 import importlib.util
 
+# Remembers a successful dependency check so later launches skip the probes
+STAMP_FILE = ".quick_start_ok"
+
 def check_dependency(module_name):
     """Check if a module is available"""
     return importlib.util.find_spec(module_name) is not None
@@ -20,10 +26,43 @@ def install_dependency(package_name):
     except subprocess.CalledProcessError:
         return False
 
+def environment_fingerprint():
+    """Identify this interpreter and requirements.txt so a stale check is never reused"""
+    digest = hashlib.sha256()
+    digest.update(sys.executable.encode())
+    digest.update(sys.version.encode())
+    requirements = os.path.join(os.path.dirname(os.path.abspath(__file__)), "requirements.txt")
+    if os.path.exists(requirements):
+        with open(requirements, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+def load_stamp():
+    """Return the saved check result if it still matches this environment"""
+    try:
+        with open(STAMP_FILE) as f:
+            stamp = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return stamp if stamp.get('fingerprint') == environment_fingerprint() else None
+
+def save_stamp(has_openai):
+    try:
+        with open(STAMP_FILE, 'w') as f:
+            json.dump({'fingerprint': environment_fingerprint(), 'has_openai': has_openai}, f)
+    except OSError:
+        pass
+
 def main():
     print("🎤 AI Voice Assistant - Quick Start")
     print("=" * 50)
     
+    stamp = None if '--recheck' in sys.argv else load_stamp()
+    if stamp:
+        print("✅ Dependencies verified on an earlier run (use --recheck to check again)")
+        launch(stamp['has_openai'])
+        return
+    
     # Check Python version
     if sys.version_info < (3, 7):
         print("❌ Python 3.7 or higher is required.")
@@ -92,9 +131,21 @@ def main():
             print("  Ubuntu: sudo apt-get install python3-pyaudio")
             print("  Windows: pip install PyAudio")
     
+    # Render the assistant's fixed replies once, so they play from disk (see tts_cache.py)
+    print("\n🔊 Pre-rendering common phrases...")
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tts_cache.py")
+    if subprocess.call([sys.executable, script, "--prerender"]) != 0:
+        print("⚠️  Could not pre-render phrases; they will be cached as they are spoken")
+    
     # Check if OpenAI is available for advanced features
     has_openai = check_dependency('openai')
     
+    if check_dependency('pyaudio'):
+        save_stamp(has_openai)
+    launch(has_openai)
+
+def launch(has_openai):
+    """Start the advanced assistant when OpenAI is available, else the simple one"""
     print("\n🚀 Starting Voice Assistant...")
     
     if has_openai:
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Speech recognizer backends.
+The assistant turns audio into text through a RecognizerBackend, chosen per
+deployment with ASR_BACKEND:
+
+    google        Google Web Speech API (the default; needs a network)
+    vosk          offline Vosk engine, constrained to the assistant's vocabulary
+    vosk,google   Vosk first, Google when the grammar can't cover the utterance
+
+The Vosk grammar is built from the module keyword tables, application names,
+the local intent parser's phrases and spoken numbers, so decoding searches a
+few hundred words instead of a full language model. Every backend records
+its latency; run this file on some WAV clips to compare backends.
+"""
+
+import argparse
+import json
+import os
+import re
+import time
+from collections import deque
+
+import speech_recognition as sr
+
+# Words the commands are built from besides the keyword tables
+COMMON_WORDS = (
+    'what', 'whats', 'is', 'the', 'a', 'an', 'it', 'me', 'my', 'for', 'in', 'to', 'about', 'please',
+    'can', 'you', 'set', 'tell', 'how', 'much', 'and', 'of', 'on', 'at', 'up', 'new', 'now',
+    'turn', 'off', 'create', 'save', 'find', 'show', 'stop', 'start', 'next', 'call', 'mom',
+    'minutes', 'hours', 'morning', 'evening', 'tonight', 'point', 'over', 'by', 'power',
+    'squared', 'cubed', 'hundred', 'thousand', 'million', 'billion'
+)
+NUMBER_WORDS = (
+    'zero one two three four five six seven eight nine ten eleven twelve thirteen fourteen '
+    'fifteen sixteen seventeen eighteen nineteen twenty thirty forty fifty sixty seventy '
+    'eighty ninety'
+).split()
+
+def command_vocabulary(modules=None, extra=()):
+    """Phrases and words the assistant understands, for grammar-constrained recognition"""
+    from local_intents import VOCABULARY
+    if modules is None:
+        from assistant_modules import ModuleManager
+        modules = ModuleManager().modules
+
+    phrases = set(VOCABULARY) | set(COMMON_WORDS) | set(NUMBER_WORDS)
+    for module in modules:
+        phrases.update(module.keywords)
+        phrases.update(module.terms)
+    phrases.update(phrase.strip().lower() for phrase in extra if phrase.strip())
+    # Single words too, so phrases can be combined freely ("open spotify and play music")
+    words = {word for phrase in phrases for word in re.findall(r"[a-z']+", phrase)}
+    return sorted(phrases | words)
+
+class RecognizerBackend:
+    """Turns sr.AudioData into text; raises sr.UnknownValueError or sr.RequestError like speech_recognition"""
+
+    name = "base"
+
+    def __init__(self, history=500):
+        self.latencies = deque(maxlen=history)
+        self.failures = 0
+
+    def recognize(self, audio):
+        """Transcribe audio, recording how long it took"""
+        started = time.perf_counter()
+        try:
+            return self.transcribe(audio)
+        except (sr.UnknownValueError, sr.RequestError):
+            self.failures += 1
+            raise
+        finally:
+            self.latencies.append(time.perf_counter() - started)
+
+    def transcribe(self, audio):
+        raise NotImplementedError
+
+    def stats(self):
+        """Latency summary in milliseconds"""
+        values = sorted(self.latencies)
+        if not values:
+            return {'backend': self.name, 'utterances': 0, 'failures': self.failures}
+        return {
+            'backend': self.name,
+            'utterances': len(values),
+            'failures': self.failures,
+            'mean_ms': round(sum(values) / len(values) * 1000, 1),
+            'p50_ms': round(values[len(values) // 2] * 1000, 1),
+            'p95_ms': round(values[min(len(values) - 1, int(len(values) * 0.95))] * 1000, 1)
+        }
+
+class GoogleBackend(RecognizerBackend):
+    """Google Web Speech API via speech_recognition"""
+
+    name = "google"
+
+    def __init__(self, recognizer=None, language="en-US"):
+        super().__init__()
+        self.recognizer = recognizer or sr.Recognizer()
+        self.language = language
+
+    def transcribe(self, audio):
+        return self.recognizer.recognize_google(audio, language=self.language)
+
+class VoskBackend(RecognizerBackend):
+    """Offline Vosk recognizer restricted to a phrase grammar"""
+
+    name = "vosk"
+    SAMPLE_RATE = 16000
+
+    def __init__(self, model_path, grammar=None):
+        super().__init__()
+        try:
+            import vosk
+        except ImportError:
+            raise ImportError("the vosk backend needs the vosk package: pip install vosk")
+        if not os.path.isdir(model_path):
+            raise FileNotFoundError(f"Vosk model not found at '{model_path}' "
+                                    "(download one from https://alphacephei.com/vosk/models)")
+        vosk.SetLogLevel(-1)
+        self.vosk = vosk
+        self.model = vosk.Model(model_path)
+        # "[unk]" absorbs words outside the grammar instead of forcing a wrong match
+        self.grammar = json.dumps(list(grammar) + ["[unk]"]) if grammar else None
+
+    def transcribe(self, audio):
+        if self.grammar:
+            recognizer = self.vosk.KaldiRecognizer(self.model, self.SAMPLE_RATE, self.grammar)
+        else:
+            recognizer = self.vosk.KaldiRecognizer(self.model, self.SAMPLE_RATE)
+        recognizer.AcceptWaveform(audio.get_raw_data(convert_rate=self.SAMPLE_RATE, convert_width=2))
+        words = json.loads(recognizer.FinalResult()).get('text', '').split()
+        # A word outside the grammar means the command can't be transcribed in
+        # full; dropping it would hand a truncated command on ("weather in [unk]")
+        if not words or '[unk]' in words:
+            raise sr.UnknownValueError()
+        return ' '.join(words)
+
+class FallbackBackend(RecognizerBackend):
+    """Tries each backend in order until one understands the audio"""
+
+    def __init__(self, backends):
+        super().__init__()
+        self.backends = backends
+        self.name = ','.join(backend.name for backend in backends)
+
+    def transcribe(self, audio):
+        error = sr.UnknownValueError()
+        for backend in self.backends:
+            try:
+                return backend.recognize(audio)
+            except (sr.UnknownValueError, sr.RequestError) as e:
+                error = e
+        raise error
+
+    def stats(self):
+        summary = super().stats()
+        summary['backends'] = [backend.stats() for backend in self.backends]
+        return summary
+
+def create_backend(spec=None, recognizer=None, modules=None, log=print):
+    """Build the backend named by spec (default: ASR_BACKEND, else "google")
+
+    Backends that can't be set up (missing package or model) are skipped
+    with a message; Google is used when nothing else is available.
+    """
+    spec = spec or os.getenv('ASR_BACKEND', 'google')
+    backends = []
+    for name in (part.strip().lower() for part in spec.split(',') if part.strip()):
+        if name == 'google':
+            backends.append(GoogleBackend(recognizer))
+        elif name == 'vosk':
+            extra = os.getenv('ASR_EXTRA_WORDS', '').split(',')
+            try:
+                backends.append(VoskBackend(os.getenv('VOSK_MODEL_PATH', 'models/vosk-model-small-en-us'),
+                                            command_vocabulary(modules, extra)))
+            except (ImportError, FileNotFoundError) as e:
+                log(f"Speech backend 'vosk' unavailable: {e}")
+        else:
+            log(f"Unknown speech backend '{name}'")
+    if not backends:
+        backends.append(GoogleBackend(recognizer))
+    return backends[0] if len(backends) == 1 else FallbackBackend(backends)
+
+def benchmark_backends(backends, paths):
+    """Run every backend over the WAV files; returns {backend: {'stats', 'transcripts'}}"""
+    clips = []
+    for path in paths:
+        with sr.AudioFile(path) as source:
+            clips.append((path, sr.Recognizer().record(source)))
+
+    results = {}
+    for backend in backends:
+        transcripts = {}
+        for path, audio in clips:
+            try:
+                transcripts[path] = backend.recognize(audio)
+            except sr.UnknownValueError:
+                transcripts[path] = None
+            except sr.RequestError as e:
+                transcripts[path] = f"<error: {e}>"
+        results[backend.name] = {'stats': backend.stats(), 'transcripts': transcripts}
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare speech recognizer backends on WAV clips")
+    parser.add_argument('clips', nargs='+', help="WAV/AIFF/FLAC files with spoken commands")
+    parser.add_argument('--backends', default='google,vosk',
+                        help="comma-separated backends to compare (default: google,vosk)")
+    args = parser.parse_args()
+
+    backends = {}
+    for name in args.backends.split(','):
+        backend = create_backend(name)
+        backends.setdefault(backend.name, backend)  # an unavailable backend falls back to google
+    print(json.dumps(benchmark_backends(list(backends.values()), args.clips), indent=2))
+
+if __name__ == "__main__":
+    main()
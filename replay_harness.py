@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Record and replay voice sessions.
+With RECORD_CORPUS=corpus set, the assistant saves every utterance it hears
+as a WAV file next to a transcripts.jsonl line with what the recognizer made
+of it (edit the transcripts to fix recognition mistakes). Replaying plays
+each clip through a file-backed microphone into the assistant's own
+capture_audio -> recognize_audio -> process_command path, with a local
+stand-in recognizer that returns the transcript after a configurable
+latency, and reports per-clip timings. No microphone or network is needed.
+
+    python replay_harness.py corpus --latency 0.3 --realtime -o replay.jsonl
+    python replay_harness.py corpus --backend vosk
+"""
+
+import argparse
+import json
+import os
+import random
+import threading
+import time
+
+import speech_recognition as sr
+
+from recognizers import RecognizerBackend
+from tracing import percentile
+
+class CorpusRecorder:
+    """Writes utterances as clip_NNNNN.wav plus one transcripts.jsonl record each"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.transcripts = os.path.join(directory, 'transcripts.jsonl')
+        self.count = len([name for name in os.listdir(directory) if name.endswith('.wav')])
+
+    @classmethod
+    def from_env(cls):
+        """Recorder for RECORD_CORPUS, or None when recording is off"""
+        directory = os.getenv('RECORD_CORPUS')
+        return cls(directory) if directory else None
+
+    def record(self, audio, transcript, backend=None):
+        """Save one utterance; transcript is None when nothing was recognized"""
+        with self.lock:
+            self.count += 1
+            name = f"clip_{self.count:05d}.wav"
+            with open(os.path.join(self.directory, name), 'wb') as f:
+                f.write(audio.get_wav_data())
+            record = {'clip': name, 'transcript': transcript, 'backend': backend, 'ts': round(time.time(), 3),
+                      'seconds': round(len(audio.frame_data) / (audio.sample_rate * audio.sample_width), 3)}
+            with open(self.transcripts, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + '\n')
+
+def load_corpus(directory):
+    """[(wav_path, transcript)] in recording order"""
+    clips = []
+    with open(os.path.join(directory, 'transcripts.jsonl'), encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                clips.append((os.path.join(directory, record['clip']), record.get('transcript')))
+    return clips
+
+class FileStream:
+    """Serves PCM bytes like a PyAudio stream, optionally paced in real time"""
+
+    def __init__(self, data, sample_rate, sample_width, realtime=False):
+        self.data = data
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.realtime = realtime
+        self.offset = 0
+        self.started = time.perf_counter()
+
+    def read(self, size):
+        chunk = self.data[self.offset:self.offset + size * self.sample_width]
+        self.offset += len(chunk)
+        if self.realtime:
+            due = self.started + self.offset / (self.sample_rate * self.sample_width)
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        return chunk
+
+class FileAudioSource(sr.AudioSource):
+    """Microphone stand-in that plays a recorded clip, with silence before and after it"""
+
+    def __init__(self, path, realtime=False, lead=0.6, tail=1.2, chunk=1024):
+        with sr.AudioFile(path) as source:
+            audio = sr.Recognizer().record(source)
+        self.SAMPLE_RATE = audio.sample_rate
+        self.SAMPLE_WIDTH = audio.sample_width
+        self.CHUNK = chunk
+        self.realtime = realtime
+        self.lead = lead
+        self.speech_seconds = len(audio.frame_data) / (audio.sample_rate * audio.sample_width)
+        silence = lambda seconds: b'\0' * (int(seconds * audio.sample_rate) * audio.sample_width)
+        self.data = silence(lead) + audio.frame_data + silence(tail)
+        self.stream = None
+        self.started = None
+
+    def __enter__(self):
+        self.stream = FileStream(self.data, self.SAMPLE_RATE, self.SAMPLE_WIDTH, self.realtime)
+        self.started = self.stream.started
+        return self
+
+    def __exit__(self, *exc):
+        self.stream = None
+
+    def speech_end(self):
+        """perf_counter time at which the clip's speech finished playing (real-time mode)"""
+        return None if self.started is None else self.started + self.lead + self.speech_seconds
+
+class StandInBackend(RecognizerBackend):
+    """Local recognizer stand-in: returns the expected transcript after latency (+- jitter) seconds"""
+
+    name = "stand-in"
+
+    def __init__(self, latency=0.3, jitter=0.0, seed=0):
+        super().__init__()
+        self.latency = latency
+        self.jitter = jitter
+        self.random = random.Random(seed)
+        self.transcript = None
+
+    def expect(self, transcript):
+        """The text to return for the next utterance (None: "could not understand")"""
+        self.transcript = transcript
+
+    def transcribe(self, audio):
+        time.sleep(max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter)))
+        if not self.transcript:
+            raise sr.UnknownValueError()
+        return self.transcript
+
+def replay(assistant, clips, backend, realtime=False, on_result=None):
+    """Play every clip through the assistant and return one timing record per clip"""
+    # One utterance at a time through the microphone path; no persistent capture or re-recording
+    assistant.__dict__['capture'] = None
+    assistant.__dict__['corpus'] = None
+    assistant.asr = backend
+    results = []
+    for index, (path, transcript) in enumerate(clips):
+        source = FileAudioSource(path, realtime=realtime)
+        assistant.microphone = source
+        if isinstance(backend, StandInBackend):
+            backend.expect(transcript)
+        replies = []
+
+        started = time.perf_counter()
+        audio = assistant.capture_audio()
+        captured = time.perf_counter()
+        speech_end = source.speech_end() if realtime else None
+        command = assistant.recognize_audio(audio) if audio is not None else None
+        recognized = time.perf_counter()
+        if command:
+            assistant.process_command(command, replies.append)
+        finished = time.perf_counter()
+
+        result = {
+            'index': index,
+            'clip': os.path.basename(path),
+            'expected': transcript,
+            'recognized': command,
+            'correct': (command or None) == (transcript.lower() if transcript else None),
+            'reply': ' '.join(replies),
+            'capture_ms': round((captured - started) * 1000, 1),
+            'recognize_ms': round((recognized - captured) * 1000, 1),
+            'dispatch_ms': round((finished - recognized) * 1000, 1),
+            'total_ms': round((finished - started) * 1000, 1)
+        }
+        if speech_end is not None:
+            # What a user would notice: end of speech to the reply being ready
+            result['response_ms'] = round((finished - speech_end) * 1000, 1)
+        results.append(result)
+        if on_result:
+            on_result(result)
+    return results
+
+def summarize(results):
+    """Clip count, recognition accuracy and p50/p95 of every timing"""
+    summary = {'clips': len(results),
+               'accuracy': round(sum(r['correct'] for r in results) / len(results), 3) if results else 0.0}
+    for key in ('capture_ms', 'recognize_ms', 'dispatch_ms', 'total_ms', 'response_ms'):
+        values = sorted(r[key] for r in results if key in r)
+        if values:
+            summary[key] = {'p50': percentile(values, 0.50), 'p95': percentile(values, 0.95)}
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded corpus through the assistant")
+    parser.add_argument('corpus', help="directory with transcripts.jsonl and the WAV clips")
+    parser.add_argument('--latency', type=float, default=0.3, help="stand-in recognizer latency in seconds")
+    parser.add_argument('--jitter', type=float, default=0.0, help="random +- seconds on the latency")
+    parser.add_argument('--backend', help="use a real backend (e.g. vosk, google) instead of the stand-in")
+    parser.add_argument('--realtime', action='store_true',
+                        help="play clips at recording speed (measures response time after speech ends)")
+    parser.add_argument('-o', '--output', help="write per-clip JSONL results here")
+    args = parser.parse_args()
+
+    import side_effects
+    side_effects.enable_dry_run()
+    from main import VoiceAssistant
+    assistant = VoiceAssistant(text_only=True)
+    if args.backend:
+        from recognizers import create_backend
+        backend = create_backend(args.backend, recognizer=assistant.recognizer)
+    else:
+        backend = StandInBackend(args.latency, args.jitter)
+
+    output = open(args.output, 'w', encoding='utf-8') if args.output else None
+    try:
+        results = replay(assistant, load_corpus(args.corpus), backend, args.realtime,
+                         on_result=lambda result: output and output.write(json.dumps(result) + '\n'))
+    finally:
+        if output:
+            output.close()
+        assistant.shutdown()
+    print(json.dumps(summarize(results), indent=2))
+
+if __name__ == "__main__":
+    main()
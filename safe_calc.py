@@ -0,0 +1,287 @@
+"""
+Safe arithmetic evaluation for the calculator handlers.
+Expressions (typed or spoken, e.g. "15 plus 27", "100 divided by 8") are
+parsed with the ast module, checked against a whitelist of arithmetic nodes,
+compiled to a small postfix program and cached. Evaluation caps the number of
+operations, exponent size and result size, so input like 9**9**9 is rejected
+instead of pinning a core. evaluate_many() evaluates a batch with NumPy by
+running each distinct expression shape once over a column of operands, for
+the expressions float64 computes exactly as Python does; its results always
+match evaluate().
+"""
+
+import ast
+import math
+import operator
+import re
+from functools import lru_cache
+
+MAX_OPERATIONS = 64
+MAX_EXPONENT = 10000
+MAX_RESULT_DIGITS = 1000
+MAX_EXPRESSION_LENGTH = 512
+
+class CalculationError(ValueError):
+    """Raised when an expression is not allowed or can't be evaluated"""
+
+SPOKEN_OPERATORS = [
+    (r'\bto the power of\b', '**'),
+    (r'\braised to\b', '**'),
+    (r'\bmultiplied by\b', '*'),
+    (r'\bdivided by\b', '/'),
+    (r'\bdivide by\b', '/'),
+    (r'\bmodulo\b', '%'),
+    (r'\bmod\b', '%'),
+    (r'\bsquared\b', '**2'),
+    (r'\bcubed\b', '**3'),
+    (r'\btimes\b', '*'),
+    (r'\bplus\b', '+'),
+    (r'\bminus\b', '-'),
+    (r'\bover\b', '/'),
+    (r'(?<=\d)\s*x\s*(?=\d)', '*'),
+    (r'\bopen paren(thesis)?\b', '('),
+    (r'\bclose paren(thesis)?\b', ')'),
+    (r'\bpoint\b', '.'),
+]
+FILLER_WORDS = re.compile(r'\b(what is|what\'s|whats|calculate|compute|how much is|equals|is|the|of|and)\b|[?=,]')
+
+UNITS = {word: value for value, word in enumerate(
+    'zero one two three four five six seven eight nine ten eleven twelve thirteen '
+    'fourteen fifteen sixteen seventeen eighteen nineteen'.split())}
+TENS = {word: value * 10 for value, word in enumerate(
+    'twenty thirty forty fifty sixty seventy eighty ninety'.split(), start=2)}
+SCALES = {'hundred': 100, 'thousand': 1000, 'million': 10 ** 6, 'billion': 10 ** 9}
+
+BINARY_OPERATORS = {
+    ast.Add: '+', ast.Sub: '-', ast.Mult: '*', ast.Div: '/',
+    ast.FloorDiv: '//', ast.Mod: '%', ast.Pow: '**'
+}
+SCALAR_FUNCTIONS = {
+    '+': operator.add, '-': operator.sub, '*': operator.mul, '/': operator.truediv,
+    '//': operator.floordiv, '%': operator.mod
+}
+
+def _words_to_numbers(text):
+    """Replace runs of number words ("twenty seven") with digits"""
+    output = []
+    total = current = None
+
+    def flush():
+        nonlocal total, current
+        if current is not None or total is not None:
+            output.append(str((total or 0) + (current or 0)))
+        total = current = None
+
+    for word in text.split():
+        if word in UNITS or word in TENS:
+            current = (current or 0) + UNITS.get(word, TENS.get(word))
+        elif word in SCALES and (current is not None or total is not None):
+            if SCALES[word] == 100:
+                current = (current or 1) * 100
+            else:
+                total = (total or 0) + (current or 1) * SCALES[word]
+                current = None
+        else:
+            flush()
+            output.append(word)
+    flush()
+    return ' '.join(output)
+
+def normalize_expression(text):
+    """Turn spoken arithmetic into a Python-style expression string"""
+    expression = text.lower().strip()
+    for pattern, replacement in SPOKEN_OPERATORS:
+        expression = re.sub(pattern, f' {replacement} ', expression)
+    expression = FILLER_WORDS.sub(' ', expression)
+    expression = _words_to_numbers(expression)
+    expression = expression.replace('^', '**').replace('×', '*').replace('÷', '/')
+    # "3 . 5" from "three point five"
+    expression = re.sub(r'(\d)\s*\.\s*(\d)', r'\1.\2', expression)
+    return ' '.join(expression.split())
+
+class CompiledExpression:
+    """A validated expression as a postfix program plus its operands
+
+    shape is the program with the operands abstracted away; expressions that
+    share a shape ("2 + 3", "10 + 7") can be evaluated together.
+    """
+
+    def __init__(self, shape, constants):
+        self.shape = shape
+        self.constants = constants
+
+    def evaluate(self):
+        return _run_scalar(self.shape, self.constants)
+
+def _compile_node(node, shape, constants):
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        shape.append('c')
+        constants.append(node.value)
+    elif isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.UAdd, ast.USub)):
+        _compile_node(node.operand, shape, constants)
+        if isinstance(node.op, ast.USub):
+            shape.append('neg')
+    elif isinstance(node, ast.BinOp) and type(node.op) in BINARY_OPERATORS:
+        _compile_node(node.left, shape, constants)
+        _compile_node(node.right, shape, constants)
+        shape.append(BINARY_OPERATORS[type(node.op)])
+    else:
+        raise CalculationError("only numbers and + - * / // % ** are allowed")
+    if len(shape) > MAX_OPERATIONS:
+        raise CalculationError("that expression is too long")
+
+@lru_cache(maxsize=1024)
+def compile_expression(text):
+    """Parse, validate and compile an expression (results are cached)"""
+    expression = normalize_expression(text)
+    if not expression:
+        raise CalculationError("there is nothing to calculate")
+    if len(expression) > MAX_EXPRESSION_LENGTH:
+        raise CalculationError("that expression is too long")
+    try:
+        tree = ast.parse(expression, mode='eval')
+    except SyntaxError:
+        raise CalculationError(f"I can't parse '{expression}'")
+    shape, constants = [], []
+    _compile_node(tree.body, shape, constants)
+    return CompiledExpression(tuple(shape), tuple(constants))
+
+def _check_power(base, exponent):
+    if abs(exponent) > MAX_EXPONENT:
+        raise CalculationError("that exponent is too large")
+    if base not in (0, 1, -1) and exponent > 0:
+        digits = exponent * math.log10(abs(base))
+        if digits > MAX_RESULT_DIGITS:
+            raise CalculationError("the result would be too large")
+
+def _run_scalar(shape, constants):
+    stack = []
+    operands = iter(constants)
+    for op in shape:
+        if op == 'c':
+            stack.append(next(operands))
+            continue
+        if op == 'neg':
+            stack.append(-stack.pop())
+            continue
+        right = stack.pop()
+        left = stack.pop()
+        try:
+            if op == '**':
+                _check_power(left, right)
+                value = left ** right
+            else:
+                value = SCALAR_FUNCTIONS[op](left, right)
+        except ZeroDivisionError:
+            raise CalculationError("division by zero")
+        except OverflowError:
+            raise CalculationError("the result would be too large")
+        if isinstance(value, complex):
+            raise CalculationError("the result is not a real number")
+        if isinstance(value, float) and not math.isfinite(value):
+            raise CalculationError("the result would be too large")
+        if isinstance(value, int) and value.bit_length() > MAX_RESULT_DIGITS * 3.33:
+            raise CalculationError("the result would be too large")
+        stack.append(value)
+    return stack[0]
+
+def evaluate(text):
+    """Evaluate one typed or spoken arithmetic expression"""
+    return compile_expression(text).evaluate()
+
+def evaluate_many(expressions):
+    """Evaluate many expressions at once; failures come back as CalculationError instances
+
+    Results match evaluate() one for one. Expressions that float64 computes
+    exactly as Python would are grouped by shape, and each group is evaluated
+    with one NumPy operation per step over the column of operands of all its
+    members; the rest (integer arithmetic, which Python keeps exact) are
+    evaluated one by one.
+    """
+    import numpy as np  # only the batch API needs NumPy
+
+    results = [None] * len(expressions)
+    groups = {}
+    for index, text in enumerate(expressions):
+        try:
+            compiled = compile_expression(text)
+            if not _float_only(compiled.shape, compiled.constants):
+                results[index] = compiled.evaluate()
+                continue
+        except CalculationError as e:
+            results[index] = e
+            continue
+        groups.setdefault(compiled.shape, []).append((index, compiled.constants))
+
+    for shape, members in groups.items():
+        columns = np.array([constants for _, constants in members], dtype=np.float64)
+        values, reasons = _run_vector(shape, columns)
+        for row, (index, _) in enumerate(members):
+            if reasons[row]:
+                results[index] = CalculationError(VECTOR_ERRORS[reasons[row]])
+            else:
+                results[index] = float(values[row])
+    return results
+
+# Integers up to 2**53 convert to float64 exactly
+EXACT_FLOAT_INTEGER = 2 ** 53
+
+def _float_only(shape, constants):
+    """True when Python would compute every step in float, so float64 gives the same result
+
+    That holds when every operation has a float operand, except true division
+    of two integers small enough to convert to float exactly. Powers always
+    go one by one: NumPy's pow can differ from Python's in the last digit.
+    """
+    if '**' in shape or any(type(constant) is int and abs(constant) >= EXACT_FLOAT_INTEGER for constant in constants):
+        return False
+    stack = []
+    operands = iter(constants)
+    for op in shape:
+        if op == 'c':
+            stack.append(type(next(operands)) is float)
+        elif op != 'neg':
+            right, left = stack.pop(), stack.pop()
+            if not (left or right or op == '/'):
+                return False
+            stack.append(True)
+    return stack[0]
+
+# Failure codes of the vector path, with the messages _run_scalar raises for them
+VECTOR_ERRORS = {
+    1: "division by zero",
+    2: "the result would be too large",
+}
+
+def _run_vector(shape, columns):
+    """(values, reasons): reasons[row] is the VECTOR_ERRORS code of the first failing step, or 0"""
+    import numpy as np
+    functions = {
+        '+': np.add, '-': np.subtract, '*': np.multiply, '/': np.true_divide,
+        '//': np.floor_divide, '%': np.mod
+    }
+    rows = columns.shape[0]
+    reasons = np.zeros(rows, dtype=np.int8)
+
+    def fail(mask, code):
+        reasons[(reasons == 0) & mask] = code
+
+    stack = []
+    column = 0
+    with np.errstate(all='ignore'):
+        for op in shape:
+            if op == 'c':
+                stack.append(columns[:, column])
+                column += 1
+                continue
+            if op == 'neg':
+                stack.append(-stack.pop())
+                continue
+            right = stack.pop()
+            left = stack.pop()
+            if op in ('/', '//', '%'):
+                fail(right == 0, 1)
+            value = functions[op](left, right)
+            fail(~np.isfinite(value), 2)
+            stack.append(value)
+    return stack[0], reasons
@@ -0,0 +1,510 @@
+#!/usr/bin/env python3
+"""
+Headless multi-session server.
+Serves many thin clients (kiosks, a web UI) from one process over HTTP and
+WebSocket, using the asyncio standard library only. Every turn, typed or
+spoken, goes through the same local routing, LLM classification and task
+handlers as VoiceAssistant.process_command, on one shared text-only
+assistant. Sessions keep their own history, conversation memory and notes,
+and run their turns in order;
+LLM and speech recognition calls are capped by semaphores so a burst of
+sessions queues instead of overwhelming the API. Desktop side effects
+(opening URLs and applications) are not run on the server; they are sent to
+the client as "effects" to carry out itself.
+
+    python server.py --port 8080
+    curl -s localhost:8080/sessions -X POST
+    curl -s localhost:8080/sessions/<id>/turns -d '{"text": "what time is it"}'
+    curl -s localhost:8080/sessions/<id>/audio --data-binary @command.wav
+    websocket: ws://localhost:8080/ws?session=<id>, send {"text": ...} or WAV bytes
+
+Replies stream as they are produced: newline-delimited JSON events over HTTP
+(?stream=1) and one message per event over WebSocket.
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import io
+import json
+import os
+import shutil
+import struct
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import side_effects
+from conversation_memory import ConversationMemory
+from note_store import NoteStore
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+# WebSocket close codes for errors after the handshake: message too big, else policy violation
+CLOSE_CODES = {413: 1009}
+MAX_BODY = 10 * 1024 * 1024
+REASONS = {200: 'OK', 201: 'Created', 204: 'No Content', 400: 'Bad Request', 404: 'Not Found',
+           405: 'Method Not Allowed', 411: 'Length Required', 413: 'Payload Too Large',
+           429: 'Too Many Requests', 503: 'Service Unavailable'}
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class NullLog:
+    """Discards the assistant's console output (--quiet)"""
+
+    def write(self, text):
+        pass
+
+    def post(self, callback):
+        callback()
+
+class Session:
+    """One client's conversation: its turns run one at a time, in order
+
+    Notes made in the session are kept in its own store under notes_dir and
+    are deleted with the session.
+    """
+
+    def __init__(self, session_id, notes_dir, history=20):
+        self.id = session_id
+        self.created = self.last_seen = time.monotonic()
+        self.lock = asyncio.Lock()
+        self.history = deque(maxlen=history)  # {'command', 'replies', 'route', 'ms'}
+        self.memory = ConversationMemory.from_env()  # context sent with this session's LLM requests
+        self.notes = NoteStore(os.path.join(notes_dir, session_id))
+        self.turns = 0
+
+    def close(self):
+        self.notes.close()
+        shutil.rmtree(self.notes.directory, ignore_errors=True)
+
+    def describe(self):
+        return {'session': self.id, 'turns': self.turns, 'history': list(self.history),
+                'context': self.memory.stats(), 'idle_seconds': round(time.monotonic() - self.last_seen, 1)}
+
+class AssistantServer:
+    """Runs turns for many sessions on one shared headless VoiceAssistant"""
+
+    def __init__(self, assistant, max_sessions=1000, llm_concurrency=16, asr_concurrency=4,
+                 workers=32, session_ttl=1800, notes_dir=None):
+        self.assistant = assistant
+        self.notes_dir = notes_dir or os.getenv('SERVER_NOTES_DIR', os.path.join('notes', 'sessions'))
+        self.max_sessions = max_sessions
+        self.session_ttl = session_ttl
+        self.sessions = {}
+        # Blocking work (handlers, LLM and ASR calls) runs here; the semaphores keep
+        # LLM and ASR calls from taking every worker
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="turn")
+        self.llm_slots = asyncio.Semaphore(llm_concurrency)
+        self.asr_slots = asyncio.Semaphore(asr_concurrency)
+        self.stats = dict.fromkeys(('turns', 'audio_turns', 'errors', 'llm_waits', 'asr_waits'), 0)
+        self.active_turns = 0
+        self.connections = 0
+        self.server = None
+
+    # Sessions
+
+    def create_session(self):
+        if len(self.sessions) >= self.max_sessions:
+            self.expire_sessions()
+            if len(self.sessions) >= self.max_sessions:
+                raise HTTPError(503, "too many sessions")
+        session = Session(uuid.uuid4().hex, self.notes_dir)
+        self.sessions[session.id] = session
+        return session
+
+    def get_session(self, session_id):
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise HTTPError(404, f"no session '{session_id}'")
+        session.last_seen = time.monotonic()
+        return session
+
+    def expire_sessions(self):
+        cutoff = time.monotonic() - self.session_ttl
+        for session_id in [s.id for s in self.sessions.values() if s.last_seen < cutoff and not s.lock.locked()]:
+            self.sessions.pop(session_id).close()
+
+    def close_sessions(self):
+        while self.sessions:
+            self.sessions.popitem()[1].close()
+
+    async def _expire_loop(self):
+        while True:
+            await asyncio.sleep(min(60, self.session_ttl))
+            self.expire_sessions()
+
+    # Turns
+
+    async def run_turn(self, session, emit, text=None, audio=None):
+        """Run one turn, passing each event to emit(event) as soon as it happens
+
+        Events: {'type': 'transcript'}, {'type': 'reply'} per spoken reply,
+        {'type': 'effects'} with the side effects for the client to carry
+        out, and a final {'type': 'done'}.
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        replies = []
+
+        def say(message):
+            replies.append(message)
+            loop.call_soon_threadsafe(queue.put_nowait, {'type': 'reply', 'text': message})
+
+        async def call(function, *args):
+            # Effects are recorded per thread, so collect them on the worker that ran the handler
+            def run():
+                side_effects.take_recorded()
+                with self.assistant.tracer.activate(turn):
+                    result = function(*args)
+                return result, side_effects.take_recorded()
+            result, effects = await loop.run_in_executor(self.executor, run)
+            if effects:
+                queue.put_nowait({'type': 'effects', 'effects': effects})
+            return result
+
+        async def drain():
+            while True:
+                event = await queue.get()
+                if event is None:
+                    return
+                await emit(event)
+
+        async with session.lock:
+            started = time.perf_counter()
+            turn = self.assistant.tracer.new_turn('server')
+            self.active_turns += 1
+            self.stats['turns'] += 1
+            session.turns += 1
+            forwarder = asyncio.create_task(drain())
+            route = None
+            try:
+                if audio is not None:
+                    self.stats['audio_turns'] += 1
+                    if self.asr_slots.locked():
+                        self.stats['asr_waits'] += 1
+                    async with self.asr_slots:
+                        text = await call(self.transcribe, audio)
+                    queue.put_nowait({'type': 'transcript', 'text': text})
+                if text:
+                    # Routed first so only turns that need the LLM wait for a slot
+                    routed = await call(self.assistant.route_locally, text)
+                    handle = (self.assistant.handle_command, text, say, session.memory, session.notes, routed)
+                    if routed[1] is not None:
+                        route = await call(*handle)
+                    else:
+                        if self.llm_slots.locked():
+                            self.stats['llm_waits'] += 1
+                        async with self.llm_slots:
+                            route = await call(*handle)
+            except Exception as e:
+                self.stats['errors'] += 1
+                queue.put_nowait({'type': 'error', 'message': str(e)})
+            finally:
+                self.active_turns -= 1
+                self.assistant.tracer.end_turn(turn)
+                elapsed = round((time.perf_counter() - started) * 1000, 1)
+                # Let replies posted from the worker thread reach the queue before 'done'
+                await asyncio.sleep(0)
+                queue.put_nowait({'type': 'done', 'route': route, 'ms': elapsed})
+                queue.put_nowait(None)
+                await forwarder
+            session.history.append({'command': text, 'replies': replies, 'route': route, 'ms': elapsed})
+
+    def transcribe(self, data):
+        """Text of a WAV/AIFF/FLAC upload, or "" when nothing was understood"""
+        import speech_recognition as sr
+        try:
+            with sr.AudioFile(io.BytesIO(data)) as source:
+                audio = sr.Recognizer().record(source)
+        except (ValueError, EOFError) as e:
+            raise HTTPError(400, f"unreadable audio: {e}")
+        try:
+            with self.assistant.tracer.span('recognize', backend=self.assistant.asr.name):
+                return self.assistant.asr.recognize(audio).lower()
+        except sr.UnknownValueError:
+            return ""
+        except sr.RequestError as e:
+            raise HTTPError(503, f"speech recognition failed: {e}")
+
+    def status(self):
+        with self.assistant.route_lock:
+            routes = dict(self.assistant.route_counts)
+        return dict(self.stats, sessions=len(self.sessions), active_turns=self.active_turns,
+                    connections=self.connections, routes=routes)
+
+    # HTTP
+
+    async def start(self, host='127.0.0.1', port=8080):
+        self.server = await asyncio.start_server(self.handle_connection, host, port, backlog=1024)
+        asyncio.get_running_loop().create_task(self._expire_loop())
+        return self.server
+
+    async def handle_connection(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                request = await read_request(reader)
+                if request is None:
+                    return
+                method, target, headers, body = request
+                if headers.get('upgrade', '').lower() == 'websocket':
+                    await self.handle_websocket(reader, writer, target, headers)
+                    return
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                try:
+                    await self.handle_http(method, target, body, writer, keep_alive)
+                except HTTPError as e:
+                    await send_response(writer, e.status, {'error': str(e)}, keep_alive)
+                if not keep_alive:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except HTTPError as e:
+            await send_response(writer, e.status, {'error': str(e)}, False)
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def handle_http(self, method, target, body, writer, keep_alive):
+        url = urlsplit(target)
+        parts = [part for part in url.path.split('/') if part]
+        query = parse_qs(url.query)
+
+        if parts == ['health']:
+            return await send_response(writer, 200, self.status(), keep_alive)
+        if parts == ['sessions'] and method == 'POST':
+            return await send_response(writer, 201, {'session': self.create_session().id}, keep_alive)
+        if len(parts) < 2 or parts[0] != 'sessions':
+            raise HTTPError(404, "not found")
+        session = self.get_session(parts[1])
+        if len(parts) == 2:
+            if method == 'GET':
+                return await send_response(writer, 200, session.describe(), keep_alive)
+            if method == 'DELETE':
+                self.sessions.pop(session.id).close()
+                return await send_response(writer, 204, None, keep_alive)
+            raise HTTPError(405, "use GET or DELETE")
+        if method != 'POST' or parts[2] not in ('turns', 'audio'):
+            raise HTTPError(404, "not found")
+
+        if parts[2] == 'audio':
+            turn = {'audio': body}
+        else:
+            try:
+                text = (json.loads(body or b'{}').get('text') or '').strip()
+            except (json.JSONDecodeError, AttributeError):
+                raise HTTPError(400, 'expected JSON like {"text": "what time is it"}')
+            if not text:
+                raise HTTPError(400, "empty command")
+            turn = {'text': text}
+
+        if query.get('stream', ['0'])[0] in ('1', 'true'):
+            await start_stream(writer, keep_alive)
+
+            async def emit(event):
+                await send_chunk(writer, (json.dumps(event) + '\n').encode())
+
+            await self.run_turn(session, emit, **turn)
+            await send_chunk(writer, b'')
+        else:
+            events = []
+
+            async def emit(event):
+                events.append(event)
+
+            await self.run_turn(session, emit, **turn)
+            result = {'session': session.id, 'replies': [], 'effects': []}
+            for event in events:
+                if event['type'] == 'reply':
+                    result['replies'].append(event['text'])
+                elif event['type'] == 'effects':
+                    result['effects'].extend(event['effects'])
+                elif event['type'] in ('transcript', 'error'):
+                    result[event['type']] = event.get('text', event.get('message'))
+                elif event['type'] == 'done':
+                    result.update(route=event['route'], ms=event['ms'])
+            await send_response(writer, 200, result, keep_alive)
+
+    # WebSocket
+
+    async def handle_websocket(self, reader, writer, target, headers):
+        key = headers.get('sec-websocket-key')
+        if not key:
+            raise HTTPError(400, "missing Sec-WebSocket-Key")
+        query = parse_qs(urlsplit(target).query)
+        session = (self.get_session(query['session'][0]) if 'session' in query
+                   else self.create_session())
+        accept = base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode()).digest()).decode()
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode())
+        send_lock = asyncio.Lock()
+
+        async def emit(event):
+            async with send_lock:
+                await send_frame(writer, 0x1, json.dumps(event).encode())
+
+        await emit({'type': 'session', 'session': session.id})
+        try:
+            while True:
+                opcode, payload = await read_message(reader)
+                if opcode == 0x8:  # close
+                    async with send_lock:
+                        await send_frame(writer, 0x8, payload[:2])
+                    return
+                if opcode == 0x9:  # ping
+                    async with send_lock:
+                        await send_frame(writer, 0xA, payload)
+                    continue
+                session.last_seen = time.monotonic()
+                try:
+                    if opcode == 0x2:
+                        await self.run_turn(session, emit, audio=payload)
+                    elif opcode == 0x1:
+                        text = (json.loads(payload).get('text') or '').strip()
+                        if text:
+                            await self.run_turn(session, emit, text=text)
+                except (ValueError, AttributeError):  # not JSON, or not UTF-8
+                    await emit({'type': 'error', 'message': 'expected {"text": ...} or WAV bytes'})
+                except HTTPError as e:
+                    await emit({'type': 'error', 'message': str(e)})
+        except HTTPError as e:
+            # An HTTP response would corrupt the WebSocket stream: close it properly instead
+            reason = str(e).encode()[:120]
+            async with send_lock:
+                await send_frame(writer, 0x8, struct.pack('!H', CLOSE_CODES.get(e.status, 1008)) + reason)
+
+async def read_request(reader):
+    """(method, target, headers, body) of the next request, or None when the client is done"""
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    try:
+        method, target, _ = line.decode('latin-1').split(' ', 2)
+    except ValueError:
+        raise HTTPError(400, "malformed request line")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    if headers.get('transfer-encoding'):
+        raise HTTPError(411, "send a Content-Length")
+    try:
+        length = int(headers.get('content-length', 0))
+    except ValueError:
+        raise HTTPError(400, "malformed Content-Length")
+    if length < 0:
+        raise HTTPError(400, "malformed Content-Length")
+    if length > MAX_BODY:
+        raise HTTPError(413, "request body too large")
+    body = await reader.readexactly(length) if length else b''
+    return method.upper(), target, headers, body
+
+async def send_response(writer, status, payload, keep_alive=True):
+    data = b'' if payload is None else json.dumps(payload).encode()
+    head = [f"HTTP/1.1 {status} {REASONS.get(status, '')}", f"Content-Length: {len(data)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+    if payload is not None:
+        head.append("Content-Type: application/json")
+    writer.write(('\r\n'.join(head) + '\r\n\r\n').encode() + data)
+    await writer.drain()
+
+async def start_stream(writer, keep_alive=True):
+    writer.write(("HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\nTransfer-Encoding: chunked\r\n"
+                  f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n").encode())
+    await writer.drain()
+
+async def send_chunk(writer, data):
+    """One chunk of a chunked response (empty data ends the response)"""
+    writer.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+    await writer.drain()
+
+async def read_message(reader):
+    """(opcode, payload) of the next complete WebSocket message (fragments joined)"""
+    message_opcode, parts = None, []
+    while True:
+        first, second = await reader.readexactly(2)
+        opcode, final = first & 0x0F, first & 0x80
+        length = second & 0x7F
+        if length == 126:
+            length = struct.unpack('!H', await reader.readexactly(2))[0]
+        elif length == 127:
+            length = struct.unpack('!Q', await reader.readexactly(8))[0]
+        if length > MAX_BODY:
+            raise HTTPError(413, "message too large")
+        mask = await reader.readexactly(4) if second & 0x80 else None
+        payload = await reader.readexactly(length)
+        if mask:
+            # XOR with the repeated 4-byte key, as one big integer instead of byte by byte
+            key = (mask * (length // 4 + 1))[:length]
+            payload = (int.from_bytes(payload, 'big') ^ int.from_bytes(key, 'big')).to_bytes(length, 'big')
+        if opcode >= 0x8:  # control frames may arrive between fragments
+            return opcode, payload
+        if opcode:
+            message_opcode = opcode
+        parts.append(payload)
+        if final:
+            return message_opcode, b''.join(parts)
+
+async def send_frame(writer, opcode, payload):
+    length = len(payload)
+    if length < 126:
+        head = struct.pack('!BB', 0x80 | opcode, length)
+    elif length < 1 << 16:
+        head = struct.pack('!BBH', 0x80 | opcode, 126, length)
+    else:
+        head = struct.pack('!BBQ', 0x80 | opcode, 127, length)
+    writer.write(head + payload)
+    await writer.drain()
+
+def create_assistant(quiet=False):
+    """Shared headless assistant with desktop side effects recorded instead of run"""
+    side_effects.enable_dry_run()
+    from main import VoiceAssistant
+    assistant = VoiceAssistant(text_only=True)
+    if quiet:
+        assistant.log = NullLog()
+    # Build the lazily created parts now rather than inside the first few turns
+    assistant.route_locally("what time is it")
+    return assistant
+
+async def serve(args):
+    assistant = create_assistant(args.quiet)
+    server = AssistantServer(assistant, max_sessions=args.max_sessions, llm_concurrency=args.llm_concurrency,
+                             asr_concurrency=args.asr_concurrency, workers=args.workers)
+    await server.start(args.host, args.port)
+    print(f"Serving on http://{args.host}:{args.port} (WebSocket: ws://{args.host}:{args.port}/ws)")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        server.executor.shutdown(wait=False, cancel_futures=True)
+        server.close_sessions()
+        assistant.shutdown()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the assistant to many clients over HTTP and WebSocket")
+    parser.add_argument('--host', default=os.getenv('SERVER_HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('SERVER_PORT', '8080')))
+    parser.add_argument('--max-sessions', type=int, default=1000)
+    parser.add_argument('--llm-concurrency', type=int, default=int(os.getenv('SERVER_LLM_CONCURRENCY', '16')),
+                        help="LLM requests in flight at once (default: 16)")
+    parser.add_argument('--asr-concurrency', type=int, default=int(os.getenv('SERVER_ASR_CONCURRENCY', '4')),
+                        help="speech recognitions at once (default: 4)")
+    parser.add_argument('--workers', type=int, default=32, help="threads for handlers and blocking calls")
+    parser.add_argument('--quiet', action='store_true', help="don't echo the assistant's log")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Dry-run support for command handlers.
+Replaces webbrowser.open and subprocess.run with recorders so commands can be
+replayed in bulk without opening browser tabs or launching applications.
+"""
+
+import subprocess
+import threading
+import webbrowser
+
+_recorded = threading.local()
+_originals = {}
+
+def _record(kind, target):
+    effects = getattr(_recorded, 'effects', None)
+    if effects is None:
+        effects = _recorded.effects = []
+    effects.append({'type': kind, 'target': target})
+
+def _fake_open(url, new=0, autoraise=True):
+    _record('open_url', url)
+    return True
+
+def _fake_run(args, *popenargs, **kwargs):
+    _record('run', args if isinstance(args, str) else list(args))
+    return subprocess.CompletedProcess(args, 0, stdout=b'', stderr=b'')
+
+def enable_dry_run():
+    """Route webbrowser.open and subprocess.run to the recorder (process-wide)"""
+    if _originals:
+        return
+    _originals['open'] = webbrowser.open
+    _originals['run'] = subprocess.run
+    webbrowser.open = _fake_open
+    subprocess.run = _fake_run
+
+def disable_dry_run():
+    """Restore the real webbrowser.open and subprocess.run"""
+    if not _originals:
+        return
+    webbrowser.open = _originals.pop('open')
+    subprocess.run = _originals.pop('run')
+
+def take_recorded():
+    """Return and clear the side effects recorded on the calling thread"""
+    effects = getattr(_recorded, 'effects', None) or []
+    _recorded.effects = []
+    return effects
@@ -1,5 +1,14 @@
 import speech_recognition as sr
-import pyttsx3
+from noise_estimator import AmbientNoiseEstimator
+from audio_capture import ContinuousCapture
+from pipeline import VoicePipeline
+from tts_cache import TTSCache
+from tts_worker import SpeechWorker
+from gui_log import LogChannel
+from recognizers import create_backend
+from replay_harness import CorpusRecorder
+from tracing import Tracer
+from wake_word import create_gate
 import os
 import webbrowser
 import subprocess
@@ -11,14 +20,32 @@ from assistant_modules import ModuleManager
 
 class SimpleVoiceAssistant:
     def __init__(self):
+        # Per-stage latency spans for every turn (see tracing.py)
+        self.tracer = Tracer.from_env()
+        
+        # Text-to-speech runs on its own worker thread, which owns the engine;
+        # repeated phrases are played from the cache in TTS_CACHE_DIR (see tts_cache.py)
+        self.speech = SpeechWorker(rate=150, volume=0.9, tracer=self.tracer, cache=TTSCache.from_env())
+        
         # Initialize speech recognition
         self.recognizer = sr.Recognizer()
         self.microphone = sr.Microphone()
+        self.noise_estimator = AmbientNoiseEstimator(self.recognizer)
+        # Speech-to-text backend chosen by ASR_BACKEND (see recognizers.py)
+        self.asr = create_backend(recognizer=self.recognizer)
+        # Saves every utterance with its transcript when RECORD_CORPUS is set (see replay_harness.py)
+        self.corpus = CorpusRecorder.from_env()
+        # Only utterances starting with the wake word reach it, once one is enrolled (see wake_word.py)
+        self.wake_gate = create_gate(on_wake=lambda: self.log.write(f"{self.assistant_name}: listening...\n"))
         
-        # Initialize text-to-speech engine
-        self.engine = pyttsx3.init()
-        self.engine.setProperty('rate', 150)
-        self.engine.setProperty('volume', 0.9)
+        # "persistent" keeps one microphone stream open for the whole session
+        self.capture = None
+        if os.getenv('AUDIO_CAPTURE_MODE', 'per_utterance') == 'persistent':
+            self.capture = ContinuousCapture(self.microphone, self.noise_estimator,
+                                             log=lambda message: self.log.write(message + "\n"))
+            # With a headset the assistant can't hear itself, so any speech may barge in
+            if os.getenv('BARGE_IN_ON_SPEECH', '0').lower() in ('1', 'true', 'yes'):
+                self.capture.on_speech_start = self.speech.interrupt
         
         # Assistant state
         self.is_listening = False
@@ -91,6 +118,10 @@ class SimpleVoiceAssistant:
                                                    font=('Arial', 10))
         self.output_text.pack(fill=tk.BOTH, expand=True)
         
+        # All conversation output goes through this channel so worker threads never touch Tk
+        self.log = LogChannel(self.root, self.output_text,
+                              max_lines=int(os.getenv('GUI_SCROLLBACK_LINES', '2000')))
+        
         # Help text
         help_text = """
         Available Commands:
@@ -112,56 +143,84 @@ class SimpleVoiceAssistant:
         help_label.pack(pady=10)
     
     def speak(self, text):
-        """Convert text to speech"""
-        self.output_text.insert(tk.END, f"Assistant: {text}\n")
-        self.output_text.see(tk.END)
-        self.engine.say(text)
-        self.engine.runAndWait()
+        """Convert text to speech (queued on the speech worker; does not block)"""
+        self.log.write(f"Assistant: {text}\n")
+        self.speech.say(text)
     
     def listen(self):
         """Listen for voice input"""
+        audio = self.capture_audio()
+        if audio is None:
+            return None
+        return self.recognize_audio(audio)
+    
+    def capture_audio(self):
+        """Capture one utterance from the microphone, or None if nobody spoke"""
+        self.log.write("Listening...\n")
+        
         try:
+            if self.capture is not None:
+                try:
+                    return self.capture.listen(timeout=5)
+                except OSError as e:  # audio_capture.CaptureError; the next listen() reopens the stream
+                    self.log.write(f"Microphone error: {e}\n")
+                    return None
+            
             with self.microphone as source:
-                self.recognizer.adjust_for_ambient_noise(source, duration=0.5)
-                self.output_text.insert(tk.END, "Listening...\n")
-                self.output_text.see(tk.END)
-                
-                audio = self.recognizer.listen(source, timeout=5, phrase_time_limit=10)
-                
-                self.output_text.insert(tk.END, "Processing...\n")
-                self.output_text.see(tk.END)
-                
-                text = self.recognizer.recognize_google(audio)
-                self.output_text.insert(tk.END, f"You: {text}\n")
-                self.output_text.see(tk.END)
-                
-                return text.lower()
+                # Threshold is kept current in the background; no per-utterance calibration
+                with self.tracer.span('calibrate'):
+                    self.noise_estimator.attach(source)
+                return self.recognizer.listen(source, timeout=5, phrase_time_limit=10)
                 
         except sr.WaitTimeoutError:
-            self.output_text.insert(tk.END, "No speech detected. Please try again.\n")
-            self.output_text.see(tk.END)
+            self.log.write("No speech detected. Please try again.\n")
             return None
+    
+    def recognize_audio(self, audio):
+        """Convert captured audio to command text"""
+        try:
+            self.log.write("Processing...\n")
+            
+            with self.tracer.span('recognize', backend=self.asr.name):
+                text = self.asr.recognize(audio)
+            self.log.write(f"You: {text}\n")
+            if self.corpus is not None:
+                self.corpus.record(audio, text, self.asr.name)
+            
+            return text.lower()
+            
         except sr.UnknownValueError:
-            self.output_text.insert(tk.END, "Could not understand audio. Please try again.\n")
-            self.output_text.see(tk.END)
+            self.log.write("Could not understand audio. Please try again.\n")
+            if self.corpus is not None:
+                self.corpus.record(audio, None, self.asr.name)
             return None
         except sr.RequestError as e:
-            self.output_text.insert(tk.END, f"Error with speech recognition: {e}\n")
-            self.output_text.see(tk.END)
+            self.log.write(f"Error with speech recognition: {e}\n")
             return None
     
-    def process_command(self, command):
-        """Process user commands using module manager"""
+    def process_command(self, command, say=None):
+        """Process user commands using module manager
+        
+        Replies go to say (speak() by default), which lets the voice pipeline
+        queue them for its speech stage instead.
+        """
         if not command:
             return
+        say = say or self.speak
         
-        try:
-            # Use module manager to process the command
-            response = self.module_manager.process_command(command)
-            self.speak(response)
-                
-        except Exception as e:
-            self.speak(f"Sorry, I encountered an error: {str(e)}")
+        # Barge-in: a new command cuts off whatever is still being said
+        self.speech.interrupt()
+        
+        # Typed commands start their own turn; voice commands already have one
+        with self.tracer.turn('typed'):
+            try:
+                # Use module manager to process the command
+                with self.tracer.span('handler'):
+                    response = self.module_manager.process_command(command)
+                say(response)
+                    
+            except Exception as e:
+                say(f"Sorry, I encountered an error: {str(e)}")
     
     def toggle_listening(self):
         """Toggle voice listening on/off"""
@@ -171,6 +230,10 @@ class SimpleVoiceAssistant:
             self.stop_button.config(state=tk.NORMAL)
             self.status_label.config(text="Status: Listening...")
             
+            # Drop anything said while the assistant wasn't listening
+            if self.capture is not None:
+                self.capture.clear()
+            
             # Start listening in a separate thread
             self.listen_thread = threading.Thread(target=self.continuous_listen)
             self.listen_thread.daemon = True
@@ -186,25 +249,51 @@ class SimpleVoiceAssistant:
         self.status_label.config(text="Status: Ready")
     
     def continuous_listen(self):
-        """Continuously listen for voice commands"""
-        while self.is_listening:
-            command = self.listen()
-            if command:
-                self.process_command(command)
+        """Continuously listen for voice commands
+        
+        Capture, recognition, command handling and speech run as separate
+        pipeline stages, so the next command is heard while this one is answered.
+        """
+        self.pipeline = VoicePipeline(self.capture_audio, self.recognize_audio,
+                                      self.process_command, self.speak, tracer=self.tracer,
+                                      gate=self.wake_gate)
+        self.pipeline.run(lambda: self.is_listening)
+        
+        stats = self.pipeline.metrics()
+        summary = ", ".join(
+            f"{name} {stage['processed']} (max queue {stage['max_depth']})"
+            for name, stage in stats.items() if name != 'capture'
+        )
+        self.log.write(f"Pipeline: captured {stats['capture']['processed']}, {summary}\n")
+        if self.wake_gate is not None:
+            wake = self.wake_gate.stats()
+            self.log.write(f"Wake word: {wake['passed']} passed, {wake['dropped']} dropped, "
+                           f"{wake['cpu_ms_per_check']} ms CPU per check\n")
+        asr = self.asr.stats()
+        if asr['utterances']:
+            self.log.write(f"Speech recognition ({asr['backend']}): {asr['utterances']} utterances, "
+                           f"p50 {asr['p50_ms']} ms, p95 {asr['p95_ms']} ms\n")
+        latency = self.tracer.summary_line()
+        if latency:
+            self.log.write(f"Latency: {latency}\n")
     
     def process_text_command(self, event=None):
         """Process text-based commands"""
         command = self.text_input.get().strip()
         if command:
             self.text_input.delete(0, tk.END)
-            self.output_text.insert(tk.END, f"You: {command}\n")
-            self.output_text.see(tk.END)
+            self.log.write(f"You: {command}\n")
             self.process_command(command)
     
     def run(self):
         """Start the voice assistant"""
         self.speak(f"Hello! I'm {self.assistant_name}, your voice assistant. How can I help you today?")
         self.root.mainloop()
+        self.speech.shutdown()
+        if self.capture is not None:
+            self.capture.stop()
+        self.module_manager.close()
+        self.tracer.close()
 
 if __name__ == "__main__":
     assistant = SimpleVoiceAssistant()
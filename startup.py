@@ -0,0 +1,91 @@
+"""
+Startup helpers: deferred imports and deferred initialization.
+Heavy modules (speech recognition, TTS, OpenAI, Tk, NumPy) and devices are
+only set up the first time they are used. Every deferred step is timed so
+`--startup-report` can show where startup time goes, like `-X importtime`.
+"""
+
+import importlib
+import sys
+import threading
+import time
+
+_started = time.perf_counter()
+_timings = []  # (label, seconds, finished_at)
+
+def record(label, seconds):
+    """Add a timed step to the startup report"""
+    _timings.append((label, seconds, time.perf_counter() - _started))
+
+class timed:
+    """Context manager that records how long a block took"""
+
+    def __init__(self, label):
+        self.label = label
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.label, time.perf_counter() - self.started)
+        return False
+
+class LazyModule:
+    """Stands in for a module and imports it on first attribute access"""
+
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            with timed(f"import {self._name}"):
+                module = importlib.import_module(self._name)
+            self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, attribute):
+        return getattr(self._load(), attribute)
+
+    def __repr__(self):
+        state = "loaded" if self.__dict__['_module'] is not None else "not loaded"
+        return f"<lazy module '{self._name}' ({state})>"
+
+class deferred:
+    """Attribute computed on first access, then cached on the instance
+
+    Like functools.cached_property, but creation is serialized with a lock (so
+    two threads can't both open the microphone) and timed for the report.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.name = factory.__name__
+        self.__doc__ = factory.__doc__
+        self.lock = threading.RLock()
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        with self.lock:
+            if self.name not in instance.__dict__:
+                with timed(f"init {type(instance).__name__}.{self.name}"):
+                    instance.__dict__[self.name] = self.factory(instance)
+        return instance.__dict__[self.name]
+
+def is_initialized(instance, name):
+    """True if a deferred attribute has already been created"""
+    return name in instance.__dict__
+
+def report(stream=None):
+    """Print every timed import and initialization step"""
+    stream = stream or sys.stderr
+    print("Startup report (ms):", file=stream)
+    for label, seconds, finished_at in _timings:
+        print(f"  {seconds * 1000:9.1f}  {label}", file=stream)
+    print(f"  {(time.perf_counter() - _started) * 1000:9.1f}  total since startup", file=stream)
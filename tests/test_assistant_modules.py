@@ -0,0 +1,69 @@
+from assistant_modules import AssistantModule, IntentRouter, ModuleManager
+from module_registry import ModuleSpec
+from note_store import NoteStore
+
+def routed(manager, command):
+    entry, _ = manager.router.route(command)
+    return entry.name
+
+def test_open_my_notes_opens_the_application():
+    assert routed(ModuleManager(), "open my notes") == 'applications'
+
+def test_note_queries_search_notes():
+    manager = ModuleManager()
+    for command in ("find my note about groceries", "search my notes for passwords",
+                    "show my notes about the trip"):
+        assert routed(manager, command) == 'note_search'
+
+class JokeModule(AssistantModule):
+    keywords = ('joke',)
+
+    def execute(self, command, parameters=None):
+        return "Why did the scarecrow win an award?"
+
+def test_modules_added_after_construction_are_routed_to():
+    manager = ModuleManager()
+    assert manager.route("tell me a joke")[0] is None
+    manager.registry.add(ModuleSpec('joke', f"{__name__}:JokeModule", ('joke',)))
+    assert isinstance(manager.route("tell me a joke")[0], JokeModule)
+    assert manager.process_command("tell me a joke") == "Why did the scarecrow win an award?"
+
+class WeatherModule(AssistantModule):
+    keywords = ('weather',)
+    terms = ('tomorrow',)
+
+    def can_handle(self, command):
+        return command.lower().startswith("what's the weather")
+
+    def execute(self, command, parameters=None, matches=None):
+        return 'tomorrow' if 'tomorrow' in matches else 'today'
+
+def test_modules_overriding_can_handle_receive_their_matches():
+    router = IntentRouter([JokeModule(), WeatherModule()])
+    module, matches = router.route("what's the weather tomorrow")
+    assert isinstance(module, WeatherModule)
+    assert matches == {'weather': [(11, 18)], 'tomorrow': [(19, 27)]}
+    assert router.execute(module, "what's the weather tomorrow", matches) == 'tomorrow'
+    # Their keywords are matched but never route on their own
+    assert router.route("weather report")[0] is None
+
+def test_classifier_only_answers_close_matches():
+    manager = ModuleManager()
+    assert manager.classify("tell me something") == (None, None)
+    assert manager.classify("what is it") == (None, None)
+    module, matches = manager.classify("how late is it")
+    assert type(module).__name__ == 'TimeDateModule'
+    assert matches == {'time': []}
+
+def test_unmatched_vague_commands_are_not_acted_on():
+    manager = ModuleManager()
+    for command in ("tell me something", "what is it"):
+        assert manager.process_command(command).startswith("I'm not sure how to help")
+
+def test_note_modules_use_the_store_they_are_given(tmp_path):
+    store = NoteStore(str(tmp_path))
+    manager = ModuleManager(note_store=store)
+    manager.registry.get('notes').execute("note buy groceries", {'content': "buy groceries"})
+    assert "buy groceries" in manager.process_command("find my note about groceries")
+    assert [note['text'] for note in store.search("groceries")] == ["buy groceries"]
+    store.close()
@@ -0,0 +1,64 @@
+import sqlite3
+
+from intent_cache import IntentCache
+
+INTENT = {"action": "get_time", "parameters": {}, "response": ""}
+
+def last_used(path, key):
+    with sqlite3.connect(path) as db:
+        return db.execute("SELECT last_used FROM intents WHERE key = ?", (key,)).fetchone()[0]
+
+def test_hits_return_copies_and_count_savings(tmp_path):
+    cache = IntentCache(str(tmp_path / "cache.db"))
+    key = cache.make_key("What time is it?", "model", "prompt")
+    assert key == cache.make_key("what time is it", "model", "prompt")
+    assert cache.get(key) is None
+    cache.put(key, INTENT, latency=0.5, tokens=100)
+    hit = cache.get(key)
+    assert hit == INTENT
+    hit['action'] = 'changed'
+    assert cache.get(key) == INTENT
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['saved_tokens']) == (2, 1, 200)
+    cache.close()
+
+def test_entries_survive_a_restart_until_they_expire(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = IntentCache(path)
+    cache.put("key", INTENT)
+    cache.close()
+    assert IntentCache(path).get("key") == INTENT
+    assert IntentCache(path, ttl=1e-9).get("key") is None
+
+def test_hits_are_written_in_batches(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = IntentCache(path, touch_batch=3)
+    cache.put("key", INTENT)
+    written = last_used(path, "key")
+    cache.get("key")
+    assert not cache.db.in_transaction
+    assert last_used(path, "key") == written
+    cache.flush()
+    assert last_used(path, "key") > written
+    cache.close()
+
+def test_disk_table_keeps_the_most_recently_used_entries(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = IntentCache(path, max_entries=3)
+    for key in ("a", "b", "c"):
+        cache.put(key, INTENT)
+    cache.get("a")
+    cache.put("d", INTENT)
+    cache.close()
+    reopened = IntentCache(path, max_entries=3)
+    assert reopened.get("b") is None
+    assert all(reopened.get(key) == INTENT for key in ("a", "c", "d"))
+
+def test_replacing_an_entry_does_not_evict_others(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = IntentCache(path, max_entries=2)
+    cache.put("a", INTENT)
+    for _ in range(5):
+        cache.put("b", INTENT)
+    cache.close()
+    assert IntentCache(path).get("a") == INTENT
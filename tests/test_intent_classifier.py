@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+from intent_classifier import EXACT_MATCH, SEED_EXAMPLES, IntentClassifier, answers_alone, training_examples
+
+@pytest.fixture(scope='module')
+def classifier():
+    return IntentClassifier.train(SEED_EXAMPLES)
+
+def test_seed_examples_classify_as_their_intent(classifier):
+    for intent, examples in SEED_EXAMPLES.items():
+        for example in examples:
+            assert classifier.classify(example) == (intent, pytest.approx(1.0, abs=1e-4))
+
+def test_batch_classification_matches_single_commands(classifier):
+    commands = ["how late is it", "put on some tunes", "what time is it in tokyo", "tell me something"]
+    for (action, score), command in zip(classifier.classify_many(commands), commands):
+        single_action, single_score = classifier.classify(command)
+        assert action == single_action
+        assert score == pytest.approx(single_score, abs=1e-5)
+
+@pytest.mark.parametrize('command, alone', [
+    ("how late is it", True),
+    ("put on some tunes", True),
+    ("what time is it in tokyo", False),
+    ("what's the date of easter", False),
+    ("send an email to bob saying hi", False),
+    ("tell me something", False),
+    ("what is it", False),
+])
+def test_only_close_parameterless_matches_answer_alone(classifier, command, alone):
+    assert answers_alone(*classifier.classify(command)) is alone
+
+def test_answers_alone_needs_a_parameterless_intent_and_the_higher_threshold():
+    assert not answers_alone('weather', 1.0)
+    assert answers_alone('get_time', EXACT_MATCH)
+    assert not answers_alone('get_time', 0.9, threshold=0.95)
+
+def test_saved_model_classifies_like_the_trained_one(classifier, tmp_path):
+    classifier.save(str(tmp_path))
+    loaded = IntentClassifier.load(str(tmp_path))
+    assert loaded.classify("how late is it") == classifier.classify("how late is it")
+
+def test_logged_commands_extend_the_examples(tmp_path):
+    log = tmp_path / "intent_log.jsonl"
+    log.write_text(json.dumps({'command': "crank up the tunes", 'action': 'music'}) + "\n" + "not json\n")
+    classifier = IntentClassifier.train(training_examples([str(log)]))
+    assert classifier.classify("crank up the tunes")[0] == 'music'
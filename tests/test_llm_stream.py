@@ -0,0 +1,66 @@
+import json
+import types
+
+from llm_stream import ResponseFieldParser, SentenceSplitter, stream_intent, stream_tool_call
+
+def chunk(content=None, tool_calls=None, usage=None):
+    choices = [] if content is None and tool_calls is None else [
+        types.SimpleNamespace(delta=types.SimpleNamespace(content=content, tool_calls=tool_calls))]
+    return types.SimpleNamespace(choices=choices, usage=usage)
+
+class FakeStreamingLLM:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def stream(self, **request):
+        return iter(self.chunks)
+
+def pieces(text, size):
+    return [text[index:index + size] for index in range(0, len(text), size)]
+
+def test_response_field_is_decoded_across_cut_escapes():
+    reply = json.dumps({"action": "general_chat", "response": "Say \"hi\"\nété \\ done"})
+    parser = ResponseFieldParser()
+    decoded = ''.join(parser.feed(piece) for piece in pieces(reply, 3))
+    assert decoded == "Say \"hi\"\nété \\ done"
+    assert parser.done
+
+def test_sentences_are_handed_back_once_complete():
+    splitter = SentenceSplitter()
+    assert splitter.feed("It is sunny. Take") == ["It is sunny."]
+    assert splitter.feed(" a hat! Or (maybe) not?\" Then") == ["Take a hat!", "Or (maybe) not?\""]
+    assert splitter.flush() == ["Then"]
+    assert splitter.flush() == []
+
+def test_stream_intent_speaks_the_response_as_it_arrives():
+    reply = json.dumps({"action": "general_chat", "parameters": {},
+                        "response": "Paris is in France. It is the capital. Anything else"})
+    usage = types.SimpleNamespace(prompt_tokens=10, completion_tokens=20, total_tokens=30)
+    client = FakeStreamingLLM([chunk(piece) for piece in pieces(reply, 7)] + [chunk(usage=usage)])
+    spoken = []
+    text, latency, counts = stream_intent(client, "model", [], spoken.append)
+    assert json.loads(text)['action'] == 'general_chat'
+    assert spoken == ["Paris is in France.", "It is the capital.", "Anything else"]
+    assert counts == {'prompt_tokens': 10, 'completion_tokens': 20, 'total_tokens': 30}
+
+def test_stream_intent_speaks_the_rest_of_a_cut_off_reply():
+    client = FakeStreamingLLM([chunk('{"response": "Half a sen')])
+    spoken = []
+    _, _, counts = stream_intent(client, "model", [], spoken.append)
+    assert spoken == ["Half a sen"]
+    assert counts['total_tokens'] == 0
+
+def test_stream_tool_call_assembles_arguments_from_deltas():
+    def call(name=None, arguments=None):
+        return types.SimpleNamespace(index=0, function=types.SimpleNamespace(name=name, arguments=arguments))
+
+    client = FakeStreamingLLM([
+        chunk("One moment. "),
+        chunk(tool_calls=[call("weather", '{"ci')]),
+        chunk(tool_calls=[call(arguments='ty": "Oslo"}')]),
+    ])
+    spoken = []
+    content, tool_calls, _, _ = stream_tool_call(client, "model", [], [], spoken.append)
+    assert content == "One moment. "
+    assert spoken == ["One moment."]
+    assert tool_calls == [("weather", '{"city": "Oslo"}')]
@@ -0,0 +1,32 @@
+import pytest
+
+from local_intents import HIGH, LOW, MEDIUM, classify_locally
+
+@pytest.mark.parametrize('command, action, parameters', [
+    ("open chrome please", 'open_application', {'application': 'chrome'}),
+    ("can you tell me the time?", 'get_time', {}),
+    ("what's the date today", 'get_date', {}),
+    ("weather in paris", 'weather', {'city': 'paris'}),
+    ("calculate 2+2", 'calculator', {'expression': '2+2'}),
+    ("play music", 'music', {}),
+    ("find my note about groceries", 'find_note', {'query': 'groceries'}),
+])
+def test_known_forms_are_confident(command, action, parameters):
+    intent, confidence = classify_locally(command)
+    assert (intent['action'], intent['parameters'], confidence) == (action, parameters, HIGH)
+
+@pytest.mark.parametrize('command, action, confidence', [
+    ("set a timer", 'get_time', LOW),
+    ("open the pod bay doors", 'open_application', LOW),
+    ("calculate 2+", 'calculator', LOW),
+    ("open foo", 'open_application', MEDIUM),
+    ("play jazz", 'music', MEDIUM),
+    ("remind me to call mom", 'reminder', MEDIUM),
+])
+def test_keyword_only_matches_are_not_confident(command, action, confidence):
+    intent, score = classify_locally(command)
+    assert (intent['action'], score) == (action, confidence)
+
+def test_unknown_commands_fall_back_to_chat():
+    intent, confidence = classify_locally("tell me about the roman empire")
+    assert (intent['action'], confidence) == ('general_chat', 0.0)
@@ -0,0 +1,91 @@
+import json
+import types
+
+import pytest
+
+from main import VoiceAssistant
+
+@pytest.fixture
+def assistant(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return VoiceAssistant(text_only=True)
+
+@pytest.mark.parametrize('command, action', [
+    ("open chrome please", 'open_application'),
+    ("what time is it", 'get_time'),
+    ("calculate 2+2", 'calculator'),
+])
+def test_confident_commands_are_answered_locally(assistant, command, action):
+    intent, path = assistant.route_locally(command)
+    assert path == 'local'
+    assert intent['action'] == action
+
+def test_threshold_decides_what_stays_local(assistant):
+    assert assistant.route_locally("weather in paris")[1] == 'local'
+    assistant.local_threshold = 0.99
+    intent, path = assistant.route_locally("weather in paris")
+    assert path is None
+    assert intent['action'] == 'weather'
+
+@pytest.mark.parametrize('command, action', [
+    ("how late is it", 'get_time'),
+    ("put on some tunes", 'music'),
+])
+def test_classifier_answers_close_parameterless_matches(assistant, command, action):
+    intent, path = assistant.route_locally(command)
+    assert path == 'classifier'
+    assert intent['action'] == action
+
+@pytest.mark.parametrize('command', [
+    "what time is it in tokyo",
+    "what's the date of easter",
+    "send an email to bob saying hi",
+])
+def test_commands_with_details_go_to_the_llm(assistant, command):
+    _, path = assistant.route_locally(command)
+    assert path is None
+
+class FakeLLM:
+    def __init__(self):
+        self.calls = 0
+
+    def complete(self, **request):
+        self.calls += 1
+        message = types.SimpleNamespace(
+            content=json.dumps({"action": "general_chat", "parameters": {}, "response": "Sure."}))
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)], usage=None)
+
+def test_self_contained_commands_hit_the_cache_as_the_conversation_grows(assistant):
+    assistant.llm = FakeLLM()
+    for _ in range(4):
+        assistant.classify_command("tell me a joke about cats")
+        assistant.memory.add("tell me a joke about cats", "Sure.")
+    assert assistant.llm.calls == 1
+
+def test_follow_ups_are_cached_per_conversation(assistant):
+    assistant.llm = FakeLLM()
+    for _ in range(2):
+        assistant.classify_command("and in paris?")
+        assistant.memory.add("and in paris?", "Sure.")
+    assert assistant.llm.calls == 2
+
+def test_assistant_and_note_modules_share_one_store(assistant):
+    from assistant_modules import ModuleManager
+    assert ModuleManager().note_store is assistant.note_store
+
+class FakeStreamingLLM:
+    def stream(self, **request):
+        reply = json.dumps({"action": "general_chat", "parameters": {},
+                            "response": "Paris is in France. It is the capital."})
+        for index in range(0, len(reply), 5):
+            delta = types.SimpleNamespace(content=reply[index:index + 5], tool_calls=None)
+            yield types.SimpleNamespace(choices=[types.SimpleNamespace(delta=delta)], usage=None)
+
+def test_streamed_replies_are_spoken_once(assistant):
+    assistant.llm = FakeStreamingLLM()
+    assistant.streaming = True
+    assistant.dispatch_mode = 'json'
+    spoken = []
+    local, _ = assistant.route_locally("tell me about paris")
+    assert assistant.handle_with_llm("tell me about paris", local, spoken.append) == 'llm'
+    assert spoken == ["Paris is in France.", "It is the capital."]
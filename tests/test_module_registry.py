@@ -0,0 +1,38 @@
+import json
+
+from assistant_modules import ModuleManager
+from module_registry import BUILTIN_MODULES, ModuleRegistry, ModuleSpec
+from note_store import NoteStore
+
+def test_builtin_metadata_matches_the_module_classes(tmp_path):
+    store = NoteStore(str(tmp_path))
+    manager = ModuleManager(ModuleRegistry(BUILTIN_MODULES), note_store=store)
+    assert manager.registry.check() == []
+    store.close()
+
+def test_check_reports_drifted_keywords(tmp_path):
+    drifted = ModuleSpec('time_date', 'assistant_modules:TimeDateModule', ('time', 'clock'))
+    registry = ModuleRegistry([drifted])
+    assert registry.check() == [
+        "time_date: keywords metadata ['clock', 'time'] != module "
+        "['clock', 'date', 'day', 'hour', 'time', 'today', 'tomorrow']"
+    ]
+
+def test_modules_load_on_first_use():
+    registry = ModuleRegistry(BUILTIN_MODULES)
+    assert registry.loaded() == []
+    assert type(registry.get('time_date')).__name__ == 'TimeDateModule'
+    assert registry.loaded() == ['time_date']
+
+def test_config_disables_overrides_and_adds_modules(tmp_path):
+    config = tmp_path / "modules.json"
+    config.write_text(json.dumps({'modules': [
+        {'name': 'system', 'enabled': False},
+        {'name': 'weather', 'keywords': ['weather', 'forecast']},
+        {'name': 'joke', 'target': 'jokes:JokeModule', 'keywords': ['joke']},
+    ]}))
+    registry = ModuleRegistry.discover(str(config), entry_points=False)
+    names = [spec.name for spec in registry.specs]
+    assert 'system' not in names
+    assert registry.spec('weather').keywords == ('weather', 'forecast')
+    assert names[-1] == 'joke'
@@ -0,0 +1,65 @@
+import json
+import os
+
+from note_store import NoteStore, shared_store
+
+def write_note(path, text, mtime):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.utime(path, (mtime, mtime))
+
+def test_imports_legacy_notes_from_its_own_directory(tmp_path):
+    write_note(tmp_path / "note_1.txt", "call the dentist", 2000)
+    store = NoteStore(str(tmp_path))
+    assert [note['text'] for note in store.search("dentist")] == ["call the dentist"]
+    store.close()
+
+def test_working_directory_notes_are_only_imported_on_request(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_note("note_20240101_090000.txt", "buy groceries", 1000)
+    store = NoteStore("notes")
+    assert store.search("groceries") == []
+    assert store.import_legacy(".") == 1
+    assert store.import_legacy(".") == 0
+    assert [note['text'] for note in store.search("groceries")] == ["buy groceries"]
+    store.close()
+
+def test_checkpoint_is_json_and_restores_the_indexes(tmp_path):
+    store = NoteStore(str(tmp_path))
+    first = store.add("buy groceries")
+    second = store.add("call the dentist about groceries")
+    store.delete(first)
+    store.close()
+    with open(tmp_path / "index.json", encoding='utf-8') as f:
+        assert json.load(f)['postings']['groceries'] == [second]
+
+    reopened = NoteStore(str(tmp_path))
+    assert [note['id'] for note in reopened.search("groceries")] == [second]
+    assert reopened.add("water the plants") == second + 1
+    reopened.close()
+
+def test_unreadable_checkpoint_is_rebuilt_from_the_log(tmp_path):
+    store = NoteStore(str(tmp_path))
+    store.add("buy groceries")
+    store.close()
+    (tmp_path / "index.json").write_bytes(b"\x80\x04not json")
+    reopened = NoteStore(str(tmp_path))
+    assert len(reopened.search("groceries")) == 1
+    reopened.close()
+
+def test_compaction_keeps_live_notes(tmp_path):
+    store = NoteStore(str(tmp_path))
+    ids = [store.add(f"note number {index}") for index in range(10)]
+    for note_id in ids[:5]:
+        store.delete(note_id)
+    store.compact()
+    assert len(store) == 5
+    assert store.get(ids[7])['text'] == "note number 7"
+    assert store.stats()['dead_bytes'] == 0
+    store.close()
+
+def test_one_shared_store_per_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('NOTES_DIR', "notes")
+    assert shared_store() is shared_store(str(tmp_path / "notes"))
+    assert shared_store() is not shared_store("other")
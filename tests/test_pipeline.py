@@ -0,0 +1,47 @@
+import time
+
+from pipeline import VoicePipeline
+
+def make_pipeline(*replies):
+    pipeline = VoicePipeline(capture=None, recognize=None, dispatch=None, speak=None)
+    for reply in replies:
+        pipeline.recent_speech.append((time.monotonic(), reply))
+    return pipeline
+
+def test_reply_heard_back_is_an_echo():
+    pipeline = make_pipeline("I've opened Spotify for you.")
+    assert pipeline._is_echo("i've opened spotify for you")
+
+def test_short_command_contained_in_last_reply_is_not_an_echo():
+    pipeline = make_pipeline("What would you like me to search for?")
+    assert not pipeline._is_echo("search")
+    pipeline = make_pipeline("The current time is 12:04 AM.")
+    assert not pipeline._is_echo("time")
+    assert not pipeline._is_echo("what time is it")
+
+def test_partial_overlap_is_not_an_echo():
+    pipeline = make_pipeline("I've opened weather information for london.")
+    assert not pipeline._is_echo("what's the weather in london")
+
+def test_old_speech_is_ignored():
+    pipeline = make_pipeline()
+    pipeline.recent_speech.append((time.monotonic() - 60, "I've opened Spotify for you."))
+    assert not pipeline._is_echo("i've opened spotify for you")
+
+def test_stop_lets_queued_replies_finish():
+    commands = ["read me the news"]
+    spoken = []
+
+    def dispatch(command, say):
+        for index in range(6):
+            say(f"headline {index}")
+
+    def speak(text):
+        time.sleep(0.15)
+        spoken.append(text)
+
+    pipeline = VoicePipeline(capture=lambda: commands.pop() if commands else None,
+                             recognize=lambda audio: audio, dispatch=dispatch, speak=speak, queue_size=1)
+    pipeline.run(lambda: bool(commands))
+    assert spoken == [f"headline {index}" for index in range(6)]
+    assert not pipeline.is_active()
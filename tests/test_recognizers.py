@@ -0,0 +1,46 @@
+import json
+import sys
+import types
+
+import pytest
+import speech_recognition as sr
+
+from recognizers import FallbackBackend, RecognizerBackend, VoskBackend
+
+def fake_vosk(text):
+    class KaldiRecognizer:
+        def __init__(self, *args):
+            pass
+
+        def AcceptWaveform(self, data):
+            return True
+
+        def FinalResult(self):
+            return json.dumps({'text': text})
+
+    return types.SimpleNamespace(SetLogLevel=lambda level: None, Model=lambda path: object(),
+                                 KaldiRecognizer=KaldiRecognizer)
+
+def vosk_backend(monkeypatch, tmp_path, text):
+    monkeypatch.setitem(sys.modules, 'vosk', fake_vosk(text))
+    return VoskBackend(str(tmp_path), ["weather in", "london"])
+
+class FixedBackend(RecognizerBackend):
+    name = "fixed"
+
+    def transcribe(self, audio):
+        return "weather in reykjavik"
+
+AUDIO = sr.AudioData(b'\0\0' * 1600, 16000, 2)
+
+def test_vosk_returns_commands_inside_the_grammar(monkeypatch, tmp_path):
+    assert vosk_backend(monkeypatch, tmp_path, "weather in london").transcribe(AUDIO) == "weather in london"
+
+def test_vosk_does_not_truncate_unknown_words(monkeypatch, tmp_path):
+    backend = vosk_backend(monkeypatch, tmp_path, "weather in [unk]")
+    with pytest.raises(sr.UnknownValueError):
+        backend.transcribe(AUDIO)
+
+def test_fallback_takes_over_from_vosk_on_unknown_words(monkeypatch, tmp_path):
+    backend = FallbackBackend([vosk_backend(monkeypatch, tmp_path, "weather in [unk]"), FixedBackend()])
+    assert backend.recognize(AUDIO) == "weather in reykjavik"
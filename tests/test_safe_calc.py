@@ -0,0 +1,41 @@
+import random
+
+import pytest
+
+from safe_calc import CalculationError, evaluate, evaluate_many
+
+def outcome(function, *args):
+    """A result, or the error type and message, so failures can be compared too"""
+    try:
+        result = function(*args)
+    except CalculationError as e:
+        return ('error', str(e))
+    if isinstance(result, CalculationError):
+        return ('error', str(result))
+    return (type(result), result)
+
+EXPRESSIONS = [
+    "2 + 3", "10 + 7", "2**60 + 1", "12345678901 * 98765432109", "2**53 + 1", "(2**60 + 1) / 3",
+    "7 / 2", "7 // 2", "-7 % 3", "1.5 + 2", "0.1 + 0.2", "2.5 ** 3", "10.0 ** 400", "1.5 ** 5000",
+    "2 ** 20000", "2.0 ** 20000", "0.0 ** -1", "(-8.0) ** 0.5", "5.0 // 0.0", "5.0 % 0", "1 / 0",
+    "9**9**9", "1e308 * 10", "-7.5 // 2", "-7.5 % 2", "3 ** -2", "2.0 ** -1074", "9007199254740993 + 0.5",
+    "fifteen plus twenty seven", "100 divided by 8", "what is 3 times 4.5", "2 +", "__import__('os')",
+]
+
+@pytest.mark.parametrize('expression', EXPRESSIONS)
+def test_batch_matches_scalar(expression):
+    assert outcome(lambda: evaluate_many([expression])[0]) == outcome(evaluate, expression)
+
+def test_batch_of_mixed_expressions_matches_scalar():
+    rng = random.Random(7)
+    expressions = list(EXPRESSIONS)
+    for _ in range(500):
+        a = rng.choice([rng.randint(-10 ** 12, 10 ** 12), round(rng.uniform(-1e6, 1e6), 3), 0, 0.0])
+        b = rng.choice([rng.randint(-40, 40), round(rng.uniform(-40, 40), 2), 0])
+        op = rng.choice(['+', '-', '*', '/', '//', '%', '**'])
+        expressions.append(f"({a}) {op} ({b})")
+    batch = evaluate_many(expressions)
+    assert [outcome(lambda: value) for value in batch] == [outcome(evaluate, x) for x in expressions]
+
+def test_large_integers_stay_exact():
+    assert evaluate_many(["2**60 + 1", "12345678901 * 98765432109"]) == [2 ** 60 + 1, 12345678901 * 98765432109]
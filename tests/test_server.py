@@ -0,0 +1,88 @@
+import asyncio
+import json
+import os
+import struct
+import types
+
+import pytest
+
+from main import VoiceAssistant
+from server import AssistantServer
+
+class FakeLLM:
+    def complete(self, **request):
+        message = types.SimpleNamespace(
+            content=json.dumps({"action": "general_chat", "parameters": {}, "response": "Sure."}))
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)], usage=None)
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assistant = VoiceAssistant(text_only=True)
+    assistant.llm = FakeLLM()
+    server = AssistantServer(assistant, workers=2, notes_dir=str(tmp_path / "sessions"))
+    yield server
+    server.close_sessions()
+    server.executor.shutdown()
+
+def turn(server, session, text):
+    events = []
+
+    async def emit(event):
+        events.append(event)
+
+    asyncio.run(server.run_turn(session, emit, text=text))
+    return [event['text'] for event in events if event['type'] == 'reply'], events[-1]
+
+def test_sessions_do_not_see_each_others_notes(server):
+    first, second = server.create_session(), server.create_session()
+    turn(server, first, "create a note buy groceries")
+    replies, _ = turn(server, first, "find my note about groceries")
+    assert "buy groceries" in replies[0]
+    replies, _ = turn(server, second, "find my note about groceries")
+    assert "couldn't find any notes" in replies[0]
+
+def test_turns_report_the_route_that_answered(server):
+    session = server.create_session()
+    assert turn(server, session, "what time is it")[1]['route'] == 'local'
+    assert turn(server, session, "tell me a joke about cats")[1]['route'] == 'llm'
+    assert turn(server, session, "tell me a joke about cats")[1]['route'] == 'cache'
+    assert server.assistant.route_counts['cache'] == 1
+    assert [entry['route'] for entry in session.history] == ['local', 'llm', 'cache']
+
+def test_deleted_sessions_take_their_notes_with_them(server):
+    session = server.create_session()
+    turn(server, session, "create a note buy groceries")
+    directory = session.notes.directory
+    assert os.path.isdir(directory)
+    server.sessions.pop(session.id).close()
+    assert not os.path.exists(directory)
+
+async def exchange(server, data):
+    """Everything the server sends back for data until it closes the connection"""
+    listener = await server.start('127.0.0.1', 0)
+    port = listener.sockets[0].getsockname()[1]
+    try:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(data)
+        await writer.drain()
+        received = await asyncio.wait_for(reader.read(), 5)
+        writer.close()
+        return received
+    finally:
+        listener.close()
+
+@pytest.mark.parametrize('length', [b'abc', b'-5'])
+def test_malformed_content_length_is_a_bad_request(server, length):
+    request = b"POST /sessions HTTP/1.1\r\nContent-Length: " + length + b"\r\n\r\n"
+    assert asyncio.run(exchange(server, request)).startswith(b"HTTP/1.1 400 Bad Request")
+
+def test_websocket_errors_close_the_socket_with_a_close_frame(server):
+    handshake = (b"GET /ws HTTP/1.1\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                 b"Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\n\r\n")
+    too_large = struct.pack('!BBQ', 0x82, 0x80 | 127, 1 << 40) + b'\0' * 4
+    response = asyncio.run(exchange(server, handshake + too_large))
+    assert response.startswith(b"HTTP/1.1 101")
+    assert b"HTTP/1.1 413" not in response
+    reason = b"message too large"
+    assert response.endswith(struct.pack('!BBH', 0x88, 2 + len(reason), 1009) + reason)
@@ -0,0 +1,52 @@
+import sqlite3
+
+from tts_cache import TTSCache
+
+def render(cache, text, size=1000):
+    key = cache.make_key(text, "voice", 150, 0.9)
+    with open(cache.path_for(key), 'wb') as f:
+        f.write(b'\0' * size)
+    cache.add(key, text, render_seconds=0.25)
+    return key
+
+def test_rendered_phrases_are_played_from_the_cache(tmp_path):
+    cache = TTSCache(str(tmp_path))
+    key = cache.make_key("I've opened Spotify for you.", "voice", 150, 0.9)
+    assert key == cache.make_key("I've opened  Spotify for you.", "voice", 150, 0.9)
+    assert cache.lookup(key) is None
+    render(cache, "I've opened Spotify for you.")
+    assert cache.lookup(key) == cache.path_for(key)
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['saved_seconds']) == (1, 1, 0.25)
+    cache.close()
+
+def test_phrases_are_rendered_the_second_time_they_miss(tmp_path):
+    cache = TTSCache(str(tmp_path))
+    assert not cache.should_render("key")
+    assert cache.should_render("key")
+    cache.close()
+
+def test_least_recently_used_phrases_are_evicted(tmp_path):
+    cache = TTSCache(str(tmp_path), max_bytes=2500)
+    first, second = render(cache, "first"), render(cache, "second")
+    cache.lookup(first)
+    render(cache, "third")
+    assert first in cache and second not in cache
+    assert cache.stats()['evictions'] == 1
+    cache.close()
+
+def test_hits_are_written_in_batches(tmp_path):
+    cache = TTSCache(str(tmp_path), touch_batch=3)
+    key = render(cache, "first")
+
+    def last_used():
+        with sqlite3.connect(str(tmp_path / "index.db")) as db:
+            return db.execute("SELECT last_used FROM clips WHERE key = ?", (key,)).fetchone()[0]
+
+    written = last_used()
+    cache.lookup(key)
+    assert not cache.db.in_transaction
+    assert last_used() == written
+    cache.flush()
+    assert last_used() > written
+    cache.close()
@@ -0,0 +1,59 @@
+import numpy as np
+import speech_recognition as sr
+
+from wake_word import SAMPLE_RATE, WakeWordDetector, WakeWordGate, dtw_prefix
+
+rng = np.random.default_rng(0)
+
+def tones(*frequencies, seconds=0.15):
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    return np.concatenate([8000 * np.sin(2 * np.pi * f * t) for f in frequencies]).astype(np.float32)
+
+def quiet(seconds):
+    return rng.normal(0, 20, int(SAMPLE_RATE * seconds)).astype(np.float32)
+
+def clip(*parts):
+    return np.concatenate(parts)
+
+WAKE = tones(300, 800, 1500)
+COMMAND = tones(600, 1000, 400, 900)
+
+def detector():
+    return WakeWordDetector.enroll([clip(quiet(0.2), WAKE, quiet(0.2))])
+
+def audio(samples):
+    return sr.AudioData(samples.astype(np.int16).tobytes(), SAMPLE_RATE, 2)
+
+def test_dtw_rejects_features_at_half_the_template_length():
+    template = rng.normal(size=(20, 13)).astype(np.float32)
+    assert dtw_prefix(template, template[:10]) == (float('inf'), 10)
+    distance, frames = dtw_prefix(template, template[:11])
+    assert np.isfinite(distance) and frames <= 11
+
+def test_dtw_matches_a_template_onto_itself():
+    template = rng.normal(size=(20, 13)).astype(np.float32)
+    distance, frames = dtw_prefix(template, np.concatenate([template, template[::-1]]))
+    assert distance < 0.01
+    assert frames == 20
+
+def test_detector_accepts_the_wake_word_and_rejects_other_sounds():
+    wake = detector()
+    assert wake.detect(clip(quiet(0.2), WAKE, quiet(0.3)))[0] <= wake.threshold
+    assert wake.detect(clip(quiet(0.2), tones(2000, 500, 1200), quiet(0.3)))[0] > wake.threshold
+    assert wake.detect(quiet(1)) == (float('inf'), None)
+    assert wake.stats()['energy_rejects'] == 1
+
+def test_gate_passes_the_command_after_the_wake_word():
+    gate = WakeWordGate(detector())
+    passed = gate(audio(clip(quiet(0.2), WAKE, quiet(0.1), COMMAND, quiet(0.2))))
+    assert passed is not None
+    assert len(passed.frame_data) // 2 < len(clip(quiet(0.2), WAKE, quiet(0.1), COMMAND, quiet(0.2)))
+
+def test_wake_word_alone_lets_the_next_utterance_through_whole():
+    woken = []
+    gate = WakeWordGate(detector(), on_wake=lambda: woken.append(True))
+    assert gate(audio(clip(quiet(0.2), WAKE, quiet(0.3)))) is None
+    assert woken == [True]
+    command = audio(clip(quiet(0.2), COMMAND, quiet(0.2)))
+    assert gate(command) is command
+    assert gate(command) is None
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Per-turn latency tracing.
+Every voice turn gets an ID, and each stage of it (calibrate, capture,
+recognize, llm, handler, tts, and the whole turn) is recorded as a span.
+Recording a span only appends a tuple to a deque; a background thread writes
+the spans to a rotating JSONL file and refreshes a Prometheus text-format
+file, so tracing can stay on in production. Run this file on trace files to
+get p50/p99 per stage.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+class Turn:
+    """One command, from the end of the utterance (or typing it) to the reply"""
+
+    __slots__ = ('id', 'source', 'started')
+
+    def __init__(self, turn_id, source):
+        self.id = turn_id
+        self.source = source
+        self.started = time.perf_counter()
+
+class StageStats:
+    """Histogram plus a window of recent durations for one stage"""
+
+    def __init__(self, window=2048):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=window)
+
+    def add(self, seconds):
+        index = 0
+        while index < len(BUCKETS) and seconds > BUCKETS[index]:
+            index += 1
+        self.counts[index] += 1
+        self.total += seconds
+        self.count += 1
+        self.recent.append(seconds)
+
+    def summary(self):
+        values = sorted(self.recent)
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total / self.count * 1000, 1) if self.count else 0.0,
+            'p50_ms': round(percentile(values, 0.50) * 1000, 1),
+            'p99_ms': round(percentile(values, 0.99) * 1000, 1)
+        }
+
+class Tracer:
+    """Records spans per turn and exports them in the background
+
+    jsonl_path gets one JSON object per span and rotates at max_bytes;
+    prometheus_path is rewritten (atomically) with histograms and p50/p99
+    gauges per stage. Either may be None.
+    """
+
+    def __init__(self, jsonl_path=None, prometheus_path=None, max_bytes=5 * 1024 * 1024, backups=3,
+                 flush_interval=2.0):
+        self.jsonl_path = jsonl_path
+        self.prometheus_path = prometheus_path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_interval = flush_interval
+
+        self.spans = deque()  # (turn_id, stage, wall_time, seconds, attrs)
+        self.stats = {}
+        self.turns = 0
+        self.local = threading.local()
+        self.ids = itertools.count(1)
+        self.prefix = uuid.uuid4().hex[:6]
+        self.lock = threading.Lock()
+
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self._export_loop, name="tracer", daemon=True)
+        self.thread.start()
+
+    @classmethod
+    def from_env(cls):
+        """Tracer configured by TRACE_DIR (default "traces"; "off" disables tracing)"""
+        directory = os.getenv('TRACE_DIR', 'traces')
+        if directory.lower() in ('', 'off', '0', 'none'):
+            return NullTracer()
+        return cls(os.path.join(directory, 'trace.jsonl'), os.path.join(directory, 'metrics.prom'),
+                   max_bytes=int(os.getenv('TRACE_MAX_BYTES', str(5 * 1024 * 1024))))
+
+    # Turns
+
+    def new_turn(self, source):
+        """Create a turn (not yet active on any thread)"""
+        return Turn(f"{self.prefix}-{next(self.ids)}", source)
+
+    def current(self):
+        """The turn active on this thread, or None"""
+        return getattr(self.local, 'turn', None)
+
+    @contextmanager
+    def activate(self, turn):
+        """Make turn the current one on this thread (spans recorded inside belong to it)"""
+        previous = getattr(self.local, 'turn', None)
+        self.local.turn = turn
+        try:
+            yield turn
+        finally:
+            self.local.turn = previous
+
+    @contextmanager
+    def turn(self, source):
+        """Run a whole turn: reuses the active turn if there is one, else starts and times a new one"""
+        current = self.current()
+        if current is not None:
+            yield current
+            return
+        turn = self.new_turn(source)
+        with self.activate(turn):
+            try:
+                yield turn
+            finally:
+                self.end_turn(turn)
+
+    def end_turn(self, turn):
+        """Record the end-to-end 'turn' span"""
+        self.record('turn', time.perf_counter() - turn.started, turn, source=turn.source)
+
+    # Spans
+
+    @contextmanager
+    def span(self, stage, **attrs):
+        """Time the enclosed block as a span of the current turn"""
+        started = time.perf_counter()
+        try:
+            yield attrs
+        finally:
+            self.record(stage, time.perf_counter() - started, **attrs)
+
+    def record(self, stage, seconds, turn=None, **attrs):
+        """Record a span that has already been timed"""
+        turn = turn or self.current()
+        # deque.append is atomic, so the hot path takes no lock
+        self.spans.append((turn.id if turn else None, stage, time.time(), seconds, attrs))
+
+    # Export
+
+    def flush(self):
+        """Move recorded spans into the statistics and files now"""
+        with self.lock:
+            lines = []
+            processed = 0
+            while True:
+                try:
+                    turn_id, stage, wall_time, seconds, attrs = self.spans.popleft()
+                except IndexError:
+                    break
+                processed += 1
+                self.stats.setdefault(stage, StageStats()).add(seconds)
+                if stage == 'turn':
+                    self.turns += 1
+                if self.jsonl_path:
+                    record = {'turn': turn_id, 'stage': stage, 'ts': round(wall_time, 6),
+                              'ms': round(seconds * 1000, 3)}
+                    if attrs:
+                        record.update(attrs)
+                    lines.append(json.dumps(record, default=str))
+            if lines:
+                self._write_jsonl(lines)
+            if processed:
+                self._write_prometheus()
+
+    def summary(self):
+        """{stage: {count, mean_ms, p50_ms, p99_ms}} over the recent window"""
+        self.flush()
+        with self.lock:
+            return {stage: stats.summary() for stage, stats in sorted(self.stats.items())}
+
+    def summary_line(self):
+        return ", ".join(f"{stage} p50 {s['p50_ms']} / p99 {s['p99_ms']} ms"
+                         for stage, s in self.summary().items() if s['count'])
+
+    def close(self):
+        self.stopping.set()
+        self.thread.join(timeout=5)
+        self.flush()
+
+    def _export_loop(self):
+        while not self.stopping.wait(self.flush_interval):
+            try:
+                self.flush()
+            except OSError:
+                pass  # a full disk shouldn't take the assistant down
+
+    def _write_jsonl(self, lines):
+        os.makedirs(os.path.dirname(self.jsonl_path) or '.', exist_ok=True)
+        data = '\n'.join(lines) + '\n'
+        try:
+            size = os.path.getsize(self.jsonl_path)
+        except OSError:
+            size = 0
+        if size and size + len(data) > self.max_bytes:
+            for index in range(self.backups - 1, 0, -1):
+                older = f"{self.jsonl_path}.{index}"
+                if os.path.exists(older):
+                    os.replace(older, f"{self.jsonl_path}.{index + 1}")
+            os.replace(self.jsonl_path, f"{self.jsonl_path}.1")
+        with open(self.jsonl_path, 'a', encoding='utf-8') as f:
+            f.write(data)
+
+    def _write_prometheus(self):
+        if not self.prometheus_path:
+            return
+        out = [
+            "# HELP voice_turns_total Completed voice assistant turns.",
+            "# TYPE voice_turns_total counter",
+            f"voice_turns_total {self.turns}",
+            "# HELP voice_stage_seconds Time spent in each stage of a turn.",
+            "# TYPE voice_stage_seconds histogram"
+        ]
+        for stage, stats in sorted(self.stats.items()):
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ('+Inf',), stats.counts):
+                cumulative += count
+                out.append(f'voice_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            out.append(f'voice_stage_seconds_sum{{stage="{stage}"}} {stats.total:.6f}')
+            out.append(f'voice_stage_seconds_count{{stage="{stage}"}} {stats.count}')
+        out += ["# HELP voice_stage_latency_seconds Recent per-stage latency quantiles.",
+                "# TYPE voice_stage_latency_seconds gauge"]
+        for stage, stats in sorted(self.stats.items()):
+            values = sorted(stats.recent)
+            for quantile in (0.5, 0.99):
+                out.append(f'voice_stage_latency_seconds{{stage="{stage}",quantile="{quantile}"}} '
+                           f'{percentile(values, quantile):.6f}')
+
+        os.makedirs(os.path.dirname(self.prometheus_path) or '.', exist_ok=True)
+        temporary = self.prometheus_path + '.tmp'
+        with open(temporary, 'w') as f:
+            f.write('\n'.join(out) + '\n')
+        os.replace(temporary, self.prometheus_path)
+
+class NullTracer:
+    """Tracer stand-in that records nothing (TRACE_DIR=off)"""
+
+    def new_turn(self, source):
+        return None
+
+    def current(self):
+        return None
+
+    @contextmanager
+    def activate(self, turn):
+        yield turn
+
+    @contextmanager
+    def turn(self, source):
+        yield None
+
+    def end_turn(self, turn):
+        pass
+
+    @contextmanager
+    def span(self, stage, **attrs):
+        yield attrs
+
+    def record(self, stage, seconds, turn=None, **attrs):
+        pass
+
+    def flush(self):
+        pass
+
+    def summary(self):
+        return {}
+
+    def summary_line(self):
+        return ""
+
+    def close(self):
+        pass
+
+def summarize_files(paths):
+    """p50/p99 per stage from JSONL trace files"""
+    stats = {}
+    turns = set()
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                record = json.loads(line)
+                stats.setdefault(record['stage'], StageStats(window=None)).add(record['ms'] / 1000)
+                if record.get('turn'):
+                    turns.add(record['turn'])
+    return {'turns': len(turns), 'stages': {stage: s.summary() for stage, s in sorted(stats.items())}}
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize per-stage latency from trace files")
+    parser.add_argument('paths', nargs='*', default=['traces/trace.jsonl'],
+                        help="JSONL trace files (default: traces/trace.jsonl)")
+    args = parser.parse_args()
+
+    report = summarize_files(args.paths)
+    print(f"{report['turns']} turns")
+    print(f"{'stage':<12}{'count':>8}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for stage, s in report['stages'].items():
+        print(f"{stage:<12}{s['count']:>8}{s['mean_ms']:>10}{s['p50_ms']:>10}{s['p99_ms']:>10}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+On-disk cache of synthesized speech.
+Most replies are the same few sentences ("I've opened Spotify for you."), so
+the speech worker renders a phrase to an audio file with the engine's file
+output the second time it says it, and plays the file directly from then
+on. Files are keyed by text, voice, rate and volume and kept in a
+size-bounded, least-recently-used directory indexed in SQLite. Common
+phrases are rendered ahead of time by quick_start.py.
+
+    python tts_cache.py --prerender      # render COMMON_PHRASES
+    python tts_cache.py --stats
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Fixed replies of the task handlers, rendered at install time
+COMMON_PHRASES = (
+    "Hello! I'm Alexa, your AI voice assistant. How can I help you today?",
+    "Hello! I'm Alexa, your voice assistant. How can I help you today?",
+    "I understand your request.",
+    "I understand your request. Let me help you with that.",
+    "What would you like me to search for?",
+    "What application would you like me to open?",
+    "What would you like me to write in the note?",
+    "What should I look for in your notes?",
+    "I've opened your email client.",
+    "Which city's weather would you like to check?",
+    "What would you like me to calculate?",
+    "I couldn't calculate that expression.",
+    "I've opened Spotify for you.",
+    "What would you like me to remind you about?",
+    "OpenAI API key not set. Please add OPENAI_API_KEY to your environment.",
+) + tuple(f"I've opened {app} for you." for app in ('Calculator', 'Notes', 'Safari', 'Google Chrome', 'Mail'))
+
+class TTSCache:
+    """LRU directory of rendered phrases, bounded to max_bytes, with hit and time-saved counters
+
+    Last-used times of hits are written to the index in batches of
+    touch_batch, before evicting, and on flush() / close().
+    """
+
+    def __init__(self, directory="tts_cache", max_bytes=50 * 1024 * 1024, touch_batch=32):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.touch_batch = touch_batch
+        self.touched = {}  # key -> last-used time not yet written to the index
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(directory, 'index.db'), check_same_thread=False)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS clips ("
+            "key TEXT PRIMARY KEY, text TEXT NOT NULL, bytes INTEGER NOT NULL, "
+            "render_seconds REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.db.commit()
+        self.total_bytes = self.db.execute("SELECT COALESCE(SUM(bytes), 0) FROM clips").fetchone()[0]
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.rendered = 0
+        self.evictions = 0
+        self.saved_seconds = 0.0
+        # Keys missed once this session; a phrase is only rendered when it comes up again
+        self.seen = set()
+
+    @classmethod
+    def from_env(cls):
+        """Cache in TTS_CACHE_DIR (default tts_cache), or None when TTS_CACHE_DIR=off"""
+        directory = os.getenv('TTS_CACHE_DIR', 'tts_cache')
+        if directory.lower() in ('', 'off', '0', 'none'):
+            return None
+        return cls(directory, int(float(os.getenv('TTS_CACHE_MAX_MB', '50')) * 1024 * 1024))
+
+    @staticmethod
+    def make_key(text, voice, rate, volume):
+        digest = hashlib.sha256()
+        for part in (' '.join(text.split()), str(voice), str(rate), f"{float(volume):.2f}"):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def path_for(self, key):
+        return os.path.join(self.directory, f"{key}.wav")
+
+    def __contains__(self, key):
+        with self.lock:
+            row = self.db.execute("SELECT 1 FROM clips WHERE key = ?", (key,)).fetchone()
+        return row is not None and os.path.exists(self.path_for(key))
+
+    def lookup(self, key):
+        """Path of the rendered phrase, or None on a miss"""
+        with self.lock:
+            row = self.db.execute("SELECT render_seconds FROM clips WHERE key = ?", (key,)).fetchone()
+            path = self.path_for(key)
+            if row is None or not os.path.exists(path):
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.saved_seconds += row[0]
+            self.touched[key] = time.time()
+            if len(self.touched) >= self.touch_batch:
+                self._write_touched()
+            return path
+
+    def should_render(self, key):
+        """True the second time a phrase misses, so one-off sentences are never rendered"""
+        with self.lock:
+            if key in self.seen:
+                self.seen.discard(key)
+                return True
+            if len(self.seen) > 10000:
+                self.seen.clear()
+            self.seen.add(key)
+            return False
+
+    def add(self, key, text, render_seconds):
+        """Index a phrase just rendered to path_for(key), evicting the least recently used ones"""
+        path = self.path_for(key)
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return
+        size = os.path.getsize(path)
+        with self.lock:
+            self.touched.pop(key, None)
+            self._write_touched(commit=False)  # eviction goes by last use
+            previous = self.db.execute("SELECT bytes FROM clips WHERE key = ?", (key,)).fetchone()
+            self.total_bytes += size - (previous[0] if previous else 0)
+            self.db.execute(
+                "INSERT OR REPLACE INTO clips (key, text, bytes, render_seconds, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, text, size, render_seconds, time.time())
+            )
+            self.rendered += 1
+            while self.total_bytes > self.max_bytes:
+                oldest = self.db.execute("SELECT key, bytes FROM clips ORDER BY last_used LIMIT 1").fetchone()
+                if oldest is None:
+                    break
+                self.db.execute("DELETE FROM clips WHERE key = ?", oldest[:1])
+                self.total_bytes -= oldest[1]
+                self.evictions += 1
+                try:
+                    os.remove(self.path_for(oldest[0]))
+                except OSError:
+                    pass
+            self.db.commit()
+
+    def clear(self):
+        with self.lock:
+            for (key,) in self.db.execute("SELECT key FROM clips").fetchall():
+                try:
+                    os.remove(self.path_for(key))
+                except OSError:
+                    pass
+            self.db.execute("DELETE FROM clips")
+            self.db.commit()
+            self.touched.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        """Hit rate, synthesis time saved by hits and the size of the cache"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            entries = self.db.execute("SELECT COUNT(*) FROM clips").fetchone()[0]
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'rendered': self.rendered,
+                'entries': entries,
+                'megabytes': round(self.total_bytes / (1024 * 1024), 2),
+                'evictions': self.evictions,
+                'saved_seconds': round(self.saved_seconds, 3)
+            }
+
+    def flush(self):
+        """Write the last-used times of recent hits to the index"""
+        with self.lock:
+            self._write_touched()
+
+    def close(self):
+        with self.lock:
+            self._write_touched()
+            self.db.close()
+
+    def _write_touched(self, commit=True):
+        if self.touched:
+            self.db.executemany("UPDATE clips SET last_used = ? WHERE key = ?",
+                                [(used, key) for key, used in self.touched.items()])
+            self.touched.clear()
+            if commit:
+                self.db.commit()
+
+class ClipPlayer:
+    """Plays rendered phrases through PyAudio in short chunks so playback can be cut off"""
+
+    def __init__(self, chunk_seconds=0.02):
+        import pyaudio
+        self.pyaudio = pyaudio
+        self.audio = pyaudio.PyAudio()
+        self.chunk_seconds = chunk_seconds
+
+    def play(self, path, should_stop):
+        """Play the file; returns False if should_stop() cut it short"""
+        import speech_recognition as sr
+        # AudioFile reads WAV as well as the AIFF some engines write
+        with sr.AudioFile(path) as source:
+            clip = sr.Recognizer().record(source)
+        stream = self.audio.open(format=self.audio.get_format_from_width(clip.sample_width), channels=1,
+                                 rate=clip.sample_rate, output=True)
+        step = max(1, int(clip.sample_rate * self.chunk_seconds)) * clip.sample_width
+        try:
+            for offset in range(0, len(clip.frame_data), step):
+                if should_stop():
+                    return False
+                stream.write(clip.frame_data[offset:offset + step])
+            return True
+        finally:
+            stream.stop_stream()
+            stream.close()
+
+    def close(self):
+        self.audio.terminate()
+
+def prerender(cache, phrases=COMMON_PHRASES, rate=150, volume=0.9, log=print):
+    """Render phrases with a blocking engine; returns how many were rendered"""
+    import pyttsx3
+    engine = pyttsx3.init()
+    engine.setProperty('rate', rate)
+    engine.setProperty('volume', volume)
+    voice = engine.getProperty('voice')
+    rendered = 0
+    for text in phrases:
+        key = cache.make_key(text, voice, rate, volume)
+        if key in cache:
+            continue
+        started = time.perf_counter()
+        engine.save_to_file(text, cache.path_for(key))
+        engine.runAndWait()
+        cache.add(key, text, time.perf_counter() - started)
+        rendered += 1
+    log(f"Rendered {rendered} of {len(phrases)} phrases into {cache.directory}")
+    return rendered
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the synthesized-speech cache")
+    parser.add_argument('--prerender', action='store_true', help="render the common assistant phrases")
+    parser.add_argument('--rate', type=int, default=150)
+    parser.add_argument('--volume', type=float, default=0.9)
+    parser.add_argument('--clear', action='store_true', help="delete every cached phrase")
+    parser.add_argument('--stats', action='store_true', help="print the cache size")
+    args = parser.parse_args()
+
+    cache = TTSCache.from_env()
+    if cache is None:
+        parser.exit(message="TTS cache is off (TTS_CACHE_DIR)\n")
+    if args.clear:
+        cache.clear()
+    if args.prerender:
+        try:
+            prerender(cache, rate=args.rate, volume=args.volume)
+        except (ImportError, RuntimeError) as e:  # no pyttsx3, or no speech engine on this system
+            cache.close()
+            parser.exit(1, f"Could not render phrases: {e}\n")
+    if args.stats or not (args.clear or args.prerender):
+        print(json.dumps(cache.stats(), indent=2))
+    cache.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Text-to-speech output worker.
+A single thread owns the pyttsx3 engine and speaks queued utterances through
+the engine's non-blocking loop, so callers (including the Tk main thread)
+never wait for speech to finish. New user input can cut speech short.
+With a TTSCache (see tts_cache.py), repeated phrases are rendered to files
+while the worker is idle and played from disk instead of synthesized again.
+"""
+
+import queue
+import threading
+import time
+import pyttsx3
+
+class SpeechWorker:
+    """Owns the TTS engine and speaks utterances from a queue, with barge-in"""
+
+    def __init__(self, rate=150, volume=0.9, poll_interval=0.02, tracer=None, cache=None):
+        self.rate = rate
+        self.tracer = tracer  # records a 'tts' span per utterance for the turn that queued it
+        self.volume = volume
+        self.poll_interval = poll_interval
+        self.utterances = queue.Queue()
+        self.cache = cache
+        self.renders = []  # (key, text) of phrases to render once nothing is waiting to be said
+        self.rendering = None  # (key, text, started) of the phrase being rendered
+
+        # Bumped by interrupt(); utterances queued under an older generation are skipped
+        self.generation = 0
+        self.stop_requested = False
+        self.speaking = False
+        self.current = None  # (turn, started) of the utterance being spoken
+        self.idle = threading.Event()
+        self.idle.set()
+        self.interruptions = 0
+
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="tts-worker", daemon=True)
+        self.thread.start()
+
+    def say(self, text):
+        """Queue text to be spoken; returns immediately"""
+        turn = self.tracer.current() if self.tracer else None
+        self.utterances.put((self.generation, text, turn))
+        # Cleared after the put: if the worker races ahead it simply sets idle again
+        self.idle.clear()
+
+    def interrupt(self):
+        """Barge-in: cut off the current utterance and drop everything queued"""
+        self.generation += 1
+        while True:
+            try:
+                self.utterances.get_nowait()
+            except queue.Empty:
+                break
+        if self.speaking:
+            self.stop_requested = True
+            self.interruptions += 1
+
+    def wait(self, timeout=None):
+        """Block until everything queued so far has been spoken"""
+        return self.idle.wait(timeout)
+
+    def shutdown(self):
+        """Stop speaking and end the worker thread"""
+        self.interrupt()
+        self.running = False
+        self.thread.join(timeout=2)
+        if self.cache is not None:
+            self.cache.flush()
+
+    def _run(self):
+        engine = pyttsx3.init()
+        engine.setProperty('rate', self.rate)
+        engine.setProperty('volume', self.volume)
+        engine.connect('finished-utterance', self._on_finished)
+        voice = engine.getProperty('voice')
+        player = self._player()
+        engine.startLoop(False)
+        try:
+            while self.running:
+                if self.stop_requested:
+                    self.stop_requested = False
+                    engine.stop()
+                    self.rendering = None  # a render queued behind the utterance is dropped too
+                    self._finish(interrupted=True)
+
+                if not self.speaking:
+                    try:
+                        generation, text, turn = self.utterances.get(timeout=self.poll_interval)
+                    except queue.Empty:
+                        if self.utterances.empty():
+                            self.idle.set()
+                            if self.renders and self.rendering is None:
+                                self._render_next(engine)
+                            if self.rendering is not None:
+                                engine.iterate()
+                        continue
+                    if generation != self.generation:
+                        continue
+                    self.speaking = True
+                    self.current = (turn, time.perf_counter())
+                    key = self.cache.make_key(text, voice, self.rate, self.volume) if player else None
+                    path = self.cache.lookup(key) if key else None
+                    if path and self._play(player, path):
+                        continue
+                    engine.say(text, 'say')
+                    if key and self.cache.should_render(key):
+                        self.renders.append((key, text))
+
+                engine.iterate()
+                time.sleep(self.poll_interval)
+        finally:
+            engine.endLoop()
+            if player:
+                player.close()
+
+    def _player(self):
+        """Player for cached phrases, or None when there is no cache or no PyAudio"""
+        if self.cache is None:
+            return None
+        try:
+            from tts_cache import ClipPlayer
+            return ClipPlayer()
+        except Exception:
+            return None
+
+    def _play(self, player, path):
+        """Play a cached phrase; False if it couldn't be played and must be synthesized"""
+        try:
+            completed = player.play(path, lambda: self.stop_requested or not self.running)
+        except Exception:
+            return False
+        self.stop_requested = False
+        self._finish(interrupted=not completed)
+        return True
+
+    def _render_next(self, engine):
+        key, text = self.renders.pop(0)
+        self.rendering = (key, text, time.perf_counter())
+        engine.save_to_file(text, self.cache.path_for(key), 'render')
+
+    def _on_finished(self, name, completed):
+        if name == 'render':
+            if self.rendering is None:
+                return
+            key, text, started = self.rendering
+            self.rendering = None
+            if completed:
+                self.cache.add(key, text, time.perf_counter() - started)
+            return
+        self._finish(interrupted=not completed)
+
+    def _finish(self, interrupted):
+        if self.speaking and self.tracer and self.current:
+            turn, started = self.current
+            self.tracer.record('tts', time.perf_counter() - started, turn, interrupted=interrupted)
+        self.current = None
+        self.speaking = False
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Wake-word gate for continuous listening.
+Every captured utterance is checked for the wake word before it reaches
+speech recognition. An energy gate throws out quiet audio first; otherwise
+MFCCs of the start of the utterance are matched against enrolled recordings
+of the wake word with dynamic time warping, all in NumPy. Only the audio
+after the wake word goes on to recognition. Saying just the wake word makes
+the next utterance pass without it.
+
+    python wake_word.py enroll alexa1.wav alexa2.wav alexa3.wav
+    python wake_word.py evaluate --positive clips/alexa/*.wav --negative clips/tv/*.wav
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+FRAME = 400  # 25 ms
+HOP = 160    # 10 ms
+FFT_SIZE = 512
+MEL_FILTERS = 26
+COEFFICIENTS = 13
+
+def _mel_filterbank():
+    def mel(hz):
+        return 2595 * np.log10(1 + hz / 700)
+
+    def hz(mels):
+        return 700 * (10 ** (mels / 2595) - 1)
+
+    edges = hz(np.linspace(mel(60), mel(SAMPLE_RATE / 2), MEL_FILTERS + 2))
+    bins = np.floor((FFT_SIZE + 1) * edges / SAMPLE_RATE).astype(int)
+    bank = np.zeros((MEL_FILTERS, FFT_SIZE // 2 + 1), dtype=np.float32)
+    for index in range(MEL_FILTERS):
+        left, center, right = bins[index], bins[index + 1], bins[index + 2]
+        bank[index, left:center] = (np.arange(left, center) - left) / max(center - left, 1)
+        bank[index, center:right] = (right - np.arange(center, right)) / max(right - center, 1)
+    return bank
+
+FILTERBANK = _mel_filterbank()
+# DCT-II rows, so cepstra are one matrix product away from the log mel energies
+DCT = np.cos(np.pi / MEL_FILTERS * np.outer(np.arange(COEFFICIENTS), np.arange(MEL_FILTERS) + 0.5)).astype(np.float32)
+WINDOW = np.hamming(FRAME).astype(np.float32)
+MIN_ENERGY = 120.0
+NOISE_RATIO = 2.5
+
+def samples_of(audio):
+    """16 kHz mono float samples of an sr.AudioData"""
+    raw = audio.get_raw_data(convert_rate=SAMPLE_RATE, convert_width=2)
+    return np.frombuffer(raw, dtype=np.int16).astype(np.float32)
+
+def frames_of(samples):
+    """Overlapping FRAME-long frames every HOP samples"""
+    if len(samples) < FRAME:
+        samples = np.pad(samples, (0, FRAME - len(samples)))
+    return np.lib.stride_tricks.sliding_window_view(samples, FRAME)[::HOP]
+
+def frame_energy(samples):
+    """RMS of every frame"""
+    frames = frames_of(samples)
+    return np.sqrt(np.einsum('ij,ij->i', frames, frames) / FRAME)
+
+def voiced_frames(samples, min_energy=MIN_ENERGY, noise_ratio=NOISE_RATIO):
+    """Frames louder than the audio's own noise floor (and an absolute minimum)"""
+    energy = frame_energy(samples)
+    return energy > max(min_energy, np.percentile(energy, 10) * noise_ratio)
+
+def mfcc(samples):
+    """(frames x COEFFICIENTS) mel-frequency cepstral coefficients"""
+    emphasized = np.append(samples[:1], samples[1:] - 0.97 * samples[:-1])
+    power = np.abs(np.fft.rfft(frames_of(emphasized) * WINDOW, FFT_SIZE)) ** 2 / FFT_SIZE
+    return np.log(power @ FILTERBANK.T + 1e-6) @ DCT.T
+
+def _unit_rows(features):
+    """Mean-normalized cepstra without c0 (loudness), scaled to unit length per frame"""
+    features = features[:, 1:] - features[:, 1:].mean(axis=0)
+    return features / np.maximum(np.linalg.norm(features, axis=1, keepdims=True), 1e-6)
+
+def dtw_prefix(template, features):
+    """(distance, frames) of the best warp of template onto a prefix of features
+
+    Each template frame advances the utterance by 0-2 frames, so the match
+    may run at up to twice the template's speed; the distance is the mean
+    cosine distance along the path.
+    """
+    count = len(template)
+    features = features[:2 * count]
+    if len(features) <= count // 2:
+        return float('inf'), len(features)
+    cost = 1 - _unit_rows(template) @ _unit_rows(features).T
+    row = np.full(cost.shape[1], np.inf, dtype=np.float32)
+    row[:3] = cost[0, :3]  # allow a couple of frames of slack at the start
+    for index in range(1, count):
+        best = row.copy()
+        best[1:] = np.minimum(best[1:], row[:-1])
+        best[2:] = np.minimum(best[2:], row[:-2])
+        row = cost[index] + best
+    end = count // 2 + int(np.argmin(row[count // 2:]))
+    return float(row[end] / count), end + 1
+
+class WakeWordDetector:
+    """Template matcher for one wake word
+
+    templates are MFCC arrays of enrolled recordings. threshold is the
+    largest DTW distance accepted as the wake word; min_energy and
+    noise_ratio make up the energy gate that skips quiet audio cheaply.
+    """
+
+    def __init__(self, templates, threshold=0.35, min_energy=MIN_ENERGY, noise_ratio=NOISE_RATIO, min_voiced=0.15):
+        self.templates = [np.asarray(template, dtype=np.float32) for template in templates]
+        self.threshold = threshold
+        self.min_energy = min_energy
+        self.noise_ratio = noise_ratio
+        self.min_voiced_frames = int(min_voiced * SAMPLE_RATE / HOP)
+        self.longest = max(len(template) for template in self.templates)
+
+        # Counters
+        self.checked = 0
+        self.energy_rejects = 0
+        self.accepts = 0
+        self.cpu_seconds = 0.0
+        self.audio_seconds = 0.0
+
+    @classmethod
+    def enroll(cls, clips, threshold=0.35, **options):
+        """Detector with one template per clip (float samples of the wake word alone)"""
+        templates = []
+        for samples in clips:
+            voiced = voiced_frames(samples, options.get('min_energy', MIN_ENERGY),
+                                   options.get('noise_ratio', NOISE_RATIO))
+            if not voiced.any():
+                continue
+            first, last = np.flatnonzero(voiced)[[0, -1]]
+            templates.append(mfcc(samples[first * HOP:last * HOP + FRAME]))
+        if not templates:
+            raise ValueError("no speech found in the enrollment clips")
+        return cls(templates, threshold, **options)
+
+    @classmethod
+    def load(cls, path, threshold=None):
+        data = np.load(path)
+        templates = np.split(data['features'], np.cumsum(data['lengths'])[:-1])
+        return cls(templates, float(data['threshold']) if threshold is None else threshold)
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        np.savez(path, features=np.concatenate(self.templates),
+                 lengths=np.array([len(template) for template in self.templates]),
+                 threshold=np.float32(self.threshold))
+
+    def voiced_frames(self, samples):
+        return voiced_frames(samples, self.min_energy, self.noise_ratio)
+
+    def detect(self, samples):
+        """(distance, end_sample): how well the start of the audio matches the wake word and where it ends"""
+        started = time.process_time()
+        self.checked += 1
+        self.audio_seconds += len(samples) / SAMPLE_RATE
+        try:
+            voiced = self.voiced_frames(samples)
+            if np.count_nonzero(voiced) < self.min_voiced_frames:
+                self.energy_rejects += 1
+                return float('inf'), None
+            start = max(0, int(np.argmax(voiced)) - 2)
+            window = samples[start * HOP:(start + 2 * self.longest) * HOP + FRAME]
+            features = mfcc(window)
+            distance, frames = min(dtw_prefix(template, features) for template in self.templates)
+            if distance <= self.threshold:
+                self.accepts += 1
+            return distance, (start + frames) * HOP + FRAME
+        finally:
+            self.cpu_seconds += time.process_time() - started
+
+    def stats(self):
+        return {
+            'checked': self.checked,
+            'energy_rejects': self.energy_rejects,
+            'accepts': self.accepts,
+            'cpu_ms_per_check': round(self.cpu_seconds / self.checked * 1000, 2) if self.checked else 0.0,
+            # CPU time per second of audio; 0.01 is 1% of one core
+            'cpu_load': round(self.cpu_seconds / self.audio_seconds, 4) if self.audio_seconds else 0.0
+        }
+
+class WakeWordGate:
+    """Pipeline gate: returns the audio after the wake word, or None to drop the utterance
+
+    An utterance that is only the wake word opens a follow_up window in which
+    the next utterance passes whole ("Alexa." ... "what time is it").
+    """
+
+    def __init__(self, detector, follow_up=6.0, min_command=0.3, on_wake=None):
+        self.detector = detector
+        self.follow_up = follow_up
+        self.min_command_frames = int(min_command * SAMPLE_RATE / HOP)
+        self.on_wake = on_wake
+        self.armed_until = 0.0
+        self.passed = 0
+        self.dropped = 0
+
+    def __call__(self, audio):
+        import speech_recognition as sr
+        samples = samples_of(audio)
+        if time.monotonic() < self.armed_until:
+            self.armed_until = 0.0
+            self.passed += 1
+            return audio
+        distance, end = self.detector.detect(samples)
+        if distance > self.detector.threshold:
+            self.dropped += 1
+            return None
+        rest = samples[end:]
+        if len(rest) < FRAME or np.count_nonzero(self.detector.voiced_frames(rest)) < self.min_command_frames:
+            # Just the wake word: wait for the command
+            self.armed_until = time.monotonic() + self.follow_up
+            if self.on_wake:
+                self.on_wake()
+            return None
+        self.passed += 1
+        return sr.AudioData(rest.astype(np.int16).tobytes(), SAMPLE_RATE, 2)
+
+    def stats(self):
+        return dict(self.detector.stats(), passed=self.passed, dropped=self.dropped)
+
+def create_gate(on_wake=None, log=print):
+    """WakeWordGate from WAKE_WORD_TEMPLATES (default models/wake_word.npz), or None when not enrolled"""
+    path = os.getenv('WAKE_WORD_TEMPLATES', 'models/wake_word.npz')
+    if path.lower() in ('', 'off', '0', 'none'):
+        return None
+    if not os.path.exists(path):
+        if os.getenv('WAKE_WORD_TEMPLATES'):
+            log(f"Wake word templates not found at '{path}' (record some with: python wake_word.py enroll)")
+        return None
+    threshold = os.getenv('WAKE_WORD_THRESHOLD')
+    detector = WakeWordDetector.load(path, float(threshold) if threshold else None)
+    return WakeWordGate(detector, follow_up=float(os.getenv('WAKE_WORD_FOLLOW_UP', '6')), on_wake=on_wake)
+
+def read_clip(path):
+    """Float 16 kHz samples of a WAV/AIFF/FLAC file"""
+    import speech_recognition as sr
+    with sr.AudioFile(path) as source:
+        return samples_of(sr.Recognizer().record(source))
+
+def evaluate(detector, positives, negatives):
+    """Distances of positive (wake word) and negative clips, and FAR/FRR at the detector's threshold"""
+    positive = [detector.detect(samples)[0] for samples in positives]
+    negative = [detector.detect(samples)[0] for samples in negatives]
+    return {
+        'positive': positive,
+        'negative': negative,
+        'false_reject_rate': error_rate(positive, detector.threshold, accept_is_error=False),
+        'false_accept_rate': error_rate(negative, detector.threshold, accept_is_error=True),
+        'stats': detector.stats()
+    }
+
+def error_rate(distances, threshold, accept_is_error):
+    if not distances:
+        return 0.0
+    accepted = sum(distance <= threshold for distance in distances)
+    return (accepted if accept_is_error else len(distances) - accepted) / len(distances)
+
+def main():
+    parser = argparse.ArgumentParser(description="Enroll and evaluate the wake word")
+    commands = parser.add_subparsers(dest='command', required=True)
+    templates = os.getenv('WAKE_WORD_TEMPLATES', 'models/wake_word.npz')
+    enroll = commands.add_parser('enroll', help="build templates from recordings of the wake word alone")
+    enroll.add_argument('clips', nargs='+')
+    enroll.add_argument('-o', '--output', default=templates)
+    enroll.add_argument('--threshold', type=float, default=0.35)
+    check = commands.add_parser('evaluate', help="false accept/reject rates on recorded clips")
+    check.add_argument('--positive', nargs='*', default=[], help="clips that start with the wake word")
+    check.add_argument('--negative', nargs='*', default=[], help="clips without it (TV, other speech)")
+    check.add_argument('--templates', default=templates)
+    check.add_argument('--threshold', type=float)
+    args = parser.parse_args()
+
+    if args.command == 'enroll':
+        detector = WakeWordDetector.enroll([read_clip(path) for path in args.clips], args.threshold)
+        detector.save(args.output)
+        print(f"Saved {len(detector.templates)} templates to {args.output}")
+        return
+
+    detector = WakeWordDetector.load(args.templates, args.threshold)
+    report = evaluate(detector, [read_clip(path) for path in args.positive],
+                      [read_clip(path) for path in args.negative])
+    print(f"threshold {detector.threshold:g}: false rejects {report['false_reject_rate']:.1%} "
+          f"of {len(args.positive)}, false accepts {report['false_accept_rate']:.1%} of {len(args.negative)}")
+    print(f"{'threshold':>10}{'FRR':>8}{'FAR':>8}")
+    for threshold in np.round(np.arange(0.15, 0.61, 0.05), 2):
+        print(f"{threshold:>10}{error_rate(report['positive'], threshold, False):>8.1%}"
+              f"{error_rate(report['negative'], threshold, True):>8.1%}")
+    stats = report['stats']
+    print(f"{stats['cpu_ms_per_check']} ms CPU per clip, {stats['cpu_load']:.2%} of one core per second of audio")
+
+if __name__ == "__main__":
+    main()